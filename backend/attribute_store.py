@@ -0,0 +1,216 @@
+import re
+import sys
+
+import numpy as np
+
+
+# ================================================================
+# CATEGORY VOCABULARY
+# ================================================================
+# keyword → category name (several keywords can share a category)
+CATEGORY_KEYWORDS = {
+    "dress": "dress", "dresses": "dress", "frock": "dress", "gown": "dress",
+    "kurti": "kurti", "kurtis": "kurti", "kurta": "kurti",
+    "saree": "saree", "sarees": "saree", "sari": "saree",
+    "lehenga": "lehenga",
+    "shirt": "shirt", "shirts": "shirt",
+    "tshirt": "tshirt", "tshirts": "tshirt", "tee": "tshirt", "tees": "tshirt",
+    "jeans": "jeans",
+    "shoes": "shoes", "shoe": "shoes", "sneakers": "shoes",
+    "sandals": "sandals", "sandal": "sandals",
+    "mobile": "mobile", "smartphone": "mobile", "phone": "mobile",
+    "earbuds": "earbuds", "earphones": "earbuds",
+    "laptop": "laptop",
+    "watch": "watch",
+    "bag": "bag", "backpack": "bag",
+}
+
+# "T-Shirt" / "t shirts" are one word for keyword lookup
+_TSHIRT_RE = re.compile(r"\bt[\s-]?(shirts?)\b")
+
+
+def normalize_text(text):
+    """Lowercased `text` with multi-word product names joined ("t-shirt" → "tshirt")."""
+    return _TSHIRT_RE.sub(r"t\1", (text or "").lower())
+
+
+def word_forms(word):
+    """`word`, then its singular guesses: "watches" → watches, watch, watche."""
+    forms = [word]
+    if len(word) > 3 and word.endswith("s"):
+        if word.endswith("es"):
+            forms.append(word[:-2])
+        forms.append(word[:-1])
+    return forms
+
+
+def detect_category(text):
+    """First category keyword in `text` (plurals included), as a category name (or None)."""
+    for word in re.findall(r"[a-z]+", normalize_text(text)):
+        for form in word_forms(word):
+            if form in CATEGORY_KEYWORDS:
+                return CATEGORY_KEYWORDS[form]
+    return None
+
+
+# ================================================================
+# PRICE PARSING
+# ================================================================
+# "rs" / "inr" only as whole words: "Sneakers 7 UK ₹1,499" is 1499, not 7
+_PRICE_RE = re.compile(r"(?:₹|\b(?:rs|inr)\b\.?)\s*([\d,]+(?:\.\d+)?)", re.I)
+
+
+_BARE_PRICE_RE = re.compile(r"\s*([\d,]*\d(?:\.\d+)?)\s*")
+
+
+def parse_price(text):
+    """'₹1,299' / 'Rs. 499.00' / '999' / 999 → float, else None."""
+    if text is None or isinstance(text, bool):
+        return None
+    if isinstance(text, (int, float)):
+        return float(text)
+    m = _BARE_PRICE_RE.fullmatch(text) or _PRICE_RE.search(text)
+    if not m:
+        return None
+    try:
+        return float(m.group(1).replace(",", ""))
+    except ValueError:
+        return None
+
+
+_CUR = r"(?:₹|\b(?:rs|inr)\b\.?)"
+# "256gb", "5000 mah", "6.5 inch", "1 kg": specs, never prices
+_UNIT = r"(?:gb|tb|mb|mah|mp|inch|inches|hz|kg|mm|cm|w)"
+# "1k" / "1.5 k" are thousands
+_AMOUNT = rf"(\d[\d,]*(?:\.\d+)?(?:\s*k\b)?)(?![\d,]|\.\d|\s*{_UNIT}\b)"
+_NUM = rf"{_CUR}?\s*{_AMOUNT}"
+_PRICED = rf"{_CUR}\s*{_AMOUNT}"       # currency required
+
+_BETWEEN_RE = re.compile(rf"\bbetween\s+{_NUM}\s+(?:and|to|-)\s+{_NUM}", re.I)
+_RANGE_RE = re.compile(rf"{_NUM}\s*(?:-|to)\s*{_NUM}", re.I)
+# a price word takes any number; "max" / "<" only take one with a currency marker
+# ("iphone 15 pro max 256gb" has no price cap)
+_MAX_RE = re.compile(
+    rf"(?:\bunder|\bbelow|\bless than|\bupto|\bup to|\bwithin|\bbudget(?:\s+of)?|\bprice(?:\s+under|\s+below)?)\s*{_NUM}"
+    rf"|(?:\bmax(?:imum)?|<)\s*{_PRICED}",
+    re.I,
+)
+_MIN_RE = re.compile(
+    rf"(?:\babove|\bover|\bmore than|\bstarting(?:\s+at|\s+from)?)\s*{_NUM}"
+    rf"|(?:\bmin(?:imum)?|>)\s*{_PRICED}",
+    re.I,
+)
+
+MIN_RANGE_PRICE = 50    # smaller "a - b" pairs are model numbers, not prices
+
+
+def _num(text):
+    text = text.replace(",", "").lower()
+    if text.endswith("k"):
+        return float(text[:-1].strip()) * 1000
+    return float(text)
+
+
+def _amount(m):
+    # _MAX_RE / _MIN_RE have one group per alternative
+    return _num(next(g for g in m.groups() if g))
+
+
+def parse_constraints(query):
+    """
+    Pull structured filters out of a shopping query.
+      "red kurti under 500"          → max_price=500, category="kurti"
+      "shoes between 1000 and 2000"  → min_price=1000, max_price=2000
+    `query` is the text with the price phrases removed.
+    """
+    text = query or ""
+    min_price = max_price = None
+
+    for pattern in (_BETWEEN_RE, _RANGE_RE):
+        m = pattern.search(text)
+        if m:
+            lo, hi = sorted((_num(m.group(1)), _num(m.group(2))))
+            if pattern is _RANGE_RE and lo < MIN_RANGE_PRICE:
+                continue
+            min_price, max_price = lo, hi
+            text = text.replace(m.group(0), " ")
+            break
+    else:
+        m = _MAX_RE.search(text)
+        if m:
+            max_price = _amount(m)
+            text = text.replace(m.group(0), " ")
+        m = _MIN_RE.search(text)
+        if m:
+            min_price = _amount(m)
+            text = text.replace(m.group(0), " ")
+
+    return {
+        "query": " ".join(text.split()),
+        "min_price": min_price,
+        "max_price": max_price,
+        "category": detect_category(text),
+    }
+
+
+# ================================================================
+# COLUMNAR ATTRIBUTE STORE
+# ================================================================
+class AttributeStore:
+    """
+    Column arrays over a product list so filters are vectorized masks:
+      price        float32 (NaN = unknown)
+      source_id    int8
+
+    Category is deliberately not a filter: titles name products too
+    loosely ("Regular Fit T-Shirt" for a "shirt" query) and the rerankers
+    already score relevance, so only a known out-of-range price drops a row.
+    """
+
+    def __init__(self, products):
+        n = len(products)
+        self.sources = []
+        source_index = {}
+        self.price = np.full(n, np.nan, dtype=np.float32)
+        self.source_id = np.zeros(n, dtype=np.int8)
+
+        for i, p in enumerate(products):
+            price = parse_price(p.price)
+            if price is not None:
+                self.price[i] = price
+
+            source = sys.intern(p.source or "")
+            if source not in source_index:
+                source_index[source] = len(self.sources)
+                self.sources.append(source)
+            self.source_id[i] = source_index[source]
+
+    def __len__(self):
+        return len(self.price)
+
+    def mask(self, min_price=None, max_price=None, sources=None):
+        """
+        Boolean keep-mask. Unknown prices are kept: only items known to
+        violate a constraint are dropped.
+        """
+        keep = np.ones(len(self), dtype=bool)
+        known = ~np.isnan(self.price)
+        if max_price is not None:
+            keep &= ~known | (self.price <= max_price)
+        if min_price is not None:
+            keep &= ~known | (self.price >= min_price)
+        if sources:
+            ids = [i for i, s in enumerate(self.sources) if s in sources]
+            keep &= np.isin(self.source_id, ids)
+        return keep
+
+
+def filter_products(products, constraints):
+    """Apply parse_constraints() output to a plain product list."""
+    if not products:
+        return products
+    keep = AttributeStore(products).mask(
+        min_price=constraints.get("min_price"),
+        max_price=constraints.get("max_price"),
+    )
+    return [p for p, k in zip(products, keep) if k]
@@ -1,65 +1,54 @@
 # auth_routes.py
 from fastapi import APIRouter, HTTPException, Form
 from pydantic import BaseModel
-import sqlite3
-from passlib.context import CryptContext
-import time
 
-router = APIRouter()
-
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from user_store import user_store, UserExistsError
+from password_service import password_service, PasswordServiceBusy
+from session_tokens import session_tokens
 
-# SQLite database setup
-def get_db_connection():
-    conn = sqlite3.connect("users.db")
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            email TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            name TEXT NOT NULL,
-            created_at REAL
-        )
-    """)
-    return conn
+router = APIRouter()
 
 
 # Signup endpoint
 @router.post("/auth/signup")
-def signup(name: str = Form(...), email: str = Form(...), password: str = Form(...)):
-    conn = get_db_connection()
-    cursor = conn.cursor()
+async def signup(name: str = Form(...), email: str = Form(...), password: str = Form(...)):
+    email = email.lower()
 
     # Check if user exists
-    cursor.execute("SELECT * FROM users WHERE email = ?", (email.lower(),))
-    if cursor.fetchone():
-        conn.close()
+    if await user_store.afind_by_email(email):
         raise HTTPException(status_code=400, detail="User already exists")
 
-    # Hash password (limit to 72 chars)
-    hashed_pw = pwd_context.hash(password[:72])
+    # Hash password (service truncates to bcrypt's 72 bytes)
+    try:
+        hashed_pw = await password_service.hash(password)
+    except PasswordServiceBusy:
+        raise HTTPException(status_code=503, detail="Server busy, try again")
+
+    # Insert into the shared users table (email doubles as username)
+    try:
+        await user_store.acreate_user(email, email, hashed_pw, name=name)
+    except UserExistsError:
+        raise HTTPException(status_code=400, detail="User already exists")
 
-    # Insert into database
-    cursor.execute(
-        "INSERT INTO users (email, password, name, created_at) VALUES (?, ?, ?, ?)",
-        (email.lower(), hashed_pw, name, time.time()),
-    )
-    conn.commit()
-    conn.close()
     return {"message": "User created successfully"}
 
 
 # Login endpoint
 @router.post("/auth/login")
-def login(email: str = Form(...), password: str = Form(...)):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT password FROM users WHERE email = ?", (email.lower(),))
-    row = cursor.fetchone()
-    conn.close()
+async def login(email: str = Form(...), password: str = Form(...)):
+    user = await user_store.afind_by_email(email.lower())
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    if not row or not pwd_context.verify(password[:72], row[0]):
+    try:
+        ok, new_hash = await password_service.verify(password, user["password_hash"])
+    except PasswordServiceBusy:
+        raise HTTPException(status_code=503, detail="Server busy, try again")
+
+    if not ok:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    return {"message": "Login successful"}
+    if new_hash:
+        await user_store.aset_password_hash(user["id"], new_hash)
+
+    return {"message": "Login successful", "token": session_tokens.issue(user["id"])}
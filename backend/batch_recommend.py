@@ -0,0 +1,167 @@
+import os
+import sys
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from memory_manager import MemoryManager
+from attribute_store import parse_constraints
+from catalog_index import reciprocal_rank_fusion
+from retrieval import catalog, encode, RERANK_TOP_K, CATALOG_CANDIDATES, FINAL_RESULTS, STAGE1_SCORER
+from crossencoder import compute_relevance_pairs
+
+# ------------------------------------------
+# Offline recommendations for many (user, query) pairs, on the same
+# catalog retrieval + cross-encoder stack as /chat (no live scraping):
+#
+#   python batch_recommend.py queries.jsonl                → recommendations.jsonl
+#   python batch_recommend.py queries.jsonl recs.jsonl
+#
+# Input lines:  {"id": "u1-home", "user_id": 1, "query": "kurti", "history": ["red dress"]}
+# Output lines: {"id": ..., "user_id": ..., "query": <effective query>, "products": [...]}
+# Only "query" is required; "history" is folded in like /chat's topic memory.
+# ------------------------------------------
+RECO_CHUNK = int(os.getenv("RECO_CHUNK", "256"))              # queries per vectorized step
+RECO_WORKERS = int(os.getenv("RECO_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+RECO_THREADS = int(os.getenv("RECO_THREADS", "2"))            # torch threads per worker process
+RECO_CE_BATCH = int(os.getenv("RECO_CE_BATCH", "256"))        # cross-encoder pairs per forward pass
+RECO_MAX_BATCH = int(os.getenv("RECO_MAX_BATCH", "5000"))     # queries per /recommend/batch call
+
+
+def effective_query(item):
+    """query + the topic carried over from `history`, as /chat would build it."""
+    mem = MemoryManager()
+    for msg in item.get("history") or []:
+        mem.add_message(msg)
+        mem.update_topic(msg)
+    return mem.build_query_context(item.get("query") or "")
+
+
+def _top_k(scores, k):
+    k = min(k, scores.shape[1])
+    idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, idx, axis=1), axis=1)
+    return np.take_along_axis(idx, order, axis=1)
+
+
+def recommend_chunk(items, k=RERANK_TOP_K, final_n=FINAL_RESULTS, scorer=STAGE1_SCORER):
+    """
+    One vectorized pass over a chunk of queries:
+      - all queries embedded in one MiniLM call
+      - dense catalog scores for the whole chunk as a single matrix product
+      - BM25 per query, fused with reciprocal rank fusion (as in stage_one)
+      - every (query, candidate) pair of the chunk scored by the
+        cross-encoder in large, length-sorted batches
+    """
+    queries = [effective_query(item) for item in items]
+    constraints = [parse_constraints(q) for q in queries]
+    search_text = [c["query"] or q for c, q in zip(constraints, queries)]
+
+    n = len(items)
+    dense_rows = [[] for _ in range(n)]
+    if scorer in ("dense", "hybrid") and catalog.embeddings is not None and n:
+        sims = encode(search_text) @ catalog.embeddings.T            # (queries, catalog)
+        for i, c in enumerate(constraints):
+            allowed = catalog.allowed(c)
+            if allowed is not None:
+                sims[i, ~allowed] = -np.inf
+        for i, rows in enumerate(_top_k(sims, CATALOG_CANDIDATES)):
+            dense_rows[i] = [int(r) for r in rows if np.isfinite(sims[i, r])]
+
+    candidates = []
+    for i in range(n):
+        rankings = [dense_rows[i]] if dense_rows[i] else []
+        if scorer in ("bm25", "hybrid") and catalog.index is not None:
+            hits = catalog.keyword_search(search_text[i], CATALOG_CANDIDATES, catalog.allowed(constraints[i]))
+            if hits:
+                rankings.append([row for _, row in hits])
+        if len(rankings) > 1:
+            rows = [row for _, row in reciprocal_rank_fusion(*rankings)]
+        else:
+            rows = rankings[0] if rankings else []
+        candidates.append(rows[:k])
+
+    pair_q = [search_text[i] for i in range(n) for _ in candidates[i]]
+    pair_t = [catalog.products[row].title for rows in candidates for row in rows]
+    scores = iter(compute_relevance_pairs(pair_q, pair_t, batch_size=RECO_CE_BATCH))
+
+    out = []
+    for i, item in enumerate(items):
+        ranked = sorted(((next(scores), row) for row in candidates[i]), reverse=True)
+        out.append({
+            "id": item.get("id"),
+            "user_id": item.get("user_id"),
+            "query": queries[i],
+            "products": [
+                dict(catalog.products[row].to_dict(), score=round(score, 4))
+                for score, row in ranked[:final_n]
+            ],
+        })
+    return out
+
+
+def read_chunks(lines, size=RECO_CHUNK):
+    chunk = []
+    for line in lines:
+        if line.strip():
+            chunk.append(json.loads(line))
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def _init_worker(threads):
+    import torch
+    torch.set_num_threads(threads)      # workers × threads ≈ cores, no oversubscription
+
+
+def run(chunks, workers=RECO_WORKERS, threads=RECO_THREADS):
+    """
+    Yields result dicts in input order. With workers > 1, chunks go to a
+    process pool (each worker loads the models once); at most 2 chunks
+    per worker are in flight, so memory stays flat on large inputs.
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            yield from recommend_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(threads,)) as pool:
+        pending = []
+        for chunk in chunks:
+            pending.append(pool.submit(recommend_chunk, chunk))
+            if len(pending) >= workers * 2:
+                yield from pending.pop(0).result()
+        for fut in pending:
+            yield from fut.result()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python batch_recommend.py queries.jsonl [out.jsonl]")
+    out_path = sys.argv[2] if len(sys.argv) > 2 else "recommendations.jsonl"
+
+    start = time.perf_counter()
+    count = 0
+    with open(sys.argv[1], "r", encoding="utf-8") as src, open(out_path, "w", encoding="utf-8") as dst:
+        for rec in run(read_chunks(src)):
+            dst.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            count += 1
+    seconds = time.perf_counter() - start
+
+    report = {
+        "Queries": count,
+        "Workers": RECO_WORKERS,
+        "Chunk size": RECO_CHUNK,
+        "Cross-encoder batch": RECO_CE_BATCH,
+        "Seconds": round(seconds, 2),
+        "Queries/sec": round(count / seconds, 1) if seconds else None,
+        "Output": out_path,
+    }
+    print("\n===== BATCH RECOMMENDATIONS =====")
+    print(json.dumps(report, indent=4))
+    print("=================================")
@@ -0,0 +1,67 @@
+import time
+import json
+import glob
+from concurrent.futures import ThreadPoolExecutor
+
+from caption_service import BlipCaptioner, CaptionCache
+
+# ------------------------------------------
+# CONFIG
+# ------------------------------------------
+IMAGES = sorted(glob.glob("static/uploads/*.jpg"))
+REQUESTS = 32          # total caption requests per run
+CONCURRENCY = 8        # simulated concurrent uploads
+
+
+def load_payloads():
+    payloads = []
+    for path in IMAGES:
+        with open(path, "rb") as f:
+            payloads.append(f.read())
+    return payloads
+
+
+def run(name, captioner, payloads, concurrency):
+    jobs = [payloads[i % len(payloads)] for i in range(REQUESTS)]
+    captioner.ensure_loaded()   # model load time is not measured
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(captioner.caption_bytes, jobs))
+    elapsed = time.time() - start
+
+    return {
+        "mode": name,
+        "captions/sec": round(REQUESTS / elapsed, 2),
+        "total seconds": round(elapsed, 2),
+        "cache": captioner.cache.stats(),
+    }
+
+
+if __name__ == "__main__":
+    payloads = load_payloads()
+    if not payloads:
+        raise SystemExit("No images found in static/uploads/")
+
+    results = [
+        # old behaviour: batch size 1, no cache, max_length=50
+        run("baseline (no cache, batch=1)",
+            BlipCaptioner(batch_size=1, max_length=50, cache=CaptionCache(max_size=0)),
+            payloads, 1),
+        run("batched (no cache)",
+            BlipCaptioner(cache=CaptionCache(max_size=0)),
+            payloads, CONCURRENCY),
+        run("batched + cache",
+            BlipCaptioner(),
+            payloads, CONCURRENCY),
+        run("batched + cache + fast decode",
+            BlipCaptioner(max_length=30, num_beams=1),
+            payloads, CONCURRENCY),
+        run("batched + fast decode + int8 (no cache)",
+            BlipCaptioner(max_length=30, int8=True, cache=CaptionCache(max_size=0)),
+            payloads, CONCURRENCY),
+    ]
+
+    print("\n===== BLIP CAPTION THROUGHPUT =====")
+    print(json.dumps(results, indent=4))
+    print("===================================")
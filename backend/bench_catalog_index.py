@@ -0,0 +1,74 @@
+import time
+import json
+from statistics import mean
+
+import numpy as np
+
+from catalog_index import CatalogIndex, CATALOG_INDEX_DIR, clean_tokens
+
+# ------------------------------------------
+# CONFIG
+# ------------------------------------------
+TEST_QUERIES = [
+    "red frock for girls",
+    "mens black shoes",
+    "budget smartphone",
+    "white tshirt",
+    "cotton kurti",
+    "wireless earbuds",
+    "office laptop bag",
+    "silk saree",
+]
+K = 10
+REPEAT = 200
+
+
+def exhaustive(index, query, k):
+    """Score every posting of every query term (no pruning); returns top-k scores."""
+    scores = np.zeros(len(index), dtype=np.float32)
+    for t in set(clean_tokens(query)):
+        if t in index.vocab:
+            docs, contrib = index._term_scores(index.vocab[t])
+            scores[docs] += contrib
+    top = np.argsort(-scores)[:k]
+    return [round(float(scores[d]), 3) for d in top if scores[d] > 0]
+
+
+def timed(fn, *args):
+    samples = []
+    for _ in range(REPEAT):
+        t = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - t)
+    samples.sort()
+    return samples
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    index = CatalogIndex.load(CATALOG_INDEX_DIR, mmap=True)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    pruned, full, agree = [], [], []
+    for q in TEST_QUERIES:
+        pruned += timed(index.search, q, K)
+        full += timed(exhaustive, index, q, K)
+        # compare scores, not ids: equal-scoring documents may tie-break differently
+        agree.append([round(s, 3) for s, _ in index.search(q, K)] == exhaustive(index, q, K))
+
+    pruned.sort()
+    full.sort()
+    metrics = {
+        "Documents": len(index),
+        "Terms": len(index.vocab),
+        "Postings": int(len(index.doc_ids)),
+        "mmap load (ms)": round(load_ms, 2),
+        "Max-score query p50 (ms)": round(pruned[len(pruned) // 2] * 1000, 3),
+        "Max-score query p95 (ms)": round(pruned[int(len(pruned) * 0.95)] * 1000, 3),
+        "Exhaustive query p50 (ms)": round(full[len(full) // 2] * 1000, 3),
+        "Top-k identical to exhaustive (%)": round(100 * mean(agree), 1),
+    }
+
+    print("\n===== BM25 CATALOG INDEX =====")
+    print(json.dumps(metrics, indent=4))
+    print("==============================")
@@ -0,0 +1,75 @@
+import time
+import json
+import random
+
+from intent_classifier import IntentClassifier
+from test_intent import LABELLED
+
+# ------------------------------------------
+# CONFIG
+# ------------------------------------------
+MESSAGES = 50000        # classified messages per run
+SEED = 7
+
+# the two keyword lists this replaced
+OLD_TOPIC_WORDS = [
+    "dress", "shirt", "jeans", "shoes", "mobile", "earbuds",
+    "tshirt", "kurti", "lehenga", "frock", "sandals"
+]
+OLD_SHOPPING_WORDS = [
+    "show", "find", "buy", "dress", "shirt",
+    "price", "frock", "jeans", "mobile", "saree",
+    "shoes", "sandals", "kurti", "tshirt"
+]
+
+
+def old_turn(message):
+    """Per-turn work before: update_topic + build_query_context (two scans) + /chat substring scan."""
+    words = message.lower().split()
+    topic = any(w in words for w in OLD_TOPIC_WORDS)
+    words = message.lower().split()
+    topic = any(w in words for w in OLD_TOPIC_WORDS)
+    search = any(w in message.lower() for w in OLD_SHOPPING_WORDS)
+    return topic, search
+
+
+def new_turn(clf, message):
+    topic = clf.is_new_topic(message)
+    topic = clf.is_new_topic(message)
+    return topic, clf.should_search(message)
+
+
+def accuracy(fn):
+    results = [fn(text) for text, _, _ in LABELLED]
+    return {
+        "topic": round(sum(r[0] == t for r, (_, t, _) in zip(results, LABELLED)) / len(LABELLED), 3),
+        "search": round(sum(r[1] == s for r, (_, _, s) in zip(results, LABELLED)) / len(LABELLED), 3),
+    }
+
+
+def throughput(fn, messages):
+    start = time.perf_counter()
+    for m in messages:
+        fn(m)
+    seconds = time.perf_counter() - start
+    return round(len(messages) / seconds)
+
+
+if __name__ == "__main__":
+    rng = random.Random(SEED)
+    texts = [text for text, _, _ in LABELLED]
+    # every message is new: the memo cache only helps within one turn
+    messages = [f"{rng.choice(texts)} {i}" for i in range(MESSAGES)]
+
+    clf = IntentClassifier()
+    metrics = {
+        "Messages": MESSAGES,
+        "Old keyword lists (turns/sec)": throughput(old_turn, messages),
+        "IntentClassifier (turns/sec)": throughput(lambda m: new_turn(clf, m), messages),
+        "Old accuracy on labelled set": accuracy(old_turn),
+        "IntentClassifier accuracy on labelled set": accuracy(lambda m: new_turn(clf, m)),
+    }
+
+    print("\n===== INTENT CLASSIFIER =====")
+    print(json.dumps(metrics, indent=4))
+    print("=============================")
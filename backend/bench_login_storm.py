@@ -0,0 +1,88 @@
+import os
+import time
+import json
+import sqlite3
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from user_store import UserStore
+
+# ------------------------------------------
+# CONFIG
+# ------------------------------------------
+USERS = 2000
+LOGINS = 5000
+CONCURRENCY = 16
+
+# Password hashing is excluded on purpose: this measures the DB layer only.
+FAKE_HASH = "$2b$12$" + "x" * 53
+
+
+# ------------------------------------------
+# OLD PATH: connect + CREATE TABLE on every call (auth_routes.get_db_connection)
+# ------------------------------------------
+def legacy_lookup(db_path, login):
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS users(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE,
+            email TEXT,
+            name TEXT DEFAULT '',
+            password_hash TEXT,
+            created_at REAL
+        )
+    """)
+    row = conn.execute(
+        "SELECT * FROM users WHERE username=? OR email=?", (login, login)
+    ).fetchone()
+    conn.close()
+    return row
+
+
+def storm(fn, logins):
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        found = sum(1 for r in pool.map(fn, logins) if r)
+    elapsed = time.time() - start
+    return elapsed, found
+
+
+if __name__ == "__main__":
+    tmp = tempfile.mkdtemp()
+
+    # seed two identical databases
+    legacy_db = os.path.join(tmp, "legacy.db")
+    pooled_db = os.path.join(tmp, "pooled.db")
+
+    store = UserStore(pooled_db, pool_size=CONCURRENCY)
+    for i in range(USERS):
+        store.create_user(f"user{i}", f"user{i}@example.com", FAKE_HASH)
+
+    legacy_lookup(legacy_db, "warmup")
+    conn = sqlite3.connect(legacy_db)
+    conn.executemany(
+        "INSERT INTO users(username, email, password_hash, created_at) VALUES (?, ?, ?, ?)",
+        [(f"user{i}", f"user{i}@example.com", FAKE_HASH, time.time()) for i in range(USERS)],
+    )
+    conn.commit()
+    conn.close()
+
+    logins = [f"user{i % USERS}@example.com" for i in range(LOGINS)]
+
+    legacy_s, legacy_found = storm(lambda l: legacy_lookup(legacy_db, l), logins)
+    pooled_s, pooled_found = storm(store.find_by_login, logins)
+
+    metrics = {
+        "Logins": LOGINS,
+        "Concurrency": CONCURRENCY,
+        "Legacy (connect per call) logins/sec": round(LOGINS / legacy_s, 1),
+        "Pooled WAL store logins/sec": round(LOGINS / pooled_s, 1),
+        "Speedup": round(legacy_s / pooled_s, 2),
+        "Rows found (legacy / pooled)": f"{legacy_found} / {pooled_found}",
+    }
+
+    print("\n===== LOGIN STORM (DB LAYER) =====")
+    print(json.dumps(metrics, indent=4))
+    print("==================================")
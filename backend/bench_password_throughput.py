@@ -0,0 +1,84 @@
+import time
+import json
+import asyncio
+
+import bcrypt
+
+from password_service import PasswordService, BCRYPT_ROUNDS
+
+# ------------------------------------------
+# CONFIG
+# ------------------------------------------
+LOGINS = 64            # size of the login burst
+PASSWORD = "hunter2-but-longer"
+
+
+async def probe_loop_lag(stop, samples):
+    """Stands in for /chat: how late does a 10 ms tick fire during the burst?"""
+    while not stop.is_set():
+        t = time.perf_counter()
+        await asyncio.sleep(0.01)
+        samples.append(time.perf_counter() - t - 0.01)
+
+
+async def burst(verify):
+    stop = asyncio.Event()
+    lag = []
+    probe = asyncio.create_task(probe_loop_lag(stop, lag))
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*[verify() for _ in range(LOGINS)])
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await probe
+    return elapsed, results, lag
+
+
+async def main():
+    secret = PASSWORD.encode("utf-8")
+    stored = bcrypt.hashpw(secret, bcrypt.gensalt(BCRYPT_ROUNDS)).decode("ascii")
+
+    # inline: what the old async handlers did
+    async def inline_verify():
+        return bcrypt.checkpw(secret, stored.encode("ascii"))
+
+    service = PasswordService()
+
+    async def pooled_verify():
+        ok, _ = await service.verify(PASSWORD, stored)
+        return ok
+
+    await pooled_verify()   # spin up the process pool outside the timing
+
+    report = []
+    for name, fn in [("inline bcrypt", inline_verify), ("process pool", pooled_verify)]:
+        elapsed, results, lag = await burst(fn)
+        report.append({
+            "mode": name,
+            "logins/sec": round(LOGINS / elapsed, 2),
+            "all verified": all(results),
+            "event-loop lag max (ms)": round(max(lag, default=elapsed) * 1000, 1),
+            "event-loop ticks during burst": len(lag),
+        })
+
+    # rehash-on-login when the cost factor changes
+    cheaper = PasswordService(rounds=max(4, BCRYPT_ROUNDS - 2))
+    ok, new_hash = await cheaper.verify(PASSWORD, stored)
+    report.append({
+        "mode": "cost change",
+        "verified": ok,
+        "rehashed": bool(new_hash),
+        "new cost": new_hash.split("$")[2] if new_hash else None,
+    })
+
+    service.shutdown()
+    cheaper.shutdown()
+
+    print("\n===== LOGIN THROUGHPUT (bcrypt rounds=%d) =====" % BCRYPT_ROUNDS)
+    print(json.dumps(report, indent=4))
+    print("===============================================")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
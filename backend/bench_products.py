@@ -0,0 +1,101 @@
+import time
+import json
+import tracemalloc
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from product import Product, pack_products, unpack_products
+
+# ------------------------------------------
+# CONFIG
+# ------------------------------------------
+N_PRODUCTS = 60        # one /chat turn worth of scraped candidates
+REPEAT = 2000
+
+
+def make_dicts():
+    return [
+        {
+            "title": f"Women Cotton Printed Kurti {i}",
+            "price": 499.0 + i,
+            "image": f"https://m.media-amazon.com/images/I/{i}.jpg",
+            "url": f"https://www.amazon.in/dp/B0{i:08d}",
+            "source": "Amazon",
+        }
+        for i in range(N_PRODUCTS)
+    ]
+
+
+def make_products():
+    return [
+        Product(
+            title=f"Women Cotton Printed Kurti {i}",
+            price=499.0 + i,
+            image=f"https://m.media-amazon.com/images/I/{i}.jpg",
+            url=f"https://www.amazon.in/dp/B0{i:08d}",
+            source="Amazon",
+        )
+        for i in range(N_PRODUCTS)
+    ]
+
+
+def chat_response(products):
+    # what /chat returns (main.chat_response): a Response, so FastAPI skips jsonable_encoder
+    return ORJSONResponse(content={
+        "reply": "Here's what I found for you",
+        "products": [p.to_dict() for p in products],
+        "saved_image": None,
+    })
+
+
+def allocations(factory):
+    tracemalloc.start()
+    snap0 = tracemalloc.take_snapshot()
+    items = factory()
+    snap1 = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = snap1.compare_to(snap0, "filename")
+    size = sum(s.size_diff for s in stats)
+    count = sum(s.count_diff for s in stats)
+    del items
+    return size, count
+
+
+def timed(fn):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        fn()
+    return (time.perf_counter() - start) / REPEAT * 1e6     # µs per call
+
+
+if __name__ == "__main__":
+    dicts, products = make_dicts(), make_products()
+
+    dict_bytes, dict_blocks = allocations(make_dicts)
+    prod_bytes, prod_blocks = allocations(make_products)
+
+    old_payload = {"reply": "Here's what I found for you", "products": dicts, "saved_image": None}
+    new_payload = {"reply": "Here's what I found for you", "products": products, "saved_image": None}
+
+    json_blob = json.dumps(dicts).encode("utf-8")
+    packed_blob = pack_products(products)
+
+    metrics = {
+        "Products": N_PRODUCTS,
+        "dict records: bytes allocated": dict_bytes,
+        "dict records: allocation blocks": dict_blocks,
+        "Product records: bytes allocated": prod_bytes,
+        "Product records: allocation blocks": prod_blocks,
+        "JSONResponse(jsonable_encoder) µs": round(timed(lambda: JSONResponse(jsonable_encoder(old_payload))), 1),
+        "ORJSONResponse(jsonable_encoder(Product)) µs": round(timed(lambda: ORJSONResponse(jsonable_encoder(new_payload))), 1),
+        "chat_response: ORJSONResponse(to_dict) µs": round(timed(lambda: chat_response(products)), 1),
+        "Cache blob bytes (json dicts)": len(json_blob),
+        "Cache blob bytes (packed rows)": len(packed_blob),
+        "Cache unpack µs (json dicts)": round(timed(lambda: json.loads(json_blob)), 1),
+        "Cache unpack µs (packed rows)": round(timed(lambda: unpack_products(packed_blob)), 1),
+    }
+
+    print("\n===== PRODUCT RECORDS + SERIALIZATION =====")
+    print(json.dumps(metrics, indent=4))
+    print("===========================================")
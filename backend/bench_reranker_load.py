@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+import json
+import subprocess
+from statistics import median
+
+# ------------------------------------------
+# CONFIG
+# ------------------------------------------
+ARTIFACT = os.getenv("RERANKER_ARTIFACT", "reranker_artifact")
+IMPORT_RUNS = 3
+TOKENIZE_CALLS = 300
+QUERY = "red cotton dress for women under 500"
+TITLES = [f"Women Red Cotton Printed A-Line Dress Size {i} Party Wear" for i in range(15)]   # one RERANK_TOP_K batch
+
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import crossencoder; "
+    "print(time.perf_counter() - t)"
+)
+
+
+def import_seconds(artifact):
+    """Fresh interpreter per run, so nothing is already cached in-process."""
+    env = dict(os.environ, RERANKER_ARTIFACT=artifact)
+    runs = []
+    for _ in range(IMPORT_RUNS):
+        out = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], env=env,
+                             capture_output=True, text=True, check=True)
+        runs.append(float(out.stdout.strip().splitlines()[-1]))
+    return median(runs)
+
+
+def tokenize_us(tokenizer):
+    start = time.perf_counter()
+    for _ in range(TOKENIZE_CALLS):
+        tokenizer([QUERY] * len(TITLES), TITLES, padding=True, truncation=True, return_tensors="pt")
+    return (time.perf_counter() - start) / TOKENIZE_CALLS * 1e6
+
+
+if __name__ == "__main__":
+    if not os.path.isdir(ARTIFACT):
+        raise SystemExit(f"No {ARTIFACT}/ yet: run export_reranker.py first")
+
+    import joblib
+    from transformers import DistilBertTokenizerFast
+    legacy_tok = joblib.load("crossencoder_tokenizer.pkl")
+    fast_tok = DistilBertTokenizerFast.from_pretrained(ARTIFACT)
+
+    metrics = {
+        "Import crossencoder, legacy pkl + .pt (s)": round(import_seconds(""), 2),
+        f"Import crossencoder, {ARTIFACT} (s)": round(import_seconds(ARTIFACT), 2),
+        f"Tokenize {len(TITLES)} pairs, legacy {type(legacy_tok).__name__} (µs)": round(tokenize_us(legacy_tok), 1),
+        f"Tokenize {len(TITLES)} pairs, {type(fast_tok).__name__} (µs)": round(tokenize_us(fast_tok), 1),
+        "Same token ids": legacy_tok([QUERY], TITLES[:1])["input_ids"] == fast_tok([QUERY], TITLES[:1])["input_ids"],
+    }
+
+    print("\n===== RERANKER LOAD + TOKENIZATION =====")
+    print(json.dumps(metrics, indent=4))
+    print("========================================")
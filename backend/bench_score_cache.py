@@ -0,0 +1,81 @@
+import sys
+import time
+import json
+import random
+
+from crossencoder import compute_relevance_batch
+from score_cache import ScoreCache
+from product import Product
+
+# ------------------------------------------
+# CONFIG
+# ------------------------------------------
+TURNS = 300            # replayed /chat turns
+PRODUCTS_PER_TURN = 10
+SEED = 7
+
+QUERIES = [
+    "red dress", "red dress under 500", "kurti", "cotton kurti", "shoes",
+    "mens running shoes", "mobile", "budget smartphone", "saree", "silk saree",
+]
+
+
+def synthetic_trace():
+    """Zipf-like query popularity; each query draws from a small product pool."""
+    rng = random.Random(SEED)
+    pools = {
+        q: [
+            Product(title=f"{q.title()} item {i}", url=f"https://example.com/{q.replace(' ', '-')}/{i}")
+            for i in range(25)
+        ]
+        for q in QUERIES
+    }
+    weights = [1 / (rank + 1) for rank in range(len(QUERIES))]
+    trace = []
+    for _ in range(TURNS):
+        q = rng.choices(QUERIES, weights=weights)[0]
+        trace.append({"query": q, "products": rng.sample(pools[q], PRODUCTS_PER_TURN)})
+    return trace
+
+
+def load_trace(path):
+    """JSONL with {"query": ..., "products": [{"title", "url"}, ...]} per line."""
+    trace = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                turn = json.loads(line)
+                turn["products"] = [Product(**p) for p in turn["products"]]
+                trace.append(turn)
+    return trace
+
+
+def replay(trace, cache=None):
+    start = time.perf_counter()
+    for turn in trace:
+        if cache is None:
+            compute_relevance_batch(turn["query"], [p.title for p in turn["products"]])
+        else:
+            cache.score_many(turn["query"], turn["products"], compute_relevance_batch)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    trace = load_trace(sys.argv[1]) if len(sys.argv) > 1 else synthetic_trace()
+
+    compute_relevance_batch("warmup", ["warmup"])
+    uncached_s = replay(trace)
+    cache = ScoreCache()
+    cached_s = replay(trace, cache)
+
+    metrics = {
+        "Turns replayed": len(trace),
+        "Uncached seconds": round(uncached_s, 3),
+        "Cached seconds": round(cached_s, 3),
+        "Speedup": round(uncached_s / cached_s, 2) if cached_s else None,
+        **{f"Cache {k}": v for k, v in cache.stats().items()},
+    }
+
+    print("\n===== RERANKER SCORE CACHE =====")
+    print(json.dumps(metrics, indent=4))
+    print("================================")
@@ -0,0 +1,116 @@
+import time
+import json
+import tracemalloc
+
+from scrape_scheduler import ScrapeScheduler
+from stream_parser import ProductStreamParser, parse_products
+
+# ------------------------------------------
+# CONFIG
+# ------------------------------------------
+N_CARDS = 60                # products on the synthetic listing page
+CARD_PADDING = 12000        # markup per card (Amazon cards are ~10-20 KB)
+BANDWIDTH = 5_000_000       # simulated bytes/second from ScraperAPI
+CHUNK = 16384
+LIMIT = 20                  # PARSE_MAX_PER_SOURCE
+
+CARD = (
+    '<div class="s-result-item"><a href="/dp/B{i:08d}/ref=sr_1_{i}">'
+    '<img src="https://m.media-amazon.com/images/I/{i}.jpg"></a>'
+    '<h2><a href="/dp/B{i:08d}/ref=sr_1_{i}"><span>Women Cotton Printed Kurti {i}</span></a></h2>'
+    '<span class="a-price"><span class="a-offscreen">₹{price}</span></span>'
+    '<div class="a-row">{pad}</div></div>'
+)
+
+
+def listing_page():
+    cards = "".join(CARD.format(i=i, price=399 + i, pad="<span>x</span>" * (CARD_PADDING // 14)) for i in range(N_CARDS))
+    return f"<html><body>{cards}</body></html>".encode("utf-8")
+
+
+class SlowResponse:
+    """requests.Response stand-in that trickles the body at BANDWIDTH."""
+
+    status_code = 200
+    encoding = "utf-8"
+
+    def __init__(self, body):
+        self.body = body
+        self.closed = False
+
+    @property
+    def content(self):
+        time.sleep(len(self.body) / BANDWIDTH)
+        return self.body
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding)
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), chunk_size):
+            if self.closed:
+                return
+            chunk = self.body[i:i + chunk_size]
+            time.sleep(len(chunk) / BANDWIDTH)
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+
+def run(mode, body):
+    sent = {"bytes": 0}
+
+    def http_get(url, params=None, headers=None, timeout=None, stream=False):
+        r = SlowResponse(body)
+        if stream:
+            inner = r.iter_content
+            def counted(chunk_size):
+                for chunk in inner(chunk_size):
+                    sent["bytes"] += len(chunk)
+                    yield chunk
+            r.iter_content = counted
+        else:
+            sent["bytes"] += len(body)
+        return r
+
+    sched = ScrapeScheduler(api_key="bench", http_get=http_get, global_rate=1e6, global_burst=1e6,
+                            source_rate=1e6, source_burst=1e6)
+    first = {}
+    start = time.perf_counter()
+    tracemalloc.start()
+    if mode == "stream":
+        def make_parser():
+            return ProductStreamParser("Amazon", LIMIT,
+                                       on_product=lambda p: first.setdefault("t", time.perf_counter() - start))
+        products = sched.stream("https://www.amazon.in/s?k=kurti", make_parser)
+    else:
+        html = sched.fetch("https://www.amazon.in/s?k=kurti")
+        products = parse_products(html, "Amazon", LIMIT)
+        first["t"] = time.perf_counter() - start      # nothing is usable before the full parse
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "products": len(products),
+        "bytes transferred": sent["bytes"],
+        "peak memory (KB)": round(peak / 1024),
+        "time to first product (ms)": round(first.get("t", 0) * 1000, 1),
+        "total time (ms)": round((time.perf_counter() - start) * 1000, 1),
+    }
+
+
+if __name__ == "__main__":
+    body = listing_page()
+    metrics = {
+        "Page size (bytes)": len(body),
+        "Full fetch + parse": run("full", body),
+        "Streaming parse + early close": run("stream", body),
+    }
+
+    print("\n===== STREAMING SCRAPE PARSE =====")
+    print(json.dumps(metrics, indent=4))
+    print("==================================")
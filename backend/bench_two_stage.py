@@ -0,0 +1,68 @@
+import time
+import json
+from statistics import mean
+
+import numpy as np
+
+from crossencoder import compute_relevance_batch
+from retrieval import catalog, encode, stage_one
+
+# ------------------------------------------
+# CONFIG
+# ------------------------------------------
+TEST_QUERIES = [
+    "red frock for girls",
+    "mens black shoes",
+    "budget smartphone",
+    "white tshirt",
+    "kurti under 500",
+    "wireless earbuds",
+    "office laptop bag",
+]
+POOL_SIZE = 200                 # candidates per query (what search + catalog would yield)
+K_VALUES = [5, 10, 15, 25, 50, POOL_SIZE]
+NDCG_AT = 5
+STAGE1_SCORERS = ["dense", "bm25", "hybrid"]
+
+
+def ndcg(ranked_gains, ideal_gains, k=NDCG_AT):
+    def dcg(gains):
+        return sum(g / np.log2(i + 2) for i, g in enumerate(gains[:k]))
+    ideal = dcg(sorted(ideal_gains, reverse=True))
+    return dcg(ranked_gains) / ideal if ideal > 0 else 0.0
+
+
+if __name__ == "__main__":
+    if not len(catalog):
+        raise SystemExit("Needs products_meta.json + product_embs.npz (run product_embs.py)")
+
+    # candidate pools + "ground truth": the cross-encoder over the full pool
+    pools, truth = {}, {}
+    for q in TEST_QUERIES:
+        pool = [catalog.products[row] for _, row in catalog.dense_search(encode([q])[0], POOL_SIZE)]
+        pools[q] = pool
+        truth[q] = {id(p): s for p, s in zip(pool, compute_relevance_batch(q, [p.title for p in pool]))}
+
+    rows = []
+    for scorer, k in [(s, k) for s in STAGE1_SCORERS for k in K_VALUES]:
+        latencies, scores = [], []
+        for q in TEST_QUERIES:
+            start = time.perf_counter()
+            cands = stage_one(q, pools[q], k=k, include_catalog=False, scorer=scorer)
+            ce = compute_relevance_batch(q, [p.title for p in cands])
+            ranked = [p for _, p in sorted(zip(ce, cands), key=lambda x: x[0], reverse=True)]
+            latencies.append(time.perf_counter() - start)
+
+            gains = [truth[q][id(p)] for p in ranked]
+            scores.append(ndcg(gains, list(truth[q].values())))
+
+        rows.append({
+            "Stage one": scorer,
+            "K (sent to cross-encoder)": k,
+            "Latency (avg ms)": round(mean(latencies) * 1000, 1),
+            f"NDCG@{NDCG_AT} vs full rerank": round(mean(scores), 4),
+        })
+
+    print("\n===== TWO-STAGE RETRIEVAL: LATENCY vs NDCG =====")
+    print(json.dumps(rows, indent=4))
+    print("================================================")
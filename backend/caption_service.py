@@ -0,0 +1,229 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from PIL import Image
+
+
+# ================================================================
+# CONFIG
+# ================================================================
+BLIP_MODEL_NAME = os.getenv("BLIP_MODEL_NAME", "Salesforce/blip-image-captioning-base")
+BLIP_FAST_MODE = os.getenv("BLIP_FAST_MODE", "0") == "1"
+BLIP_MAX_LENGTH = int(os.getenv("BLIP_MAX_LENGTH", "30" if BLIP_FAST_MODE else "50"))
+BLIP_NUM_BEAMS = int(os.getenv("BLIP_NUM_BEAMS", "1"))
+BLIP_INT8 = os.getenv("BLIP_INT8", "0") == "1"
+BLIP_BATCH_SIZE = int(os.getenv("BLIP_BATCH_SIZE", "8"))
+BLIP_BATCH_WAIT_MS = int(os.getenv("BLIP_BATCH_WAIT_MS", "25"))
+CAPTION_CACHE_SIZE = int(os.getenv("CAPTION_CACHE_SIZE", "1024"))
+
+
+# ================================================================
+# IMAGE KEYS
+# ================================================================
+def content_hash(data: bytes) -> str:
+    """
+    Exact-match key: SHA-1 of the uploaded bytes. Look-alike photos are not
+    merged: the same cut in another colour is another product.
+    """
+    return hashlib.sha1(data).hexdigest()
+
+
+# ================================================================
+# CAPTION CACHE
+# ================================================================
+class CaptionCache:
+    """LRU cache of BLIP captions, keyed by content hash."""
+
+    def __init__(self, max_size=CAPTION_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()   # key -> caption
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, *keys):
+        with self._lock:
+            for key in keys:
+                if key and key in self._entries:
+                    self._entries.move_to_end(key)
+                    return self._entries[key]
+            return None
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def put(self, caption, *keys):
+        if not caption:
+            return
+        with self._lock:
+            for key in keys:
+                if not key:
+                    continue
+                self._entries[key] = caption
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+# ================================================================
+# BATCHED BLIP CAPTIONER
+# ================================================================
+class BlipCaptioner:
+    """
+    Serves BLIP captions with a cache in front and a batching queue behind.
+
+    Concurrent uploads wait up to BLIP_BATCH_WAIT_MS for each other and are
+    captioned together in a single `generate` call.
+    """
+
+    def __init__(
+        self,
+        model_name=BLIP_MODEL_NAME,
+        max_length=BLIP_MAX_LENGTH,
+        num_beams=BLIP_NUM_BEAMS,
+        int8=BLIP_INT8,
+        batch_size=BLIP_BATCH_SIZE,
+        batch_wait_ms=BLIP_BATCH_WAIT_MS,
+        cache=None,
+    ):
+        self.model_name = model_name
+        self.max_length = max_length
+        self.num_beams = num_beams
+        self.int8 = int8
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait_ms / 1000.0
+        self.cache = cache if cache is not None else CaptionCache()
+
+        self.processor = None
+        self.model = None
+        self._load_lock = threading.Lock()
+
+        self._pending = []              # [(image, Future)]
+        self._cond = threading.Condition()
+        self._worker = None
+
+    # ---------------- model ----------------
+    def ensure_loaded(self):
+        if self.model is not None:
+            return
+        with self._load_lock:
+            if self.model is not None:
+                return
+            from transformers import BlipProcessor, BlipForConditionalGeneration
+
+            print("Loading BLIP image captioning model...")
+            processor = BlipProcessor.from_pretrained(self.model_name)
+            model = BlipForConditionalGeneration.from_pretrained(self.model_name)
+            model.eval()
+
+            if self.int8:
+                import torch
+                model = torch.quantization.quantize_dynamic(
+                    model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+                print("BLIP quantized to int8.")
+
+            self.processor = processor
+            self.model = model
+            print("BLIP model loaded.")
+
+    def generate(self, images):
+        """Caption a list of PIL images in one forward pass."""
+        import torch
+
+        self.ensure_loaded()
+        inputs = self.processor(images=images, return_tensors="pt")
+        with torch.no_grad():
+            output = self.model.generate(
+                **inputs,
+                max_length=self.max_length,
+                num_beams=self.num_beams,
+                do_sample=False,
+            )
+        return [
+            self.processor.decode(seq, skip_special_tokens=True)
+            for seq in output
+        ]
+
+    # ---------------- batching queue ----------------
+    def _start_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+
+                # give concurrent uploads a short window to join the batch
+                deadline = time.monotonic() + self.batch_wait
+                while len(self._pending) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                batch = self._pending[:self.batch_size]
+                self._pending = self._pending[self.batch_size:]
+
+            images = [img for img, _ in batch]
+            try:
+                captions = self.generate(images)
+                for (_, fut), cap in zip(batch, captions):
+                    fut.set_result(cap)
+            except Exception as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+
+    def submit(self, image):
+        """Queue a PIL image for captioning and return a Future."""
+        fut = Future()
+        with self._cond:
+            self._pending.append((image, fut))
+            self._start_worker()
+            self._cond.notify()
+        return fut
+
+    # ---------------- public API ----------------
+    def caption_bytes(self, data: bytes, timeout=60) -> str:
+        c_key = content_hash(data)
+        cached = self.cache.get(c_key)
+        if cached is not None:
+            self.cache.record(hit=True)
+            return cached
+
+        from io import BytesIO
+        image = Image.open(BytesIO(data)).convert("RGB")
+        self.cache.record(hit=False)
+        caption = self.submit(image).result(timeout=timeout)
+        self.cache.put(caption, c_key)
+        return caption
+
+    def caption_file(self, image_path: str, timeout=60) -> str:
+        with open(image_path, "rb") as f:
+            return self.caption_bytes(f.read(), timeout=timeout)
+
+
+captioner = BlipCaptioner()
@@ -0,0 +1,235 @@
+import os
+import re
+import json
+import hashlib
+from pathlib import Path
+from collections import Counter
+
+import numpy as np
+
+
+# ================================================================
+# CONFIG
+# ================================================================
+CATALOG_INDEX_DIR = os.getenv("CATALOG_INDEX_DIR", "catalog_index")
+BM25_K1 = 1.2
+BM25_B = 0.75
+TITLE_WEIGHT = 2        # title terms count twice towards tf
+
+
+def clean_tokens(text):
+    """Same cleaning as train_reranker_real_data: strip punctuation, lowercase, split."""
+    return re.sub(r'[^\w\s]', '', text or "").lower().split()
+
+
+# ================================================================
+# INVERTED INDEX
+# ================================================================
+class CatalogIndex:
+    """
+    BM25 inverted index over catalog titles + descriptions.
+
+    Postings are stored as three flat arrays (offsets, doc ids, tfs) so the
+    whole index can be written as .npy files and memory-mapped back.
+    Queries use term-at-a-time max-score pruning: once the upper bound of
+    the remaining terms cannot lift a new document into the top-k, those
+    terms only update documents that are already candidates.
+    """
+
+    FILES = ("offsets", "doc_ids", "tfs", "doc_len", "idf", "max_score")
+
+    def __init__(self, vocab, offsets, doc_ids, tfs, doc_len, idf, max_score,
+                 k1=BM25_K1, b=BM25_B):
+        self.vocab = vocab              # term -> term id
+        self.offsets = offsets          # (T+1,) int64
+        self.doc_ids = doc_ids          # (P,) int32, sorted within each term
+        self.tfs = tfs                  # (P,) uint16
+        self.doc_len = doc_len          # (N,) float32
+        self.idf = idf                  # (T,) float32
+        self.max_score = max_score      # (T,) float32, BM25 upper bound per term
+        self.k1 = k1
+        self.b = b
+        self.avgdl = float(doc_len.mean()) if len(doc_len) else 1.0
+        self._norm = k1 * (1 - b + b * doc_len / self.avgdl) if len(doc_len) else doc_len
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    # ---------------- build ----------------
+    @classmethod
+    def build(cls, products, k1=BM25_K1, b=BM25_B):
+        term_docs = {}      # term -> {doc: tf}
+        doc_len = np.zeros(len(products), dtype=np.float32)
+
+        for doc, p in enumerate(products):
+            tf = Counter()
+            for tok in clean_tokens(p.get("title", "")):
+                tf[tok] += TITLE_WEIGHT
+            for tok in clean_tokens(p.get("description", "")):
+                tf[tok] += 1
+            doc_len[doc] = sum(tf.values())
+            for tok, n in tf.items():
+                term_docs.setdefault(tok, {})[doc] = n
+
+        terms = sorted(term_docs)
+        vocab = {t: i for i, t in enumerate(terms)}
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        for i, t in enumerate(terms):
+            offsets[i + 1] = offsets[i] + len(term_docs[t])
+
+        doc_ids = np.empty(offsets[-1], dtype=np.int32)
+        tfs = np.empty(offsets[-1], dtype=np.uint16)
+        for i, t in enumerate(terms):
+            docs = sorted(term_docs[t].items())
+            lo, hi = offsets[i], offsets[i + 1]
+            doc_ids[lo:hi] = [d for d, _ in docs]
+            tfs[lo:hi] = [min(n, 65535) for _, n in docs]
+
+        n_docs = max(1, len(products))
+        df = np.diff(offsets).astype(np.float32)
+        idf = np.log(1 + (n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        index = cls(vocab, offsets, doc_ids, tfs, doc_len, idf,
+                    np.zeros(len(terms), dtype=np.float32), k1=k1, b=b)
+        for i in range(len(terms)):
+            _, contrib = index._term_scores(i)
+            index.max_score[i] = contrib.max() if len(contrib) else 0.0
+        return index
+
+    # ---------------- persistence ----------------
+    def save(self, directory=CATALOG_INDEX_DIR, catalog_key=None):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in self.FILES:
+            np.save(directory / f"{name}.npy", np.ascontiguousarray(getattr(self, name)))
+        with open(directory / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "catalog_key": catalog_key, "vocab": self.vocab}, f)
+
+    @classmethod
+    def load(cls, directory=CATALOG_INDEX_DIR, mmap=True):
+        directory = Path(directory)
+        with open(directory / "meta.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        mode = "r" if mmap else None
+        arrays = {name: np.load(directory / f"{name}.npy", mmap_mode=mode) for name in cls.FILES}
+        return cls(meta["vocab"], k1=meta["k1"], b=meta["b"], **arrays)
+
+    @staticmethod
+    def catalog_key(products, k1=BM25_K1, b=BM25_B):
+        """Hash of everything build() reads, so any catalog edit invalidates the saved index."""
+        h = hashlib.sha1(f"{k1}|{b}|{TITLE_WEIGHT}|".encode("utf-8"))
+        for p in products:
+            h.update(json.dumps([p.get("title", ""), p.get("description", "")], ensure_ascii=False).encode("utf-8"))
+        return h.hexdigest()[:16]
+
+    @classmethod
+    def load_or_build(cls, products, directory=CATALOG_INDEX_DIR):
+        directory = Path(directory)
+        key = cls.catalog_key(products)
+        if (directory / "meta.json").exists():
+            with open(directory / "meta.json", "r", encoding="utf-8") as f:
+                saved = json.load(f).get("catalog_key")
+            if saved == key:
+                return cls.load(directory)
+            print("[CatalogIndex] Catalog changed since the index was built, rebuilding")
+        index = cls.build(products)
+        index.save(directory, catalog_key=key)
+        return index
+
+    # ---------------- scoring ----------------
+    def _term_scores(self, term_id, only=None):
+        """
+        BM25 contributions of one term: (doc ids, scores).
+        `only` is an optional boolean mask over the posting list.
+        """
+        lo, hi = self.offsets[term_id], self.offsets[term_id + 1]
+        docs = np.asarray(self.doc_ids[lo:hi])
+        tf = np.asarray(self.tfs[lo:hi], dtype=np.float32)
+        if only is not None:
+            docs, tf = docs[only], tf[only]
+        contrib = self.idf[term_id] * tf * (self.k1 + 1) / (tf + self._norm[docs])
+        return docs, contrib.astype(np.float32)
+
+    def search(self, query, k=10):
+        """Top-k (score, doc_id) pairs for a keyword query, best first."""
+        term_ids = {self.vocab[t] for t in clean_tokens(query) if t in self.vocab}
+        if not term_ids:
+            return []
+
+        # highest upper bound first, so the threshold rises quickly
+        term_ids = sorted(term_ids, key=lambda t: -self.max_score[t])
+        remaining = float(sum(self.max_score[t] for t in term_ids))
+
+        acc = np.zeros(len(self), dtype=np.float32)    # 0 = unseen, -inf = pruned
+        theta = 0.0
+
+        for t in term_ids:
+            remaining -= float(self.max_score[t])
+
+            if theta > 0 and self.max_score[t] + remaining <= theta:
+                # no unseen document can reach the top-k any more:
+                # only score postings of documents that are still candidates
+                lo, hi = self.offsets[t], self.offsets[t + 1]
+                docs, contrib = self._term_scores(t, only=acc[self.doc_ids[lo:hi]] > 0)
+            else:
+                docs, contrib = self._term_scores(t)
+            acc[docs] += contrib
+            if remaining <= 0:
+                break
+
+            cand = np.flatnonzero(acc > 0)
+            theta = self._kth(acc[cand], k)
+            if theta > 0:
+                # drop candidates that cannot catch up with the current k-th score
+                acc[cand[acc[cand] + remaining < theta]] = -np.inf
+
+        cand = np.flatnonzero(acc > 0)
+        if not len(cand):
+            return []
+        k = min(k, len(cand))
+        top = cand[np.argpartition(-acc[cand], k - 1)[:k]]
+        top = top[np.argsort(-acc[top], kind="stable")]
+        return [(float(acc[d]), int(d)) for d in top]
+
+    def score_text(self, query, text):
+        """BM25 of an ad-hoc title (e.g. a scraped product) using the catalog's statistics."""
+        tf = Counter(clean_tokens(text))
+        dl = sum(tf.values()) * TITLE_WEIGHT
+        norm = self.k1 * (1 - self.b + self.b * dl / self.avgdl)
+        score = 0.0
+        for t in set(clean_tokens(query)):
+            if t in tf and t in self.vocab:
+                n = tf[t] * TITLE_WEIGHT
+                score += float(self.idf[self.vocab[t]]) * n * (self.k1 + 1) / (n + norm)
+        return score
+
+    @staticmethod
+    def _kth(scores, k):
+        if len(scores) < k:
+            return 0.0
+        return float(np.partition(scores, len(scores) - k)[len(scores) - k])
+
+
+# ================================================================
+# HYBRID FUSION
+# ================================================================
+def reciprocal_rank_fusion(*rankings, k=60, weights=None):
+    """
+    Fuse several rankings of doc ids (best first) with RRF.
+    Returns [(fused_score, doc_id), ...] best first.
+    """
+    weights = weights or [1.0] * len(rankings)
+    fused = {}
+    for ranking, w in zip(rankings, weights):
+        for rank, doc in enumerate(ranking):
+            fused[doc] = fused.get(doc, 0.0) + w / (k + rank + 1)
+    return sorted(((s, d) for d, s in fused.items()), reverse=True)
+
+
+if __name__ == "__main__":
+    with open(os.getenv("CATALOG_META", "products_meta.json"), "r", encoding="utf-8") as f:
+        items = json.load(f)
+    idx = CatalogIndex.build(items)
+    idx.save(catalog_key=CatalogIndex.catalog_key(items))
+    print(f"Indexed {len(idx)} products, {len(idx.vocab)} terms, "
+          f"{len(idx.doc_ids)} postings → {CATALOG_INDEX_DIR}/")
@@ -0,0 +1,183 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+import numpy as np
+
+
+# ================================================================
+# CONFIG
+# ================================================================
+CATALOG_STORE = os.getenv("CATALOG_STORE", "sqlite")              # sqlite | firestore
+CATALOG_DB = os.getenv("CATALOG_DB", "catalog.db")
+CATALOG_EMBED_BATCH = int(os.getenv("CATALOG_EMBED_BATCH", "256"))  # texts per MiniLM call
+FIRESTORE_BATCH = 500               # Firestore's limit on writes per batch commit
+FIRESTORE_COLLECTION = os.getenv("FIRESTORE_COLLECTION", "products")
+FIRESTORE_KEY = os.getenv("FIRESTORE_KEY", "serviceAccountKey.json")
+FIRESTORE_PROJECT = os.getenv("FIRESTORE_PROJECT", "demo-copilot")   # used with the emulator
+
+
+def product_id(p):
+    """Explicit "id", else a stable hash of the URL (or title)."""
+    if p.get("id"):
+        return str(p["id"])
+    key = p.get("url") or p.get("title") or ""
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def embedding_text(p):
+    return f"{p.get('title') or ''} {p.get('description') or ''}".strip()
+
+
+# ================================================================
+# LOCAL BACKEND (SQLite, embeddings as float32 blobs)
+# ================================================================
+class SQLiteCatalogStore:
+    """
+    One row per product; the embedding is the raw float32 bytes, so
+    load() turns the whole table back into an (N, dim) matrix with a
+    single np.frombuffer.
+    """
+
+    def __init__(self, path=CATALOG_DB):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS products("
+            "id TEXT PRIMARY KEY, title TEXT, description TEXT, price REAL, "
+            "image_url TEXT, url TEXT, category TEXT, dim INTEGER, embedding BLOB)"
+        )
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def upsert_many(self, products, embeddings):
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        rows = [
+            (
+                product_id(p), p.get("title") or "", p.get("description") or "", p.get("price"),
+                p.get("image_url") or p.get("image") or "", p.get("url") or "", p.get("category") or "",
+                int(emb.shape[0]), emb.tobytes(),
+            )
+            for p, emb in zip(products, embeddings)
+        ]
+        conn = self._conn()
+        with conn:      # one transaction per batch
+            conn.executemany("INSERT OR REPLACE INTO products VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+    def load(self):
+        """(list of product dicts, (N, dim) float32 embeddings), in id order."""
+        cur = self._conn().execute(
+            "SELECT id, title, description, price, image_url, url, category, dim, embedding "
+            "FROM products ORDER BY id"
+        )
+        products, blobs, dim = [], [], 0
+        for pid, title, desc, price, image, url, category, dim, blob in cur:
+            products.append({
+                "id": pid, "title": title, "description": desc, "price": price,
+                "image_url": image, "url": url, "category": category,
+            })
+            blobs.append(blob)
+        if not blobs:
+            return products, np.zeros((0, 0), dtype=np.float32)
+        return products, np.frombuffer(b"".join(blobs), dtype=np.float32).reshape(len(blobs), dim)
+
+
+# ================================================================
+# FIRESTORE BACKEND (optional)
+# ================================================================
+def firestore_client():
+    """
+    Emulator when FIRESTORE_EMULATOR_HOST is set (no credentials needed),
+    otherwise the service-account key, as firestore_setup.py used to do.
+    """
+    if os.getenv("FIRESTORE_EMULATOR_HOST"):
+        from google.cloud import firestore
+        return firestore.Client(project=FIRESTORE_PROJECT)
+
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(credentials.Certificate(FIRESTORE_KEY))
+    return firestore.client()
+
+
+class FirestoreCatalogStore:
+    """Documents written with batched commits of up to FIRESTORE_BATCH writes."""
+
+    def __init__(self, client=None, collection=FIRESTORE_COLLECTION, batch_size=FIRESTORE_BATCH):
+        self.db = client or firestore_client()
+        self.collection = self.db.collection(collection)
+        self.batch_size = min(batch_size, FIRESTORE_BATCH)
+        self.commits = 0
+
+    def upsert_many(self, products, embeddings):
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        written = 0
+        for start in range(0, len(products), self.batch_size):
+            batch = self.db.batch()
+            for p, emb in zip(products[start:start + self.batch_size], embeddings[start:start + self.batch_size]):
+                batch.set(self.collection.document(product_id(p)), {
+                    "title": p.get("title") or "",
+                    "description": p.get("description") or "",
+                    "price": p.get("price"),
+                    "image_url": p.get("image_url") or p.get("image") or "",
+                    "url": p.get("url") or "",
+                    "category": p.get("category") or "",
+                    "embedding": emb.tolist(),
+                })
+                written += 1
+            batch.commit()
+            self.commits += 1
+        return written
+
+
+def make_store(kind=CATALOG_STORE):
+    if kind == "firestore":
+        return FirestoreCatalogStore()
+    if kind == "sqlite":
+        return SQLiteCatalogStore()
+    raise ValueError(f"Unknown CATALOG_STORE {kind!r} (use sqlite or firestore)")
+
+
+# ================================================================
+# LOADER
+# ================================================================
+def load_catalog(products, store, encode, batch_size=CATALOG_EMBED_BATCH):
+    """
+    Embeds products `batch_size` at a time (encode(list of texts) -> (n, dim))
+    and writes each batch to `store`. Returns throughput numbers.
+    """
+    embed_s = write_s = 0.0
+    written = 0
+    start = time.perf_counter()
+    for i in range(0, len(products), batch_size):
+        chunk = products[i:i + batch_size]
+        t0 = time.perf_counter()
+        vecs = encode([embedding_text(p) for p in chunk])
+        t1 = time.perf_counter()
+        written += store.upsert_many(chunk, vecs)
+        t2 = time.perf_counter()
+        embed_s += t1 - t0
+        write_s += t2 - t1
+    seconds = time.perf_counter() - start
+    return {
+        "products": written,
+        "seconds": round(seconds, 3),
+        "embed_seconds": round(embed_s, 3),
+        "write_seconds": round(write_s, 3),
+        "products_per_second": round(written / seconds, 1) if seconds else None,
+    }
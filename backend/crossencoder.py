@@ -1,38 +1,47 @@
+import os
 import torch
-import torch.nn as nn
-from transformers import DistilBertModel
-import joblib
 
-class CrossEncoder(nn.Module):
-    def __init__(self):
-        super().__init__()
-        self.bert = DistilBertModel.from_pretrained("distilbert-base-uncased")
-        self.fc = nn.Linear(768, 1)
-        self.sigmoid = nn.Sigmoid()
-
-    def forward(self, queries, products, tokenizer):
-        encoded = tokenizer(
-            queries,
-            products,
-            padding=True,
-            truncation=True,
-            return_tensors="pt"
-        )
-        outputs = self.bert(
-            input_ids=encoded["input_ids"],
-            attention_mask=encoded["attention_mask"]
-        )
-        cls = outputs.last_hidden_state[:, 0, :]
-        return self.sigmoid(self.fc(cls))
+from reranker_model import (
+    BASE_MODEL, RERANKER_WEIGHTS, RERANKER_ARTIFACT, CHECKPOINT_FORMAT, ARTIFACT_VERSION,
+    CrossEncoder, load_reranker, save_artifact, load_artifact, weights_id,
+)
 
 # Load tokenizer + model
 
-tokenizer = joblib.load("crossencoder_tokenizer.pkl")
-reranker = CrossEncoder()
-reranker.load_state_dict(torch.load("crossencoder_reranker.pt", map_location="cpu"))
-reranker.eval()
+if os.path.isdir(RERANKER_ARTIFACT):
+    reranker, tokenizer = load_artifact()
+    RERANKER_ID = weights_id(os.path.join(RERANKER_ARTIFACT, "model.safetensors"))
+else:
+    # legacy: pickled slow tokenizer + torch.load over from_pretrained weights (export_reranker.py converts)
+    import joblib
+    tokenizer = joblib.load("crossencoder_tokenizer.pkl")
+    reranker = load_reranker()
+    RERANKER_ID = weights_id(RERANKER_WEIGHTS)
 
 def compute_relevance(query, title):
     with torch.no_grad():
         score = reranker([query], [title], tokenizer).item()
     return score
+
+def compute_relevance_batch(query, titles):
+    """Score many titles against one query in a single forward pass."""
+    if not titles:
+        return []
+    with torch.no_grad():
+        scores = reranker([query] * len(titles), list(titles), tokenizer)
+    return scores.view(-1).tolist()
+
+def compute_relevance_pairs(queries, titles, batch_size=256):
+    """
+    Scores for (queries[i], titles[i]) pairs from many different queries
+    (offline batch scoring). Pairs are sorted by length so each batch pads little.
+    """
+    order = sorted(range(len(titles)), key=lambda i: len(queries[i]) + len(titles[i]))
+    scores = [0.0] * len(titles)
+    with torch.no_grad():
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            out = reranker([queries[i] for i in idx], [titles[i] for i in idx], tokenizer)
+            for i, score in zip(idx, out.view(-1).tolist()):
+                scores[i] = score
+    return scores
@@ -0,0 +1,176 @@
+import os
+import json
+import time
+import random
+from statistics import mean
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from crossencoder import CrossEncoder, load_reranker, save_artifact, tokenizer, CHECKPOINT_FORMAT, BASE_MODEL
+from reranker_training import (
+    SEED, TRAIN_CACHE_DIR, TRAIN_MAX_LEN, seed_everything, build_pairs, train_test_split,
+    PretokenizedDataset, make_loader, train, predict,
+)
+
+# ------------------------------------------
+# CONFIG
+# ------------------------------------------
+TEACHER_WEIGHTS = os.getenv("TEACHER_WEIGHTS", "crossencoder_reranker.pt")
+STUDENT_LAYERS = [int(n) for n in os.getenv("STUDENT_LAYERS", "2,3,4").split(",")]
+HARD_LABEL_WEIGHT = float(os.getenv("DISTILL_HARD_WEIGHT", "0.2"))    # rest comes from the teacher
+EPOCHS = int(os.getenv("DISTILL_EPOCHS", "3"))
+CHECKPOINT_VERSION = 2
+
+EVAL_QUERIES = 200      # held-out queries in the comparison table
+POOL_SIZE = 20          # candidates ranked per query
+LATENCY_BATCH = 15      # titles per rerank call (RERANK_TOP_K)
+NDCG_AT = 5
+
+
+class EncodedScorer(nn.Module):
+    """CrossEncoder called with pre-tokenized batches, as reranker_training expects."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, enc):
+        return self.model.score_encoded(enc)
+
+
+def init_student(teacher, n_layers):
+    """Student = teacher embeddings + n evenly spaced teacher layers + teacher head."""
+    student = CrossEncoder(n_layers=n_layers)
+    layers = teacher.bert.transformer.layer
+    keep = np.linspace(0, len(layers) - 1, n_layers).round().astype(int)
+    student.bert.embeddings.load_state_dict(teacher.bert.embeddings.state_dict())
+    for dst, src in zip(student.bert.transformer.layer, keep):
+        dst.load_state_dict(layers[src].state_dict())
+    student.fc.load_state_dict(teacher.fc.state_dict())
+    return student
+
+
+def export(student, n_layers, path):
+    torch.save({
+        "format": CHECKPOINT_FORMAT,
+        "version": CHECKPOINT_VERSION,
+        "base": BASE_MODEL,
+        "n_layers": n_layers,
+        "teacher": TEACHER_WEIGHTS,
+        "state_dict": student.state_dict(),
+    }, path)
+
+
+# ------------------------------------------
+# COMPARISON TABLE
+# ------------------------------------------
+def ndcg(ranked_gains, ideal_gains, k=NDCG_AT):
+    def dcg(gains):
+        return sum(g / np.log2(i + 2) for i, g in enumerate(gains[:k]))
+    ideal = dcg(sorted(ideal_gains, reverse=True))
+    return dcg(ranked_gains) / ideal if ideal > 0 else 0.0
+
+
+def eval_pools(test_pairs, titles, seed=SEED):
+    """query -> (candidate titles, binary gains): its positives + negatives + random fillers."""
+    rng = random.Random(seed)
+    by_query = {}
+    for q, t, label in test_pairs:
+        by_query.setdefault(q, {})[t] = max(label, by_query.get(q, {}).get(t, 0.0))
+    pools = {}
+    for q in sorted(by_query)[:EVAL_QUERIES]:
+        cands = dict(by_query[q])
+        while len(cands) < POOL_SIZE:
+            cands.setdefault(rng.choice(titles), 0.0)
+        pools[q] = (list(cands), list(cands.values()))
+    return pools
+
+
+def compare(models, pools):
+    teacher_scores = {}
+    rows = []
+    for name, model in models:
+        latencies, vs_labels, vs_teacher = [], [], []
+        with torch.no_grad():
+            for q, (cands, gains) in pools.items():
+                start = time.perf_counter()
+                model([q] * LATENCY_BATCH, cands[:LATENCY_BATCH], tokenizer)
+                latencies.append(time.perf_counter() - start)
+
+                scores = model([q] * len(cands), cands, tokenizer).view(-1).tolist()
+                if name == "teacher":
+                    teacher_scores[q] = scores
+                order = np.argsort(scores)[::-1]
+                vs_labels.append(ndcg([gains[i] for i in order], gains))
+                t = teacher_scores[q]
+                vs_teacher.append(ndcg([t[i] for i in order], t))
+
+        rows.append({
+            "Model": name,
+            "Layers": len(model.bert.transformer.layer),
+            "Params (M)": round(sum(p.numel() for p in model.parameters()) / 1e6, 1),
+            f"CPU latency, {LATENCY_BATCH} titles (avg ms)": round(mean(latencies) * 1000, 1),
+            f"CPU latency, {LATENCY_BATCH} titles (p95 ms)": round(sorted(latencies)[int(0.95 * (len(latencies) - 1))] * 1000, 1),
+            f"NDCG@{NDCG_AT} (held-out labels)": round(mean(vs_labels), 4),
+            f"NDCG@{NDCG_AT} vs teacher": round(mean(vs_teacher), 4),
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    seed_everything()
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    with open("products_meta.json", "r", encoding="utf-8") as f:
+        raw_data = json.load(f)
+    titles = [item["title"] for item in raw_data if item.get("title")]
+
+    # more negatives than train_reranker_real_data: the teacher labels them, not the heuristic
+    pairs = build_pairs(raw_data, seed=SEED) + build_pairs(raw_data, hard_ratio=0.5, seed=SEED + 1)
+    train_pairs, test_pairs = train_test_split(pairs, test_size=0.2)
+    print(f"Distillation pairs: {len(train_pairs)} train / {len(test_pairs)} held-out")
+
+    teacher = load_reranker(TEACHER_WEIGHTS).to(device)
+    train_set = PretokenizedDataset.load_or_build(train_pairs, tokenizer, "distill-train")
+
+    # teacher scores once, cached next to the tokenized data
+    teacher_id = f"{TRAIN_MAX_LEN}|{TEACHER_WEIGHTS}|{os.path.getmtime(TEACHER_WEIGHTS)}"
+    key = PretokenizedDataset.cache_key(train_pairs, tokenizer, teacher_id)
+    cached = TRAIN_CACHE_DIR / f"teacher-{key}.npy"
+    if cached.exists():
+        soft = np.load(cached)
+    else:
+        t0 = time.perf_counter()
+        soft = predict(EncodedScorer(teacher), train_set, device)
+        TRAIN_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        np.save(cached, soft)
+        print(f"Teacher scored {len(soft)} pairs in {time.perf_counter() - t0:.1f}s")
+
+    # BCE is linear in the target, so this equals HARD·BCE(label) + (1-HARD)·BCE(teacher)
+    train_set.labels = (HARD_LABEL_WEIGHT * np.asarray(train_set.labels)
+                        + (1 - HARD_LABEL_WEIGHT) * soft).astype(np.float32)
+    loader = make_loader(train_set, batch_size=32, shuffle=True)
+
+    models = [("teacher", teacher.cpu())]
+    for n in STUDENT_LAYERS:
+        print(f"\nDistilling {n}-layer student...")
+        student = init_student(teacher, n).to(device)
+        stats = train(EncodedScorer(student), loader,
+                      torch.optim.Adam(student.parameters(), lr=5e-5), nn.BCELoss(), device, epochs=EPOCHS)
+        print(f"{stats['examples_per_second']:.1f} examples/sec")
+
+        path = f"crossencoder_student_{n}l.pt"
+        export(student, n, path)
+        artifact = f"reranker_artifact_{n}l"
+        save_artifact(student.cpu(), tokenizer, artifact, teacher=TEACHER_WEIGHTS, distilled=True)
+        print(f"Saved {path} and {artifact}/ (serve it with RERANKER_ARTIFACT={artifact})")
+        models.append((f"student-{n}l", student.cpu().eval()))
+
+    torch.set_num_threads(int(os.getenv("BENCH_THREADS", "1")))    # per-request CPU budget when serving
+    rows = compare(models, eval_pools(test_pairs, titles))
+
+    print("\n===== DISTILLED RERANKER: CPU LATENCY vs NDCG =====")
+    print(json.dumps(rows, indent=4))
+    print("===================================================")
@@ -71,7 +71,7 @@ for query in TEST_QUERIES:
     # Top-K embedding similarity
     if len(products) > 0:
         q_emb = embed(query)
-        prod_embs = [embed(p["title"]) for p in products[:K]]
+        prod_embs = [embed(p.title) for p in products[:K]]
 
         sims = []
         for pe in prod_embs:
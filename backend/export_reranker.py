@@ -0,0 +1,38 @@
+import os
+import sys
+import json
+
+# ------------------------------------------
+# Converts the legacy reranker files (crossencoder_tokenizer.pkl +
+# crossencoder_reranker.pt, or a distilled crossencoder_student_<n>l.pt)
+# into a v3 artifact directory that crossencoder.py loads directly:
+#
+#   python export_reranker.py                       → reranker_artifact/
+#   python export_reranker.py crossencoder_student_3l.pt reranker_artifact_3l
+#
+# The tokenizer comes from reranker_artifact/ when train_reranker.py already
+# wrote one, else from the legacy pickle.
+#
+# Only the weights being exported are loaded (reranker_model.py, not the
+# serving model crossencoder.py loads at import).
+# ------------------------------------------
+from transformers import DistilBertTokenizerFast
+from reranker_model import load_reranker, save_artifact, RERANKER_WEIGHTS, RERANKER_ARTIFACT
+
+
+def load_tokenizer():
+    if os.path.isdir(RERANKER_ARTIFACT):
+        return DistilBertTokenizerFast.from_pretrained(RERANKER_ARTIFACT)
+    import joblib
+    return joblib.load("crossencoder_tokenizer.pkl")
+
+
+if __name__ == "__main__":
+    weights = sys.argv[1] if len(sys.argv) > 1 else RERANKER_WEIGHTS
+    out_dir = sys.argv[2] if len(sys.argv) > 2 else "reranker_artifact"
+
+    model = load_reranker(weights)
+    tokenizer = load_tokenizer()
+    save_artifact(model, tokenizer, out_dir, source=weights)
+
+    print(json.dumps({"Exported": weights, "Artifact": out_dir}, indent=4))
@@ -1,33 +1,49 @@
 # backend/firestore_setup.py
-import os
+import sys
+import json
+
 from sentence_transformers import SentenceTransformer
-import firebase_admin
-from firebase_admin import credentials, firestore
 
-# set path to your key
-KEY = "serviceAccountKey.json"
-cred = credentials.Certificate(KEY)
-firebase_admin.initialize_app(cred)
-db = firestore.client()
+from catalog_store import make_store, load_catalog, CATALOG_STORE, CATALOG_EMBED_BATCH
 
-sbert = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+# ------------------------------------------
+# Loads a product list into the catalog store (see catalog_store.py):
+#
+#   python firestore_setup.py                         → example products
+#   python firestore_setup.py products_meta.json
+#
+# CATALOG_STORE=sqlite (default) writes catalog.db locally, no Firebase needed.
+# CATALOG_STORE=firestore uses serviceAccountKey.json, or the emulator when
+# FIRESTORE_EMULATOR_HOST is set.
+# ------------------------------------------
 
-# Example product list (or load CSV)
+# Example product list (or pass a JSON file)
 products = [
     {"id": "p1", "title": "Blue casual shirt", "description": "Men's full-sleeve denim blue shirt", "price": 1299, "image_url": "" },
     {"id": "p2", "title": "Black leather wallet", "description": "Compact genuine leather wallet for men", "price": 599, "image_url": "" },
     {"id": "p3", "title": "Analog wrist watch", "description": "Classic analog watch with leather strap", "price": 2499, "image_url": "" },
 ]
 
-for p in products:
-    text = (p["title"] + " " + p["description"]).strip()
-    emb = sbert.encode(text, convert_to_numpy=True).tolist()
-    doc_ref = db.collection("products").document(p["id"])
-    doc_ref.set({
-        "title": p["title"],
-        "description": p["description"],
-        "price": p["price"],
-        "image_url": p["image_url"],
-        "embedding": emb,
-    })
-    print("Uploaded", p["id"])
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "r", encoding="utf-8") as f:
+            products = json.load(f)
+
+    sbert = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+
+    def encode(texts):
+        return sbert.encode(texts, batch_size=64, convert_to_numpy=True, show_progress_bar=False)
+
+    stats = load_catalog(products, make_store(), encode)
+
+    print("\n===== CATALOG UPLOAD =====")
+    print(json.dumps({
+        "Store": CATALOG_STORE,
+        "Embed batch": CATALOG_EMBED_BATCH,
+        "Products": stats["products"],
+        "Seconds": stats["seconds"],
+        "Embedding seconds": stats["embed_seconds"],
+        "Write seconds": stats["write_seconds"],
+        "Products/sec": stats["products_per_second"],
+    }, indent=4))
+    print("==========================")
@@ -0,0 +1,97 @@
+import os
+import re
+from functools import lru_cache
+
+import numpy as np
+
+from attribute_store import CATEGORY_KEYWORDS, normalize_text, word_forms
+
+
+# ================================================================
+# CONFIG
+# ================================================================
+# a message with no product keyword can still start a new topic when its
+# MiniLM vector (already computed for vector memory) is far from the topic's
+INTENT_EMBEDDING_SHIFT = os.getenv("INTENT_EMBEDDING_SHIFT", "0") == "1"
+INTENT_SHIFT_THRESHOLD = float(os.getenv("INTENT_SHIFT_THRESHOLD", "0.25"))   # cosine below → shift
+INTENT_SHIFT_MIN_WORDS = 2      # "under 500" / "in maroon" are refinements, never shifts
+
+# words that ask for a search without naming a product
+SEARCH_WORDS = {"show", "find", "buy", "price", "prices", "search", "shop", "order"}
+
+# filler and refinement words that say nothing about the topic
+REFINEMENT_WORDS = {
+    "a", "an", "the", "i", "me", "my", "want", "need", "please", "for", "to", "of",
+    "and", "or", "with", "some", "any", "can", "you", "is", "it", "this", "that",
+    "in", "on", "something", "like", "also", "get", "under", "below", "above",
+    "over", "less", "than", "more", "cheaper", "size", "color", "colour", "only",
+    "same", "but", "one", "ones", "other", "another", "rs", "inr", "around",
+}
+
+_WORD_RE = re.compile(r"[a-z]+")
+
+
+class IntentClassifier:
+    """
+    Keyword intent for chat messages, shared by MemoryManager (topic
+    tracking) and /chat (whether to scrape).
+
+    Keywords are a few set lookups per word (CATEGORY_KEYWORDS from
+    attribute_store plus SEARCH_WORDS, each word also tried without its
+    plural "s" / "es"), and classify() is memoised per text, so the
+    several checks made on one message tokenize it once.
+    """
+
+    def __init__(self, product_words=CATEGORY_KEYWORDS, search_words=SEARCH_WORDS,
+                 embedding_shift=INTENT_EMBEDDING_SHIFT, shift_threshold=INTENT_SHIFT_THRESHOLD):
+        self.product_words = dict(product_words)
+        self.search_words = frozenset(search_words) | frozenset(self.product_words)
+        self.embedding_shift = embedding_shift
+        self.shift_threshold = shift_threshold
+        self.classify = lru_cache(maxsize=1024)(self._classify)
+
+    def _keyword(self, word):
+        """`word` as a known keyword ("kurtas" → "kurta"), else unchanged."""
+        return next((f for f in word_forms(word) if f in self.search_words), word)
+
+    def _classify(self, text):
+        """text → {"category", "new_topic", "search", "content_words"}"""
+        words = [self._keyword(w) for w in _WORD_RE.findall(normalize_text(text))]
+        category = next((self.product_words[w] for w in words if w in self.product_words), None)
+        return {
+            "category": category,
+            "new_topic": category is not None,
+            "search": category is not None or any(w in self.search_words for w in words),
+            "content_words": sum(1 for w in words if len(w) > 2 and w not in REFINEMENT_WORDS),
+        }
+
+    def category(self, text):
+        return self.classify(text)["category"]
+
+    def should_search(self, text):
+        return self.classify(text)["search"]
+
+    def is_new_topic(self, text, vector=None, topic_vector=None):
+        """
+        A product keyword always starts a new topic. Without one, and with
+        embedding shift enabled, a message with enough content words whose
+        vector has cosine < shift_threshold to the topic's is a shift too.
+        """
+        intent = self.classify(text)
+        if intent["new_topic"]:
+            return True
+        if not self.embedding_shift or vector is None or topic_vector is None:
+            return False
+        if intent["content_words"] < INTENT_SHIFT_MIN_WORDS:
+            return False
+        return cosine(vector, topic_vector) < self.shift_threshold
+
+
+def cosine(a, b):
+    a = np.asarray(a, dtype=np.float32).reshape(-1)
+    b = np.asarray(b, dtype=np.float32).reshape(-1)
+    denom = float(np.linalg.norm(a) * np.linalg.norm(b))
+    return float(a @ b) / denom if denom else 0.0
+
+
+intent_classifier = IntentClassifier()
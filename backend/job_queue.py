@@ -0,0 +1,175 @@
+import os
+import time
+import queue
+import asyncio
+import threading
+
+from metrics import metrics
+
+
+# ================================================================
+# CONFIG
+# ================================================================
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "1000"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "0.5"))     # seconds, doubled per retry
+JOB_DRAIN_TIMEOUT = float(os.getenv("JOB_DRAIN_TIMEOUT", "10"))      # seconds on shutdown
+
+_STOP = object()
+
+
+class Job:
+    __slots__ = ("name", "fn", "args", "kwargs", "submitted", "attempts")
+
+    def __init__(self, name, fn, args, kwargs):
+        self.name = name
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.submitted = time.monotonic()
+        self.attempts = 0
+
+
+class JobQueue:
+    """
+    Bounded in-process queue for work the reply does not wait on
+    (vector-memory writes, saving uploads, response-cache writes, cleanup).
+
+        job_queue.submit("vector_memory.add", vector_memory.add_memory, text)
+
+    - a fixed pool of daemon worker threads
+    - failed jobs are retried with exponential backoff, up to max_attempts
+    - when the queue is full, or before start(), the caller runs the job
+      itself, so work is delayed at worst, never lost (from the event
+      loop, use submit_async: the inline run goes to a thread)
+    - drain() stops intake and waits for queued jobs (app shutdown)
+    - lag (submit → start), run time and depth are exported as metrics
+    """
+
+    def __init__(self, max_size=JOB_QUEUE_SIZE, workers=JOB_WORKERS,
+                 max_attempts=JOB_MAX_ATTEMPTS, backoff=JOB_RETRY_BACKOFF):
+        self.max_size = max_size
+        self.workers = workers
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self._queue = queue.Queue(maxsize=max_size)
+        self._threads = []
+        self._accepting = False
+        self._lock = threading.Lock()
+
+    # ---------------- lifecycle ----------------
+    def start(self):
+        with self._lock:
+            if self._accepting:
+                return
+            self._accepting = True
+            self._threads = [
+                threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for t in self._threads:
+                t.start()
+
+    def drain(self, timeout=JOB_DRAIN_TIMEOUT):
+        """Stop accepting jobs, finish the queued ones. False if `timeout` ran out first."""
+        with self._lock:
+            if not self._accepting:
+                return True
+            self._accepting = False
+            threads = self._threads
+            self._threads = []
+
+        deadline = time.monotonic() + timeout
+        for _ in threads:
+            self._queue.put(_STOP)          # after every queued job (FIFO)
+        for t in threads:
+            t.join(max(0.0, deadline - time.monotonic()))
+        if any(t.is_alive() for t in threads):
+            left = self._queue.qsize()
+            print(f"[JobQueue] drain timed out, {left} job(s) left")
+            metrics.inc("jobs.abandoned", left)
+            return False
+
+        # jobs that raced in behind the stop markers
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                return True
+            if job is not _STOP:
+                self._execute(job, retry_sleep=False)
+
+    # ---------------- submit ----------------
+    def _enqueue(self, job):
+        if self._accepting:
+            try:
+                self._queue.put_nowait(job)
+                metrics.inc("jobs.submitted")
+                metrics.gauge("jobs.depth", self._queue.qsize())
+                return True
+            except queue.Full:
+                metrics.inc("jobs.inline_full")
+        else:
+            metrics.inc("jobs.inline_stopped")
+        return False
+
+    def submit(self, name, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs). Returns True if queued, False if it ran inline."""
+        job = Job(name, fn, args, kwargs)
+        if self._enqueue(job):
+            return True
+        self._execute(job, retry_sleep=False)
+        return False
+
+    async def submit_async(self, name, fn, *args, **kwargs):
+        """submit() for coroutines: an inline run happens in a worker thread, not on the event loop."""
+        job = Job(name, fn, args, kwargs)
+        if self._enqueue(job):
+            return True
+        await asyncio.to_thread(self._execute, job, False)
+        return False
+
+    # ---------------- workers ----------------
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is _STOP:
+                    return
+                metrics.observe("jobs.lag_seconds", time.monotonic() - job.submitted)
+                self._execute(job)
+            finally:
+                self._queue.task_done()
+                metrics.gauge("jobs.depth", self._queue.qsize())
+
+    def _execute(self, job, retry_sleep=True):
+        while True:
+            job.attempts += 1
+            t0 = time.perf_counter()
+            try:
+                job.fn(*job.args, **job.kwargs)
+                metrics.observe(f"jobs.run_seconds.{job.name}", time.perf_counter() - t0)
+                metrics.inc("jobs.ok")
+                return
+            except Exception as e:
+                if job.attempts >= self.max_attempts:
+                    print(f"[JobQueue] {job.name} failed after {job.attempts} attempt(s):", e)
+                    metrics.inc("jobs.failed")
+                    metrics.inc(f"jobs.failed.{job.name}")
+                    return
+                metrics.inc("jobs.retried")
+                if retry_sleep:
+                    time.sleep(self.backoff * (2 ** (job.attempts - 1)))
+
+    def stats(self):
+        return {
+            "running": self._accepting,
+            "workers": len(self._threads),
+            "depth": self._queue.qsize(),
+            "max_size": self.max_size,
+            "lag_seconds": metrics.summary("jobs.lag_seconds"),
+        }
+
+
+job_queue = JobQueue()
@@ -1,37 +1,56 @@
 import os
+import hmac
 import time
-import sqlite3
+import asyncio
+import threading
 import json
 import urllib.parse
 from pathlib import Path
 
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, Request, UploadFile, File, Form, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
-from passlib.context import CryptContext
 
-import requests
-from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 import cohere
 
-from crossencoder import compute_relevance
-from memory_manager import memory
-from vector_memory import vector_memory
+# load .env before local modules read their config at import time
+load_dotenv()
 
-from transformers import BlipProcessor, BlipForConditionalGeneration
-from PIL import Image
+from crossencoder import compute_relevance_batch, RERANKER_ID
+from vector_memory import vector_memory
+from caption_service import captioner, CAPTION_CACHE_SIZE
+from user_store import user_store, UserExistsError, PoolTimeoutError
+from password_service import password_service, PasswordServiceBusy
+from session_tokens import session_tokens, bearer_token
+from scrape_scheduler import scheduler, INTERACTIVE, BACKGROUND
+from result_cache import result_cache
+from score_cache import score_cache
+from response_cache import response_cache, RESPONSE_CACHE_ENABLED
+from retrieval import two_stage_rank, RERANK_TOP_K
+from attribute_store import parse_constraints, detect_category
+from stream_parser import ProductStreamParser, parse_products
+from prefetch import prefetcher, PREFETCH_ENABLED
+from source_manager import source_manager
+from prompt_builder import build_prompt
+from intent_classifier import intent_classifier
+from shared_state import SHARED_BACKEND, session_memory, affinity_key, AFFINITY_COOKIE
+from pipeline import Pipeline
+from job_queue import job_queue
+from batch_recommend import recommend_chunk, read_chunks, RECO_MAX_BATCH
+from profiler import profiler, dir_size
+from metrics import metrics
 
 
 # ================================================================
 # ENV + CONFIG
 # ================================================================
-load_dotenv()
-
 COHERE_API_KEY = os.getenv("COHERE_API_KEY", "")
 SCRAPER_API_KEY = os.getenv("SCRAPER_API_KEY", "")
 COHERE_MODEL = os.getenv("COHERE_MODEL", "command-r-plus-08-2024")
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")      # /admin/* is disabled when empty
 
 if not COHERE_API_KEY:
     print("⚠ WARNING: No Cohere API key in .env")
@@ -40,12 +59,29 @@ if not SCRAPER_API_KEY:
 
 co = cohere.Client(COHERE_API_KEY)
 
-pwdctx = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 UPLOAD_DIR = Path("./static/uploads")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+UPLOAD_RETENTION_HOURS = float(os.getenv("UPLOAD_RETENTION_HOURS", "0"))   # 0 = keep uploads forever
+UPLOAD_CLEANUP_INTERVAL = 3600      # seconds between cleanup jobs
+_last_upload_cleanup = 0.0
+
 
-DB_PATH = Path("data.db")
+def cleanup_uploads():
+    """Delete uploads older than UPLOAD_RETENTION_HOURS (runs on the job queue)."""
+    cutoff = time.time() - UPLOAD_RETENTION_HOURS * 3600
+    removed = 0
+    for path in UPLOAD_DIR.iterdir():
+        if path.is_file() and path.stat().st_mtime < cutoff:
+            path.unlink(missing_ok=True)
+            removed += 1
+    metrics.inc("uploads.cleaned", removed)
+
+
+async def schedule_upload_cleanup():
+    global _last_upload_cleanup
+    if UPLOAD_RETENTION_HOURS > 0 and time.time() - _last_upload_cleanup > UPLOAD_CLEANUP_INTERVAL:
+        _last_upload_cleanup = time.time()
+        await job_queue.submit_async("uploads.cleanup", cleanup_uploads)
 
 
 # ================================================================
@@ -93,34 +129,6 @@ YOUR GOAL:
 """
 
 
-# ================================================================
-# DB INIT
-# ================================================================
-def get_conn():
-    conn = sqlite3.connect(str(DB_PATH), check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
-def init_db():
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS users(
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE,
-        email TEXT,
-        password_hash TEXT,
-        created_at REAL
-    )
-    """)
-    conn.commit()
-    conn.close()
-
-
-init_db()
-
-
 # ================================================================
 # Pydantic Models
 # ================================================================
@@ -131,39 +139,11 @@ class Auth(BaseModel):
 
 
 # ================================================================
-# UTILS
+# BLIP CAPTIONING (cached + batched, see caption_service.py)
 # ================================================================
-def hash_pw(pw):
-    return pwdctx.hash(pw)
-
-
-def verify_pw(pw, hashed):
-    return pwdctx.verify(pw, hashed)
-
-
-# ================================================================
-# BLIP LAZY LOADING
-# ================================================================
-blip_processor = None
-blip_model = None
-
-
-def ensure_blip_loaded():
-    global blip_processor, blip_model
-    if blip_processor is None or blip_model is None:
-        print("Loading BLIP image captioning model...")
-        blip_processor = BlipProcessor.from_pretrained("Salesforce/blip-image-captioning-base")
-        blip_model = BlipForConditionalGeneration.from_pretrained("Salesforce/blip-image-captioning-base")
-        print("BLIP model loaded.")
-
-
-def caption_image(image_path: str) -> str:
+def caption_image(data: bytes) -> str:
     try:
-        ensure_blip_loaded()
-        image = Image.open(image_path).convert("RGB")
-        inputs = blip_processor(image, return_tensors="pt")
-        output = blip_model.generate(**inputs, max_length=50)
-        caption = blip_processor.decode(output[0], skip_special_tokens=True)
+        caption = captioner.caption_bytes(data)
         print("BLIP Caption:", caption)
         return caption
     except Exception as e:
@@ -174,138 +154,104 @@ def caption_image(image_path: str) -> str:
 # ================================================================
 # SCRAPER
 # ================================================================
-SCRAPER_BASE = "http://api.scraperapi.com"
+# reranking is two-stage now, so keep more candidates for recall
+SEARCH_MAX_CANDIDATES = int(os.getenv("SEARCH_MAX_CANDIDATES", "60"))
+# parse while downloading and hang up once PARSE_MAX_PER_SOURCE products are found
+SCRAPE_STREAMING = os.getenv("SCRAPE_STREAMING", "1") == "1"
 
+SOURCE_URLS = {
+    "Amazon": "https://www.amazon.in/s?k={q}",
+    "Flipkart": "https://www.flipkart.com/search?q={q}",
+    "Myntra": "https://www.myntra.com/{q}",
+}
 
-def fetch(url):
-    params = {
-        "api_key": SCRAPER_API_KEY,
-        "url": url,
-        "keep_headers": "true"
-    }
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
-    }
 
-    try:
-        r = requests.get(SCRAPER_BASE, params=params, headers=headers, timeout=40)
-        r.raise_for_status()
-        return r.text
-    except Exception:
-        time.sleep(3)
-        try:
-            r = requests.get(SCRAPER_BASE, params=params, headers=headers, timeout=40)
-            r.raise_for_status()
-            return r.text
-        except Exception as e:
-            print("ScraperAPI FAILED:", e)
-            return None
-
-
-def parse_products(html, source):
-    soup = BeautifulSoup(html, "html.parser")
-    items = []
-
-    for a in soup.find_all("a", href=True):
-        href = a["href"]
-
-        # Amazon
-        if source == "Amazon":
-            if "/dp/" not in href:
-                continue
-            url = "https://www.amazon.in" + href if href.startswith("/") else href
-            title = a.get_text(strip=True) or "Product"
-            img = a.find("img")
-            image = img["src"] if img else None
-            items.append({
-                "title": title,
-                "price": "",
-                "image": image,
-                "url": url,
-                "source": "Amazon"
-            })
-
-        # Flipkart
-        if source == "Flipkart":
-            if "/p/" not in href:
-                continue
-            url = "https://www.flipkart.com" + href if href.startswith("/") else href
-            title = a.get_text(strip=True) or "Product"
-            img = a.find("img")
-            image = img["src"] if img else None
-            items.append({
-                "title": title,
-                "price": "",
-                "image": image,
-                "url": url,
-                "source": "Flipkart"
-            })
-
-        # Myntra
-        if source == "Myntra":
-            if "myntra.com" not in href:
-                continue
-            url = href if href.startswith("http") else "https://www.myntra.com" + href
-            title = a.get_text(strip=True) or "Product"
-            img = a.find("img")
-            image = img["src"] if img else None
-            items.append({
-                "title": title,
-                "price": "",
-                "image": image,
-                "url": url,
-                "source": "Myntra"
-            })
-
-        if len(items) >= 6:
-            break
+def fetch(url, priority=INTERACTIVE):
+    """Rate-limited, coalesced ScraperAPI fetch (see scrape_scheduler.py)."""
+    return scheduler.fetch(url, priority=priority)
+
 
-    return items
+def fetch_products(url, source, priority=INTERACTIVE):
+    """Products on one retailer page; None when the fetch itself failed."""
+    if SCRAPE_STREAMING:
+        return scheduler.stream(url, lambda: ProductStreamParser(source), source=source, priority=priority)
+    html = scheduler.fetch(url, source=source, priority=priority)
+    return parse_products(html, source) if html is not None else None
 
 
-def search_all(query):
+def search_all(query, priority=INTERACTIVE, cancel=None):
+    """`cancel` (threading.Event) stops the search before the next retailer page."""
     q = urllib.parse.quote_plus(query)
+    category = detect_category(query)
     results = []
 
-    a = fetch(f"https://www.amazon.in/s?k={q}")
-    if a:
-        results += parse_products(a, "Amazon")
-
-    f = fetch(f"https://www.flipkart.com/search?q={q}")
-    if f:
-        results += parse_products(f, "Flipkart")
-
-    m = fetch(f"https://www.myntra.com/{q}")
-    if m:
-        results += parse_products(m, "Myntra")
+    # slow / empty sources for this category are skipped, the rest go best first
+    for source in source_manager.plan(SOURCE_URLS, category):
+        if cancel is not None and cancel.is_set():
+            metrics.inc("scrape.search_cancelled")
+            break
+        found = fetch_products(SOURCE_URLS[source].format(q=q), source, priority)
+        if found is None:
+            # failed / throttled: says nothing about what the source stocks
+            source_manager.record_error(source)
+            continue
+        source_manager.record_yield(source, category, len(found))
+        results += found
 
-    return results[:10]
+    return results[:SEARCH_MAX_CANDIDATES]
 
 
 # ================================================================
 # RE-RANKER
 # ================================================================
-def rerank_products(query, products):
-    ranked = []
-    for p in products:
-        title = p["title"]
-        score = compute_relevance(query, title)
-        ranked.append((score, p))
+def cross_encoder_scores(query, products):
+    # cached scores are reused; only unseen (query, product) pairs hit the model
+    return score_cache.score_many(query, products, compute_relevance_batch, model_id=RERANKER_ID)
+
+
+def rerank_products(query, products, constraints=None):
+    # price/category masks, then stage 1: MiniLM/BM25 prefilter over scraped + catalog,
+    # stage 2: cross-encoder top-K
+    return two_stage_rank(query, products, cross_encoder_scores, k=RERANK_TOP_K,
+                          constraints=constraints)
+
 
-    ranked.sort(reverse=True, key=lambda x: x[0])
-    return [item[1] for item in ranked[:5]]
+def find_products(query, priority=INTERACTIVE, cancel=None):
+    """Scrape + parse + rerank. Shared by /chat and the prefetch worker."""
+    constraints = parse_constraints(query)
+    products = search_all(query, priority, cancel)
+    if cancel is not None and cancel.is_set():
+        return []
+    # rank on the query without "under 500"-style phrases; those become filters
+    return rerank_products(constraints["query"] or query, products, constraints)
+
+
+def cached_find_products(query, priority=INTERACTIVE, cancel=None):
+    products = result_cache.get(query)
+    if products is None:
+        products = find_products(query, priority, cancel)
+        if products:
+            result_cache.put(query, products)
+    return products
 
 
 # ================================================================
 # SMART QUERY REWRITER
 # ================================================================
+def rewrite_needed(history_messages):
+    # with speculation on, a first turn (the current message is the only entry,
+    # so there is no context to merge) uses its input as-is, letting the
+    # speculative scrape run on the final key; otherwise every turn is rewritten
+    return not SPECULATIVE_SCRAPE or len(history_messages) > 1
+
+
 def generate_smart_query(history_messages, current_msg: str) -> str:
     """
     Uses Cohere to refine the search query based on short-term memory.
     history_messages: list of recent user messages (strings)
     current_msg: combined topic/message text
     """
-    if not history_messages:
+    if not rewrite_needed(history_messages):
         return current_msg
 
     history_str = "\n".join(history_messages[-3:])
@@ -356,171 +302,407 @@ app.add_middleware(
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 
+@app.middleware("http")
+async def attach_user(request: Request, call_next):
+    # O(1) signed-token check, no DB hit; None for anonymous requests
+    request.state.user_id = session_tokens.verify(
+        bearer_token(request.headers.get("authorization"))
+    )
+    response = await call_next(request)
+
+    # sticky routing: the load balancer hashes on this cookie (see README)
+    key = affinity_key(request.state.user_id)
+    if key and request.cookies.get(AFFINITY_COOKIE) != key:
+        response.set_cookie(AFFINITY_COOKIE, key, httponly=True, samesite="lax")
+    return response
+
+
+@app.exception_handler(PoolTimeoutError)
+async def user_db_busy(request: Request, exc: PoolTimeoutError):
+    # every user-store call, here and in routers mounted on this app
+    return ORJSONResponse({"detail": "busy, try again"}, status_code=503)
+
+
+@app.on_event("startup")
+def start_services():
+    user_store.import_legacy_users()        # one-shot, a no-op once recorded
+    job_queue.start()
+    if PREFETCH_ENABLED:
+        prefetcher.start(lambda q: find_products(q, priority=BACKGROUND), scheduler.thread_credits)
+
+
+@app.on_event("shutdown")
+def shutdown_services():
+    prefetcher.stop()
+    job_queue.drain()
+    password_service.shutdown()
+
+
 # ================================================================
 # AUTH ENDPOINTS
 # ================================================================
 @app.post("/register")
-def register(data: Auth):
+async def register(data: Auth):
     username = data.username.strip()
     pw = data.password
 
-    conn = get_conn()
-    c = conn.cursor()
     try:
-        c.execute("""
-        INSERT INTO users(username, email, password_hash, created_at)
-        VALUES (?, ?, ?, ?)
-        """, (username, data.email or "", hash_pw(pw), time.time()))
-        conn.commit()
-    except sqlite3.IntegrityError:
+        pw_hash = await password_service.hash(pw)
+    except PasswordServiceBusy:
+        raise HTTPException(503, "busy, try again")
+
+    try:
+        await user_store.acreate_user(username, data.email or "", pw_hash)
+    except UserExistsError:
         raise HTTPException(400, "username already exists")
-    finally:
-        conn.close()
 
     return {"status": "ok"}
 
 
 @app.post("/login")
-def login(data: Auth):
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("SELECT * FROM users WHERE username=? OR email=?", (data.username, data.username))
-    user = c.fetchone()
-    conn.close()
+async def login(data: Auth):
+    user = await user_store.afind_by_login(data.username)
 
     if not user:
         raise HTTPException(401, "invalid")
 
-    if not verify_pw(data.password, user["password_hash"]):
+    try:
+        ok, new_hash = await password_service.verify(data.password, user["password_hash"])
+    except PasswordServiceBusy:
+        raise HTTPException(503, "busy, try again")
+
+    if not ok:
         raise HTTPException(401, "invalid")
 
-    token = f"tok-{user['id']}-{int(time.time())}"
+    # cost factor changed since this hash was stored → upgrade it transparently
+    if new_hash:
+        await user_store.aset_password_hash(user["id"], new_hash)
+
+    token = session_tokens.issue(user["id"])
     return {"token": token, "username": user["username"]}
 
 
 # ================================================================
 # CHAT ENDPOINT
 # ================================================================
-@app.post("/chat")
+# when the rewrite is skipped (first message of a session) the search query is
+# already known: scrape it alongside the rewrite stage instead of after it
+SPECULATIVE_SCRAPE = os.getenv("CHAT_SPECULATIVE_SCRAPE", "0") == "1"
+
+
+@app.post("/chat", response_class=ORJSONResponse)
 async def chat(
+    request: Request,
     message: str = Form(""),
     history: str = Form("[]"),
+    token: str = Form(None),
     file: UploadFile = File(None)
 ):
+    # 0. Resolve the user (header via middleware, or legacy form field)
+    user_id = request.state.user_id or session_tokens.verify(token)
+
     # 1. Parse frontend chat history (not primary memory, but kept)
     try:
         chat_history_list = json.loads(history)
     except Exception:
         chat_history_list = []
 
-    # 2. Add current text into Memory V2 + Vector Memory V3
-    if message.strip():
-        memory.add_message(message)
-        memory.update_topic(message)
-        vector_memory.add_memory(message)
-
-    # 3. Handle image upload + BLIP caption
-    saved_image = None
-    image_caption = ""
-
-    if file and file.filename:
+    # Per-user Memory V2 state, from the shared backend so any worker can serve the turn
+    memory = await asyncio.to_thread(session_memory.load, user_id)
+
+    # Stages below form a DAG (see pipeline.py):
+    #
+    #   remember ─► recall ─┐
+    #   caption ────────────┴─► query ─► rewrite ──────────┐
+    #                             └──► speculative_scrape ─┴─► reply
+    #
+    pipe = Pipeline("chat")
+
+    # (text, vector) to store in vector memory once the reply is built,
+    # so this turn's recall only ever sees earlier turns
+    pending_vectors = []
+
+    def remember_vector(text):
+        # topic tracking needs the vector now only with embedding shifts on; storing it can wait
+        vector = vector_memory.encode(text) if intent_classifier.embedding_shift else None
+        pending_vectors.append((text, vector))
+        return vector
+
+    # 2. Add current text into Memory V2 (Vector Memory V3 gets it after the reply)
+    def remember():
+        if message.strip():
+            memory.add_message(message)
+            memory.update_topic(message, remember_vector(message))
+
+    # 3. Handle image upload + BLIP caption (runs alongside memory + recall)
+    async def caption():
+        if not (file and file.filename):
+            return None, ""
         safe_name = file.filename.replace(" ", "_").replace("/", "_")
         fname = f"{int(time.time())}_{safe_name}"
         out = UPLOAD_DIR / fname
 
         content = await file.read()
-        out.write_bytes(content)
-
-        saved_image = f"/static/uploads/{fname}"
-        local_path = "." + saved_image
+        # the file is written while BLIP captions the bytes (both off the event loop,
+        # so concurrent uploads can batch); its URL is only returned once it exists
+        saved, image_caption = await asyncio.gather(
+            asyncio.to_thread(out.write_bytes, content),
+            asyncio.to_thread(caption_image, content),
+            return_exceptions=True,
+        )
+        if isinstance(image_caption, Exception):
+            raise image_caption
+        await schedule_upload_cleanup()
 
-        # BLIP caption
-        image_caption = caption_image(local_path)
+        if isinstance(saved, Exception):
+            print("Upload save failed:", saved)
+            return None, image_caption
+        return f"/static/uploads/{fname}", image_caption
 
+    # 4. Vector Memory Recall (Memory V3)
+    def recall(remember):
+        if message.strip():
+            return vector_memory.search_memory(message, top_k=2)
+        return []
+
+    # 5-6. Base query from topic memory (Memory V2) + semantic recall
+    def query(remember, caption, recall):
+        _, image_caption = caption
         if image_caption:
             # Feed image description into memories
-            memory.update_topic(image_caption)
+            memory.update_topic(image_caption, remember_vector(image_caption))
             memory.add_message(image_caption)
-            vector_memory.add_memory(image_caption)
 
-    # 4. Vector Memory Recall (Memory V3)
-    recalled = []
-    if message.strip():
-        recalled = vector_memory.search_memory(message, top_k=2)
-    recalled_text = " ".join([t for score, t in recalled]) if recalled else ""
-
-    # 5. Build base query using topic memory (Memory V2)
-    base_query = memory.build_query_context(message or image_caption or "")
+        recalled_text = " ".join([t for score, t in recall]) if recall else ""
+        base_query = memory.build_query_context(message or image_caption or "")
+        combined = f"{base_query} {recalled_text}".strip() or (message or image_caption or "")
 
-    # 6. Combine base query + semantic recall
-    combined_query = f"{base_query} {recalled_text}".strip() or (message or image_caption or "")
+        # 8. Decide whether to trigger scraper
+        should_search = intent_classifier.should_search(message) or bool(image_caption)
+        return {"combined": combined, "should_search": should_search}
 
     # 7. Smart Query Rewriter with recent memory
-    smart_query = generate_smart_query(memory.last_messages, combined_query)
+    def rewrite(query):
+        return generate_smart_query(memory.last_messages, query["combined"])
+
+    # set when the speculative result is not used: stops it before the next page
+    speculation_cancel = threading.Event()
+
+    def speculative_scrape(query):
+        # only on the exact key the turn will use, i.e. when the rewrite returns its input;
+        # BACKGROUND priority so it never takes a token an interactive scrape is waiting for
+        if (SPECULATIVE_SCRAPE and query["should_search"] and query["combined"].strip()
+                and not rewrite_needed(memory.last_messages)):
+            return cached_find_products(query["combined"], BACKGROUND, speculation_cancel)
+        return None
+
+    pipe.add("remember", remember)
+    pipe.add("caption", caption)
+    pipe.add("recall", recall, deps=["remember"])
+    pipe.add("query", query, deps=["remember", "caption", "recall"])
+    pipe.add("rewrite", rewrite, deps=["query"])
+    pipe.add("speculative_scrape", speculative_scrape, deps=["query"])
+    pipe.start()
 
-    # 8. Decide whether to trigger scraper
-    shopping_words = [
-        "show", "find", "buy", "dress", "shirt",
-        "price", "frock", "jeans", "mobile", "saree",
-        "shoes", "sandals", "kurti", "tshirt"
-    ]
+    try:
+        q = await pipe.result("query")
+        smart_query = await pipe.result("rewrite")
+
+        # 8b. Keep the speculative scrape if it ran on the query the rewrite returned,
+        # otherwise stop it and scrape the rewritten one
+        scrape_stage = None
+        if q["should_search"] and smart_query.strip():
+            if PREFETCH_ENABLED:
+                prefetcher.tracker.record(smart_query)
+            if SPECULATIVE_SCRAPE and not rewrite_needed(memory.last_messages):
+                metrics.inc("chat.speculative_scrape.hit")
+                scrape_stage = "speculative_scrape"
+            else:
+                pipe.add("scrape", lambda rewrite: cached_find_products(rewrite), deps=["rewrite"])
+                scrape_stage = "scrape"
+        if scrape_stage != "speculative_scrape":
+            speculation_cancel.set()
+            pipe.cancel("speculative_scrape")
+
+        # 9-11. Token-budgeted prompt + Cohere chat
+        def reply(caption, recall, rewrite, **products):
+            found = next(iter(products.values()), None) or []
+
+            # Same product set + near-duplicate query → reuse an earlier reply.
+            # A reply drawn from this user's photo is never shared; earlier turns,
+            # the summary and the recalled memories go into the key
+            cacheable = RESPONSE_CACHE_ENABLED and not caption[1]
+            context = "\n".join(memory.last_messages[:-1] + [memory.summary()]
+                                 + [t for (_, t) in recall])
+            if cacheable:
+                try:
+                    cached = response_cache.get(rewrite, found, context)
+                except Exception as e:
+                    print("Response cache error:", e)
+                    cached = None
+                if cached is not None:
+                    return cached, found
+
+            prompt = build_prompt(
+                SYSTEM_PROMPT,
+                message,
+                image_caption=caption[1],
+                products=found,
+                history=memory.last_messages,
+                recalled=[t for (_, t) in recall],
+                summary=memory.summary(),
+            )
+            try:
+                t0 = time.perf_counter()
+                resp = co.chat(
+                    model=COHERE_MODEL,
+                    message=prompt["message"],
+                    preamble=SYSTEM_PROMPT,
+                    chat_history=prompt["chat_history"]
+                )
+                text = resp.text
+            except Exception as e:
+                print("COHERE ERROR:", e)
+                return "Sorry, I couldn't process with AI right now.", found
+
+            if cacheable:
+                # embeds the query again: off the request path
+                job_queue.submit("response_cache.put", response_cache.put, rewrite, found, text,
+                                 llm_seconds=time.perf_counter() - t0, context=context)
+            return text, found
+
+        deps = ["caption", "recall", "rewrite"] + ([scrape_stage] if scrape_stage else [])
+        pipe.add("reply", reply, deps=deps)
+        reply_text, products = await pipe.result("reply")
+        saved_image, _ = await pipe.result("caption")
+        for text, vector in pending_vectors:
+            job_queue.submit("vector_memory.add", vector_memory.add_memory, text, vector)
+    finally:
+        speculation_cancel.set()
+        await pipe.close()
 
-    products = []
+    await asyncio.to_thread(session_memory.save, user_id, memory)
 
-    should_search = (
-        any(w in (message.lower() if message else "") for w in shopping_words)
-        or bool(image_caption)
-    )
+    path = pipe.record("reply")
+    print("CHAT CRITICAL PATH:", " > ".join(path), pipe.timings())
 
-    if should_search and smart_query.strip():
-        products = search_all(smart_query)
-        if products:
-            products = rerank_products(smart_query, products)
-
-    # 9. Build input for Cohere LLM
-    user_input = message or ""
-    if image_caption:
-        user_input += f"\nUser uploaded an image showing: {image_caption}"
-
-    if products:
-        prod_summary = "\n".join([
-            f"{p['source']}: {p['title']} - {p['url']}"
-            for p in products
-        ])
-        user_input += f"\n\nProducts found:\n{prod_summary}"
-
-    # 10. Build LLM chat_history from short-term + recalled memory
-    llm_history_msgs = memory.last_messages.copy()
-    llm_history_msgs += [t for (_, t) in recalled]
-
-    llm_chat_history = [
-        {"role": "USER", "message": m}
-        for m in llm_history_msgs
-    ]
-
-    # 11. Cohere chat
+    return chat_response(reply_text, products, saved_image)
+
+
+def chat_response(reply_text, products, saved_image):
+    # a Response is sent as-is: no jsonable_encoder walk over the product list
+    return ORJSONResponse(content={
+        "reply": reply_text,
+        "products": [p.to_dict() for p in products],
+        "saved_image": saved_image,
+    })
+
+
+def require_admin(token):
+    if not ADMIN_TOKEN or not hmac.compare_digest(token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+# ================================================================
+# BATCH RECOMMENDATIONS (campaigns, homepage personalisation)
+# ================================================================
+@app.post("/recommend/batch")
+async def recommend_batch(request: Request, x_admin_token: str = Header(None)):
+    """
+    JSONL in, JSONL out (same line format as batch_recommend.py).
+    Catalog only, no scraping; results stream back one chunk at a time.
+    Large offline jobs should use the CLI and its process pool instead.
+    Admin only: one call can run thousands of cross-encoder passes.
+    """
+    require_admin(x_admin_token)
     try:
-        resp = co.chat(
-            model=COHERE_MODEL,
-            message=user_input or "Help the user with shopping.",
-            preamble=SYSTEM_PROMPT,
-            chat_history=llm_chat_history
-        )
-        reply = resp.text
-    except Exception as e:
-        print("COHERE ERROR:", e)
-        reply = "Sorry, I couldn't process with AI right now."
+        lines = [line for line in (await request.body()).decode("utf-8").splitlines() if line.strip()]
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Body must be UTF-8 JSONL")
+    if len(lines) > RECO_MAX_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {RECO_MAX_BATCH} queries per call")
+
+    # every line is checked before the response starts: a bad line is a 400, not a broken stream
+    for n, line in enumerate(lines, 1):
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError:
+            item = None
+        if not isinstance(item, dict) or not isinstance(item.get("query", ""), str):
+            raise HTTPException(status_code=400, detail=f"Line {n}: expected a JSON object with a string \"query\"")
+        history = item.get("history")
+        if history is not None and not (isinstance(history, list) and all(isinstance(m, str) for m in history)):
+            raise HTTPException(status_code=422, detail=f"Line {n}: \"history\" must be a list of strings")
+    chunks = list(read_chunks(lines))
+    metrics.inc("recommend.batch_queries", len(lines))
+
+    async def results():
+        start = time.perf_counter()
+        for chunk in chunks:
+            for rec in await asyncio.to_thread(recommend_chunk, chunk):
+                yield json.dumps(rec, ensure_ascii=False) + "\n"
+        seconds = time.perf_counter() - start
+        if seconds:
+            metrics.observe("recommend.batch_qps", len(lines) / seconds)
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
 
-    return {
-        "reply": reply,
-        "products": products,
-        "saved_image": saved_image
-    }
+
+# ================================================================
+# ADMIN: RUNTIME PROFILING (see profiler.py)
+# ================================================================
+profiler.register_size("vector_memory", vector_memory.stats)
+profiler.register_size("score_cache", lambda: score_cache.stats()["size"])
+profiler.register_size("result_cache", result_cache.size)
+profiler.register_size("response_cache", lambda: response_cache.stats()["size"])
+profiler.register_size("caption_cache", lambda: {"entries": len(captioner.cache), "max_entries": CAPTION_CACHE_SIZE})
+profiler.register_size("job_queue", lambda: job_queue.stats()["depth"])
+profiler.register_size("uploads", lambda: dir_size(UPLOAD_DIR))
+
+
+@app.get("/admin/profile")
+def profile_report(x_admin_token: str = Header(None)):
+    """Store sizes, plus per-stage CPU profiles while profiling is on."""
+    require_admin(x_admin_token)
+    return profiler.report()
+
+
+@app.post("/admin/profile")
+def profile_switch(enabled: bool, sample_rate: float = None, x_admin_token: str = Header(None)):
+    require_admin(x_admin_token)
+    if enabled:
+        profiler.enable(sample_rate)
+    else:
+        profiler.disable()
+    return profiler.report()
+
+
+@app.post("/admin/profile/snapshot")
+def profile_snapshot(x_admin_token: str = Header(None)):
+    """tracemalloc diff: top allocators since the last snapshot and since profiling started."""
+    require_admin(x_admin_token)
+    return profiler.snapshot()
 
 
 # ================================================================
-# ROOT
+# ROOT + METRICS
 # ================================================================
 @app.get("/")
 def root():
     return {"status": "ok"}
+
+
+@app.get("/metrics")
+def get_metrics():
+    snap = metrics.snapshot()
+    snap["scraper"] = scheduler.stats()
+    snap["score_cache"] = score_cache.stats()
+    snap["sources"] = source_manager.stats()
+    snap["jobs"] = job_queue.stats()
+    snap["response_cache"] = response_cache.stats()
+    snap["shared_backend"] = SHARED_BACKEND
+    snap["prefetch"] = {
+        "warm_hit_ratio": prefetcher.warm_hit_ratio(),
+        "hot_queries": prefetcher.tracker.top(prefetcher.top_n),
+    }
+    return snap
@@ -1,30 +1,84 @@
 import re
 
+from intent_classifier import intent_classifier
+
+SUMMARY_MAX_WORDS = 40
+SUMMARY_STOPWORDS = {
+    "a", "an", "the", "i", "me", "my", "want", "need", "show", "find", "please",
+    "for", "to", "of", "and", "or", "with", "some", "any", "can", "you", "is",
+    "it", "this", "that", "in", "on", "something", "like", "also", "get", "buy",
+}
+
 class MemoryManager:
     def __init__(self):
         self.topic_memory = None      # main topic (e.g., "red dresses")
         self.last_messages = []       # last 5 messages only
+        self.summary_words = []       # compact digest of messages older than the last 5
+        self.topic_vector = None      # MiniLM vector of the topic message (embedding topic shifts)
+        self.version = 0              # session save counter (shared_state.SessionMemory)
+        self.journal = []             # calls made since load, replayed if a save has to merge
 
     def add_message(self, text):
+        self.journal.append(("add_message", (text,)))
         # store only recent messages
         self.last_messages.append(text)
         if len(self.last_messages) > 5:
-            self.last_messages.pop(0)
+            self.fold_into_summary(self.last_messages.pop(0))
 
-    def detect_new_topic(self, text):
-        # Simple rule: shopping keywords → topic change
-        shopping_keywords = [
-            "dress", "shirt", "jeans", "shoes", "mobile", "earbuds",
-            "tshirt", "kurti", "lehenga", "frock", "sandals"
+    def fold_into_summary(self, text):
+        # keep the content words of evicted turns instead of resending them
+        words = [
+            w for w in re.findall(r"[\w₹]+", text.lower())
+            if w not in SUMMARY_STOPWORDS
         ]
-        words = text.lower().split()
+        seen = set(self.summary_words)
+        for w in words:
+            if w in seen:
+                self.summary_words.remove(w)    # move to the newest end
+            self.summary_words.append(w)
+            seen.add(w)
+        self.summary_words = self.summary_words[-SUMMARY_MAX_WORDS:]
+
+    def summary(self):
+        return " ".join(self.summary_words)
+
+    def to_dict(self):
+        return {
+            "topic": self.topic_memory,
+            "last_messages": self.last_messages,
+            "summary_words": self.summary_words,
+            "topic_vector": self.topic_vector,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        mem = cls()
+        mem.topic_memory = data.get("topic")
+        mem.last_messages = list(data.get("last_messages", []))
+        mem.summary_words = list(data.get("summary_words", []))
+        mem.topic_vector = data.get("topic_vector")
+        mem.version = data.get("version", 0)
+        return mem
 
-        return any(w in words for w in shopping_keywords)
+    def replay(self, journal):
+        """Re-apply another copy's add_message / update_topic calls to this one."""
+        for method, args in journal:
+            getattr(self, method)(*args)
 
-    def update_topic(self, text):
+    def detect_new_topic(self, text, vector=None):
+        # product keyword (or, if enabled, a far-off embedding) → topic change
+        return intent_classifier.is_new_topic(text, vector, self.topic_vector)
+
+    def update_topic(self, text, vector=None):
+        """
+        `vector`: the message's MiniLM embedding, if vector memory already
+        computed one; only used by the embedding topic-shift check.
+        """
+        self.journal.append(("update_topic", (text, _as_list(vector))))
         # if user message has a product category → it's a new topic
-        if self.detect_new_topic(text):
+        if self.detect_new_topic(text, vector):
             self.topic_memory = text
+            self.topic_vector = _as_list(vector)
         # otherwise keep old topic
 
     def build_query_context(self, new_msg):
@@ -37,12 +91,18 @@ class MemoryManager:
         if not self.topic_memory:
             return new_msg
 
-        # user changed topic
-        if self.detect_new_topic(new_msg):
+        # user changed topic (update_topic may already have switched to it)
+        if new_msg == self.topic_memory or self.detect_new_topic(new_msg):
             self.topic_memory = new_msg
             return new_msg
 
         # combine topic with the new request
         return f"{self.topic_memory} {new_msg}".strip()
 
+def _as_list(vector):
+    # stored in the session JSON (shared_state.SessionMemory)
+    if vector is None:
+        return None
+    return [round(float(x), 5) for x in (vector.tolist() if hasattr(vector, "tolist") else vector)]
+
 memory = MemoryManager()
@@ -0,0 +1,71 @@
+import time
+import threading
+from collections import defaultdict, deque
+
+
+class Metrics:
+    """
+    Tiny in-process metrics registry (counters, gauges, latency summaries).
+    Served as JSON from GET /metrics.
+    """
+
+    def __init__(self, window=512):
+        self.window = window
+        self._counters = defaultdict(float)
+        self._gauges = {}
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._totals = defaultdict(lambda: [0, 0.0])    # name -> [count, sum]
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    def inc(self, name, value=1):
+        with self._lock:
+            self._counters[name] += value
+
+    def gauge(self, name, value):
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name, value):
+        with self._lock:
+            self._samples[name].append(value)
+            total = self._totals[name]
+            total[0] += 1
+            total[1] += value
+
+    def counter(self, name):
+        return self._counters.get(name, 0)
+
+    @staticmethod
+    def _percentile(sorted_vals, q):
+        if not sorted_vals:
+            return 0.0
+        idx = min(len(sorted_vals) - 1, int(round(q * (len(sorted_vals) - 1))))
+        return sorted_vals[idx]
+
+    def summary(self, name):
+        with self._lock:
+            vals = sorted(self._samples.get(name, ()))
+            count, total = self._totals.get(name, (0, 0.0))
+        return {
+            "count": count,
+            "avg": round(total / count, 4) if count else 0.0,
+            "p50": round(self._percentile(vals, 0.50), 4),
+            "p95": round(self._percentile(vals, 0.95), 4),
+            "max": round(vals[-1], 4) if vals else 0.0,
+        }
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            names = list(self._samples)
+        return {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "counters": counters,
+            "gauges": gauges,
+            "summaries": {name: self.summary(name) for name in names},
+        }
+
+
+metrics = Metrics()
@@ -0,0 +1,116 @@
+import os
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+
+
+# ================================================================
+# CONFIG
+# ================================================================
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_MAX_INFLIGHT = int(os.getenv("PASSWORD_MAX_INFLIGHT", str(PASSWORD_WORKERS * 4)))
+PASSWORD_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_QUEUE_TIMEOUT", "5"))
+
+# bcrypt only looks at the first 72 bytes (bcrypt >= 4.1 raises on longer input)
+BCRYPT_MAX_BYTES = 72
+
+
+class PasswordServiceBusy(Exception):
+    """Raised when a hash/verify job waited longer than the queue timeout."""
+    pass
+
+
+# ================================================================
+# WORKER-SIDE FUNCTIONS (run inside the process pool)
+# ================================================================
+def _secret(password):
+    """UTF-8 bytes cut to bcrypt's 72-byte limit (slicing the str would count characters)."""
+    return password.encode("utf-8")[:BCRYPT_MAX_BYTES]
+
+
+def _cost(hashed):
+    # "$2b$12$<salt+checksum>" -> 12
+    return int(hashed.split("$")[2])
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(_secret(password), bcrypt.gensalt(rounds)).decode("ascii")
+
+
+def _verify_and_update(password, hashed, rounds):
+    """Returns (ok, new_hash). new_hash is set when the stored cost is stale."""
+    if not bcrypt.checkpw(_secret(password), hashed.encode("ascii")):
+        return False, None
+    if _cost(hashed) != rounds:
+        return True, _hash(password, rounds)
+    return True, None
+
+
+# ================================================================
+# SERVICE
+# ================================================================
+class PasswordService:
+    """
+    bcrypt on a dedicated process pool so request workers (and /chat)
+    are never stuck behind password hashing.
+
+    At most `max_inflight` jobs are queued or running; callers that wait
+    longer than `queue_timeout` for a slot get PasswordServiceBusy.
+    """
+
+    def __init__(
+        self,
+        rounds=BCRYPT_ROUNDS,
+        workers=PASSWORD_WORKERS,
+        max_inflight=PASSWORD_MAX_INFLIGHT,
+        queue_timeout=PASSWORD_QUEUE_TIMEOUT,
+    ):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_inflight = max_inflight
+        self.queue_timeout = queue_timeout
+        self._pool = None
+        self._slots = asyncio.Semaphore(max_inflight)
+
+    def _executor(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    async def _run(self, fn, *args):
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise PasswordServiceBusy("password service queue is full")
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor(), fn, *args)
+        finally:
+            self._slots.release()
+
+    async def hash(self, password):
+        return await self._run(_hash, password, self.rounds)
+
+    async def verify(self, password, hashed):
+        """
+        Returns (ok, new_hash). When the stored hash was made with a different
+        cost factor, new_hash holds a rehash at the current cost and the
+        caller should persist it.
+        """
+        if not hashed:
+            return False, None
+        try:
+            return await self._run(_verify_and_update, password, hashed, self.rounds)
+        except (ValueError, IndexError, UnicodeEncodeError):
+            # malformed / unknown hash format
+            return False, None
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+password_service = PasswordService()
@@ -0,0 +1,137 @@
+import time
+import asyncio
+import inspect
+
+from metrics import metrics
+from profiler import profiler
+
+
+# ================================================================
+# STAGE DAG
+# ================================================================
+class Stage:
+    __slots__ = ("name", "fn", "deps", "task", "started", "finished", "cancelled")
+
+    def __init__(self, name, fn, deps):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.task = None
+        self.started = None
+        self.finished = None
+        self.cancelled = False
+
+
+class Pipeline:
+    """
+    Small per-request DAG executor.
+
+    Each stage starts as soon as its dependencies finish and is called with
+    their results as keyword arguments. Sync functions run in a worker
+    thread so model and network calls never block the event loop.
+
+        p = Pipeline("chat")
+        p.add("recall", recall_fn, deps=["remember"])
+        p.start()
+        hits = await p.result("recall")
+
+    A stage can be cancelled (e.g. a speculative scrape that turned out to be
+    unnecessary); stages depending on it are cancelled too.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.stages = {}
+        self.t0 = None
+
+    def add(self, name, fn, deps=()):
+        for d in deps:
+            if d not in self.stages:
+                raise ValueError(f"stage {name!r} depends on unknown stage {d!r}")
+        self.stages[name] = Stage(name, fn, deps)
+        if self.t0 is not None:
+            self._launch(self.stages[name])
+
+    def start(self):
+        self.t0 = time.perf_counter()
+        for stage in self.stages.values():
+            if stage.task is None:
+                self._launch(stage)
+        return self
+
+    def _launch(self, stage):
+        stage.task = asyncio.ensure_future(self._run(stage))
+
+    async def _run(self, stage):
+        kwargs = {}
+        for d in stage.deps:
+            kwargs[d] = await self.stages[d].task
+        stage.started = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(stage.fn):
+                return await stage.fn(**kwargs)
+            if profiler.sampled():
+                return await asyncio.to_thread(profiler.run_profiled, f"{self.name}.{stage.name}", stage.fn, **kwargs)
+            return await asyncio.to_thread(stage.fn, **kwargs)
+        finally:
+            stage.finished = time.perf_counter()
+
+    async def result(self, name):
+        return await self.stages[name].task
+
+    def cancel(self, name):
+        """Drop a stage nobody needs. A thread already running keeps going, but its result is ignored."""
+        stage = self.stages[name]
+        if stage.task is not None and not stage.task.done():
+            stage.task.cancel()
+            stage.cancelled = True
+            metrics.inc(f"{self.name}.cancelled.{name}")
+        for other in self.stages.values():
+            if name in other.deps and not other.cancelled:
+                self.cancel(other.name)
+
+    async def close(self):
+        """Cancel anything still pending and wait for the tasks to settle."""
+        pending = [s.task for s in self.stages.values() if s.task is not None and not s.task.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    # ------------------------------------------
+    # TIMING
+    # ------------------------------------------
+    def timings(self):
+        """name -> (start offset, duration) in ms, for stages that ran."""
+        out = {}
+        for s in self.stages.values():
+            if s.started is not None and s.finished is not None:
+                out[s.name] = (
+                    round((s.started - self.t0) * 1000, 1),
+                    round((s.finished - s.started) * 1000, 1),
+                )
+        return out
+
+    def critical_path(self, last):
+        """
+        Walk back from `last` through the dependency that finished latest:
+        the chain of stages that actually determined the request latency.
+        """
+        path = []
+        stage = self.stages.get(last)
+        while stage is not None and stage.finished is not None:
+            path.append(stage.name)
+            done = [self.stages[d] for d in stage.deps if self.stages[d].finished is not None]
+            stage = max(done, key=lambda s: s.finished) if done else None
+        return path[::-1]
+
+    def record(self, last):
+        """Per-stage latency summaries + the critical path, into metrics."""
+        for name, (_, dur) in self.timings().items():
+            metrics.observe(f"{self.name}.stage_ms.{name}", dur)
+        path = self.critical_path(last)
+        if path:
+            metrics.inc(f"{self.name}.critical_path.{'>'.join(path)}")
+            total = (self.stages[last].finished - self.t0) * 1000
+            metrics.observe(f"{self.name}.total_ms", round(total, 1))
+        return path
@@ -0,0 +1,172 @@
+import os
+import time
+import threading
+from collections import Counter
+
+from metrics import metrics
+from result_cache import result_cache, normalize_query, WARM
+
+
+# ================================================================
+# CONFIG
+# ================================================================
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "0") == "1"     # spends paid scrape credits
+PREFETCH_TOP_N = int(os.getenv("PREFETCH_TOP_N", "20"))
+PREFETCH_INTERVAL = int(os.getenv("PREFETCH_INTERVAL", "60"))         # seconds between sweeps
+PREFETCH_REFRESH_MARGIN = int(os.getenv("PREFETCH_REFRESH_MARGIN", "300"))  # refresh this long before TTL
+PREFETCH_BUDGET_PER_HOUR = int(os.getenv("PREFETCH_BUDGET_PER_HOUR", "60"))  # ScraperAPI credits / hour
+PREFETCH_DECAY = float(os.getenv("PREFETCH_DECAY", "0.9"))            # per sweep
+PREFETCH_TRACKER_SIZE = int(os.getenv("PREFETCH_TRACKER_SIZE", "1000"))   # distinct queries tracked
+PREFETCH_SEEDS = [
+    s.strip() for s in os.getenv("PREFETCH_SEEDS", "dress,kurti,shoes,mobile,saree").split(",")
+    if s.strip()
+]
+
+
+# ================================================================
+# QUERY FREQUENCY TRACKER
+# ================================================================
+class QueryTracker:
+    """
+    Exponentially decayed counts of normalized /chat search queries.
+    At most `max_size` queries are tracked: a new one evicts the rarest.
+    """
+
+    def __init__(self, decay=PREFETCH_DECAY, seeds=PREFETCH_SEEDS, max_size=PREFETCH_TRACKER_SIZE):
+        self.decay = decay
+        self.max_size = max_size
+        self._counts = Counter()
+        self._display = {}          # normalized -> last raw query seen
+        self._lock = threading.Lock()
+        for seed in seeds:
+            self.record(seed)
+
+    def record(self, query):
+        key = normalize_query(query)
+        if not key:
+            return
+        with self._lock:
+            if key not in self._counts and len(self._counts) >= self.max_size:
+                rarest = min(self._counts, key=self._counts.get)
+                del self._counts[rarest]
+                self._display.pop(rarest, None)
+            self._counts[key] += 1
+            self._display[key] = query.strip()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._counts)
+
+    def decay_all(self):
+        with self._lock:
+            for key in list(self._counts):
+                self._counts[key] *= self.decay
+                if self._counts[key] < 0.05:
+                    del self._counts[key]
+                    self._display.pop(key, None)
+
+    def top(self, n):
+        with self._lock:
+            return [self._display[k] for k, _ in self._counts.most_common(n)]
+
+
+# ================================================================
+# PREFETCH WORKER
+# ================================================================
+class Prefetcher:
+    """
+    Background worker that keeps the top-N queries warm in result_cache.
+
+    Each sweep refreshes entries that are missing or close to expiry,
+    spending at most PREFETCH_BUDGET_PER_HOUR scrape credits per rolling
+    hour. A refresh costs the scheduler tokens it actually took (one per
+    retailer page and retry; none when coalesced or skipped), so the last
+    refresh of an hour can overshoot by one query's pages.
+    """
+
+    def __init__(
+        self,
+        tracker=None,
+        top_n=PREFETCH_TOP_N,
+        interval=PREFETCH_INTERVAL,
+        refresh_margin=PREFETCH_REFRESH_MARGIN,
+        budget_per_hour=PREFETCH_BUDGET_PER_HOUR,
+    ):
+        self.tracker = tracker or QueryTracker()
+        self.top_n = top_n
+        self.interval = interval
+        self.refresh_margin = refresh_margin
+        self.budget_per_hour = budget_per_hour
+        self._spent = []            # (timestamp, credits) per refresh in the last hour
+        self._stop = threading.Event()
+        self._thread = None
+        self._search = None
+        self._credits = None
+
+    def _budget_left(self):
+        cutoff = time.time() - 3600
+        self._spent = [(t, n) for t, n in self._spent if t > cutoff]
+        return self.budget_per_hour - sum(n for _, n in self._spent)
+
+    def sweep(self):
+        """One pass over the hot set. Returns the number of refreshed queries."""
+        refreshed = 0
+        for query in self.tracker.top(self.top_n):
+            if self._stop.is_set():
+                break
+            remaining = result_cache.expires_in(query)
+            if remaining is not None and remaining > self.refresh_margin:
+                continue
+            if self._budget_left() <= 0:
+                metrics.inc("prefetch.budget_exhausted")
+                break
+
+            before = self._credits() if self._credits else 0
+            try:
+                products = self._search(query)
+            except Exception as e:
+                print("[Prefetch] refresh failed for", repr(query), e)
+                metrics.inc("prefetch.errors")
+                products = None
+            spent = self._credits() - before if self._credits else 1
+            self._spent.append((time.time(), spent))
+            metrics.inc("prefetch.credits", spent)
+            if products:
+                result_cache.put(query, products, origin=WARM)
+                refreshed += 1
+                metrics.inc("prefetch.refreshed")
+
+        self.tracker.decay_all()
+        metrics.gauge("prefetch.budget_left", self._budget_left())
+        return refreshed
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sweep()
+            except Exception as e:
+                print("[Prefetch] sweep error:", e)
+            self._stop.wait(self.interval)
+
+    def start(self, search_fn, credits_fn=None):
+        """
+        search_fn(query) -> reranked product list, run at background priority.
+        credits_fn() -> scrape credits used so far by this thread
+        (scheduler.thread_credits); without it each refresh counts as one.
+        """
+        self._search = search_fn
+        self._credits = credits_fn
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def warm_hit_ratio(self):
+        lookups = metrics.counter("result_cache.hit") + metrics.counter("result_cache.miss")
+        return round(metrics.counter("result_cache.warm_hit") / lookups, 4) if lookups else 0.0
+
+
+prefetcher = Prefetcher()
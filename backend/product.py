@@ -0,0 +1,52 @@
+import sys
+from dataclasses import dataclass
+
+import orjson
+
+try:
+    import msgpack
+except ImportError:     # optional: falls back to orjson for cache blobs
+    msgpack = None
+
+
+@dataclass(slots=True)
+class Product:
+    """
+    One product as it flows through parse → search → rerank → /chat.
+    Slotted (no per-instance __dict__) and shared by reference between
+    stages instead of being copied.
+    """
+    title: str
+    url: str = ""
+    price: float | None = None
+    image: str | None = None
+    source: str = ""
+    description: str = ""
+    category: str = ""
+
+    def __post_init__(self):
+        # only a handful of distinct sources: share one string object each
+        self.source = sys.intern(self.source)
+
+    def to_dict(self):
+        # every field is a scalar: a flat read is enough (asdict deep-copies)
+        return {f: getattr(self, f) for f in self.__slots__}
+
+
+_FIELDS = Product.__slots__
+
+
+# ================================================================
+# COMPACT BINARY FORM (for caches)
+# ================================================================
+def pack_products(products):
+    """Products → bytes, as positional rows (no repeated key names)."""
+    rows = [[getattr(p, f) for f in _FIELDS] for p in products]
+    if msgpack is not None:
+        return msgpack.packb(rows, use_bin_type=True)
+    return orjson.dumps(rows)
+
+
+def unpack_products(blob):
+    rows = msgpack.unpackb(blob, raw=False) if msgpack is not None else orjson.loads(blob)
+    return [Product(*row) for row in rows]
@@ -0,0 +1,221 @@
+import os
+import time
+import pstats
+import random
+import cProfile
+import threading
+import tracemalloc
+from collections import deque
+
+from metrics import metrics
+
+
+# ================================================================
+# CONFIG
+# ================================================================
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"      # or POST /admin/profile at runtime
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0.05"))  # share of pipeline stages cProfiled
+PROFILE_TOP = int(os.getenv("PROFILE_TOP", "15"))
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", "10"))
+MEMORY_HISTORY = 20         # tracemalloc totals kept for the growth trend
+
+# allocations made by the profiler itself are not interesting
+_IGNORE = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class Profiler:
+    """
+    Runtime-switchable profiling for long-running workers.
+
+      - tracemalloc: snapshot() diffs the current heap against the previous
+        snapshot and the one taken at enable(), top allocators by growth
+      - cProfile: a PROFILE_SAMPLE_RATE share of sync pipeline stages run
+        under a profiler; stats are merged per stage name. Only one stage
+        is profiled at a time (Python 3.12+ refuses a second active
+        profiler, and on 3.12+ it sees every thread), so a sampled stage
+        that finds the profiler busy just runs unprofiled
+      - sizes(): entry counts / bytes of the in-process stores, from the
+        callables registered with register_size()
+
+    Everything is off (and costs nothing) until enable().
+    """
+
+    def __init__(self, sample_rate=PROFILE_SAMPLE_RATE, frames=TRACEMALLOC_FRAMES):
+        self.sample_rate = sample_rate
+        self.frames = frames
+        self.enabled = False
+        self.enabled_at = None
+        self._baseline = None
+        self._previous = None
+        self._history = deque(maxlen=MEMORY_HISTORY)    # (unix time, traced bytes)
+        self._stage_stats = {}                          # stage name -> pstats.Stats
+        self._stage_samples = {}
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self._cpu_lock = threading.Lock()      # held while a stage runs under cProfile
+        self._owns_tracemalloc = False
+
+    # ---------------- switch ----------------
+    def enable(self, sample_rate=None):
+        with self._lock:
+            if sample_rate is not None:
+                self.sample_rate = sample_rate
+            if self.enabled:
+                return
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.frames)
+                self._owns_tracemalloc = True
+            self._baseline = self._previous = self._take()
+            self._stage_stats.clear()
+            self._stage_samples.clear()
+            self.enabled = True
+            self.enabled_at = time.time()
+        print(f"[Profiler] enabled (stage sample rate {self.sample_rate})")
+
+    def disable(self):
+        with self._lock:
+            if not self.enabled:
+                return
+            self.enabled = False
+            self._baseline = self._previous = None
+            if self._owns_tracemalloc:      # leave someone else's tracing running
+                tracemalloc.stop()
+                self._owns_tracemalloc = False
+        print("[Profiler] disabled")
+
+    # ---------------- memory ----------------
+    def _take(self):
+        snap = tracemalloc.take_snapshot().filter_traces(_IGNORE)
+        total = sum(stat.size for stat in snap.statistics("filename"))
+        self._history.append((round(time.time(), 1), total))
+        metrics.gauge("profile.traced_bytes", total)
+        return snap
+
+    @staticmethod
+    def _top(snap, against, top, key="lineno"):
+        return [
+            {
+                "where": str(stat.traceback[0]) if stat.traceback else "?",
+                "size_kb": round(stat.size / 1024, 1),
+                "growth_kb": round(stat.size_diff / 1024, 1),
+                "count_growth": stat.count_diff,
+            }
+            for stat in snap.compare_to(against, key)[:top]
+        ]
+
+    def snapshot(self, top=PROFILE_TOP):
+        """Top allocators by growth since the last snapshot and since enable()."""
+        with self._lock:
+            if not self.enabled:
+                return {"enabled": False}
+            snap = self._take()
+            since_last = self._top(snap, self._previous, top)
+            since_enable = self._top(snap, self._baseline, top)
+            self._previous = snap
+            current, peak = tracemalloc.get_traced_memory()
+        return {
+            "enabled": True,
+            "traced_kb": round(current / 1024, 1),
+            "peak_kb": round(peak / 1024, 1),
+            "history": list(self._history),
+            "since_last_snapshot": since_last,
+            "since_enable": since_enable,
+        }
+
+    # ---------------- CPU ----------------
+    def sampled(self):
+        return self.enabled and random.random() < self.sample_rate
+
+    def run_profiled(self, name, fn, *args, **kwargs):
+        """Call fn under cProfile (in the calling thread) and merge the stats under `name`."""
+        if not self._cpu_lock.acquire(blocking=False):
+            metrics.inc("profile.stage_skipped")
+            return fn(*args, **kwargs)
+        try:
+            prof = cProfile.Profile()
+            try:
+                prof.enable()
+            except ValueError:      # a profiler outside this module is active
+                metrics.inc("profile.stage_skipped")
+                return fn(*args, **kwargs)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                prof.disable()
+                self._merge(name, prof)
+        finally:
+            self._cpu_lock.release()
+
+    def _merge(self, name, prof):
+        with self._lock:
+            if name in self._stage_stats:
+                self._stage_stats[name].add(prof)
+            else:
+                self._stage_stats[name] = pstats.Stats(prof)
+            self._stage_samples[name] = self._stage_samples.get(name, 0) + 1
+        metrics.inc("profile.stage_samples")
+
+    def cpu_report(self, top=PROFILE_TOP):
+        """Per stage: the `top` functions by cumulative time over all sampled runs."""
+        out = {}
+        with self._lock:
+            for name, stats in self._stage_stats.items():
+                stats.sort_stats("cumulative")
+                rows = []
+                for func in stats.fcn_list[:top]:
+                    _, calls, own, cumulative, _ = stats.stats[func]
+                    filename, line, fn_name = func
+                    rows.append({
+                        "function": f"{os.path.basename(filename)}:{line}({fn_name})",
+                        "calls": calls,
+                        "own_seconds": round(own, 4),
+                        "cumulative_seconds": round(cumulative, 4),
+                    })
+                out[name] = {
+                    "samples": self._stage_samples[name],
+                    "total_seconds": round(stats.total_tt, 4),
+                    "top": rows,
+                }
+        return out
+
+    # ---------------- store sizes ----------------
+    def register_size(self, name, fn):
+        """fn() -> int or dict, e.g. {"entries": n, "bytes": b}."""
+        self._sizes[name] = fn
+
+    def sizes(self):
+        out = {}
+        for name, fn in self._sizes.items():
+            try:
+                out[name] = fn()
+            except Exception as e:
+                out[name] = f"error: {e}"
+        return out
+
+    def report(self):
+        return {
+            "enabled": self.enabled,
+            "enabled_at": self.enabled_at,
+            "sample_rate": self.sample_rate,
+            "sizes": self.sizes(),
+            "cpu": self.cpu_report() if self.enabled else {},
+        }
+
+
+def dir_size(path):
+    files = total = 0
+    for entry in os.scandir(path):
+        if entry.is_file():
+            files += 1
+            total += entry.stat().st_size
+    return {"files": files, "bytes": total}
+
+
+profiler = Profiler()
+if PROFILING_ENABLED:
+    profiler.enable()
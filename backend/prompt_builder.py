@@ -0,0 +1,124 @@
+import os
+import re
+
+from metrics import metrics
+
+
+# ================================================================
+# CONFIG
+# ================================================================
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1800"))
+PROMPT_TITLE_CHARS = int(os.getenv("PROMPT_TITLE_CHARS", "90"))
+
+
+# ================================================================
+# TOKEN COUNTING
+# ================================================================
+_tokenizer = None
+
+
+def count_tokens(text):
+    """
+    Local token count. Uses the reranker's WordPiece tokenizer (already in
+    memory) and falls back to a word/punctuation estimate.
+    """
+    global _tokenizer
+    if not text:
+        return 0
+    if _tokenizer is None:
+        try:
+            from crossencoder import tokenizer
+            _tokenizer = tokenizer
+        except Exception:
+            _tokenizer = False
+    if _tokenizer:
+        return len(_tokenizer.tokenize(text))
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+
+def _norm(text):
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+# ================================================================
+# PROMPT BUILDER
+# ================================================================
+def format_products(products, max_title=PROMPT_TITLE_CHARS):
+    # URLs are left out: the preamble tells the model not to repeat them and the UI shows them
+    lines = []
+    for p in products:
+        title = p.title if len(p.title) <= max_title else p.title[:max_title].rstrip() + "…"
+        price = f" ₹{p.price:g}" if isinstance(p.price, (int, float)) else ""
+        lines.append(f"{p.source}: {title}{price}")
+    return "\n".join(lines)
+
+
+def dedupe_history(messages, recalled, exclude=()):
+    """
+    Recent messages first, then recalled memories that are not already
+    present (exact or contained), minus anything already in this turn's
+    message (`exclude`: the user's text and image caption).
+    """
+    out, seen = [], []
+    skip = {_norm(t) for t in exclude if t}
+    for text in list(messages) + list(recalled):
+        n = _norm(text)
+        if not n or n in skip or any(n in s for s in seen):
+            continue
+        seen.append(n)
+        out.append(text)
+    return out
+
+
+def build_prompt(preamble, message, image_caption="", products=(), history=(), recalled=(),
+                 summary="", budget=PROMPT_TOKEN_BUDGET):
+    """
+    Assemble the Cohere chat call within `budget` tokens.
+
+    Priority: preamble and the user's message always go in, then the
+    product list (trimmed from the bottom), then the summary of older turns,
+    then history newest-first until the budget runs out.
+    Returns {"message", "chat_history", "tokens"}.
+    """
+    user_input = message or ""
+    if image_caption:
+        user_input += f"\nUser uploaded an image showing: {image_caption}"
+    user_input = user_input or "Help the user with shopping."
+
+    used = count_tokens(preamble) + count_tokens(user_input)
+
+    products = list(products)
+    while products:
+        block = f"\n\nProducts found:\n{format_products(products)}"
+        cost = count_tokens(block)
+        if used + cost <= budget or len(products) == 1:
+            user_input += block
+            used += cost
+            break
+        products.pop()
+
+    turns = dedupe_history(history, recalled, exclude=(message, image_caption))
+    kept = []
+    summary_turn = f"Earlier in this chat the user mentioned: {summary}" if summary else ""
+    summary_cost = count_tokens(summary_turn)
+    if summary_turn and used + summary_cost <= budget:
+        used += summary_cost
+    else:
+        summary_turn = ""
+
+    for text in reversed(turns):
+        cost = count_tokens(text)
+        if used + cost > budget:
+            metrics.inc("llm.history_turns_dropped")
+            continue
+        kept.append(text)
+        used += cost
+    kept.reverse()
+
+    chat_history = []
+    if summary_turn:
+        chat_history.append({"role": "USER", "message": summary_turn})
+    chat_history += [{"role": "USER", "message": m} for m in kept]
+
+    metrics.observe("llm.prompt_tokens", used)
+    return {"message": user_input, "chat_history": chat_history, "tokens": used}
@@ -0,0 +1,126 @@
+import os
+import json
+from pathlib import Path
+import torch
+import torch.nn as nn
+from transformers import DistilBertModel, DistilBertConfig, DistilBertTokenizerFast
+from safetensors.torch import load_file, save_file
+
+# ------------------------------------------
+# Reranker model definition and file formats, with nothing loaded at import:
+# crossencoder.py loads the serving model from here, and the offline tools
+# (export_reranker.py, train_reranker.py) use it without that load.
+# ------------------------------------------
+BASE_MODEL = "distilbert-base-uncased"
+RERANKER_WEIGHTS = os.getenv("RERANKER_WEIGHTS", "crossencoder_reranker.pt")
+RERANKER_ARTIFACT = os.getenv("RERANKER_ARTIFACT", "reranker_artifact")
+CHECKPOINT_FORMAT = "copilot-reranker"      # versioned checkpoints (distilled students)
+ARTIFACT_VERSION = 3                        # v3: tokenizer.json + model.safetensors + reranker.json
+
+class CrossEncoder(nn.Module):
+    def __init__(self, n_layers=None, config=None):
+        super().__init__()
+        if config is not None:
+            self.bert = DistilBertModel(config)
+        elif n_layers is None:
+            self.bert = DistilBertModel.from_pretrained(BASE_MODEL)
+        else:
+            # shallower student: the shape comes from the config, weights from the checkpoint
+            self.bert = DistilBertModel(DistilBertConfig.from_pretrained(BASE_MODEL, n_layers=n_layers))
+        self.fc = nn.Linear(768, 1)
+        self.sigmoid = nn.Sigmoid()
+
+    def score_encoded(self, enc):
+        outputs = self.bert(
+            input_ids=enc["input_ids"],
+            attention_mask=enc["attention_mask"]
+        )
+        cls = outputs.last_hidden_state[:, 0, :]
+        return self.sigmoid(self.fc(cls))
+
+    def forward(self, queries, products, tokenizer):
+        encoded = tokenizer(
+            queries,
+            products,
+            padding=True,
+            truncation=True,
+            return_tensors="pt"
+        )
+        return self.score_encoded(encoded)
+
+def load_reranker(path=RERANKER_WEIGHTS):
+    """
+    Loads either the original plain state_dict (6-layer DistilBERT) or a
+    versioned checkpoint {"format", "version", "n_layers", "state_dict"}
+    written by distill_reranker.py.
+    """
+    ckpt = torch.load(path, map_location="cpu")
+    if isinstance(ckpt, dict) and ckpt.get("format") == CHECKPOINT_FORMAT:
+        model = CrossEncoder(n_layers=ckpt["n_layers"])
+        model.load_state_dict(ckpt["state_dict"])
+        print(f"Reranker: {ckpt['n_layers']}-layer student v{ckpt['version']} from {path}")
+    else:
+        model = CrossEncoder()
+        model.load_state_dict(ckpt)
+    model.eval()
+    return model
+
+# ================================================================
+# ARTIFACTS (v3)
+# ================================================================
+def save_artifact(model, tokenizer, directory, **meta):
+    """
+    directory/
+        reranker.json        format, version, DistilBERT config, extra meta
+        model.safetensors    every parameter and buffer
+        tokenizer.json (+ tokenizer_config.json, special_tokens_map.json)
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    tensors = {k: v.contiguous() for k, v in model.state_dict().items()}
+    for name, buf in model.named_buffers():
+        tensors.setdefault(name, buf.contiguous())      # non-persistent ones too (position_ids)
+    save_file(tensors, str(directory / "model.safetensors"))
+
+    if not tokenizer.is_fast:
+        tokenizer.save_pretrained(directory)
+        tokenizer = DistilBertTokenizerFast.from_pretrained(directory)     # local slow → fast conversion
+    tokenizer.save_pretrained(directory)
+
+    manifest = {
+        "format": CHECKPOINT_FORMAT,
+        "version": ARTIFACT_VERSION,
+        "config": model.bert.config.to_dict(),
+        **meta,
+    }
+    (directory / "reranker.json").write_text(json.dumps(manifest, indent=2))
+
+def load_artifact(directory=RERANKER_ARTIFACT):
+    """
+    Builds the model on the meta device (no random init, no hub download)
+    and binds the memory-mapped safetensors directly as its weights.
+    """
+    directory = Path(directory)
+    manifest = json.loads((directory / "reranker.json").read_text())
+    if manifest.get("format") != CHECKPOINT_FORMAT or manifest.get("version") != ARTIFACT_VERSION:
+        raise ValueError(f"{directory}: unsupported reranker artifact {manifest.get('format')} v{manifest.get('version')}")
+
+    with torch.device("meta"):
+        model = CrossEncoder(config=DistilBertConfig.from_dict(manifest["config"]))
+    tensors = load_file(str(directory / "model.safetensors"))
+    result = model.load_state_dict(tensors, strict=False, assign=True)
+    if result.missing_keys:
+        raise ValueError(f"{directory}: missing weights {result.missing_keys[:5]}")
+    for name in result.unexpected_keys:         # non-persistent buffers
+        module, _, leaf = name.rpartition(".")
+        model.get_submodule(module).register_buffer(leaf, tensors[name], persistent=False)
+    model.eval()
+
+    tok = DistilBertTokenizerFast.from_pretrained(directory)
+    print(f"Reranker: artifact v{manifest['version']} ({model.bert.config.n_layers} layers) from {directory}")
+    return model, tok
+
+def weights_id(path):
+    """Identity of a weights file (path + mtime): cached scores are only valid for it."""
+    return f"{os.path.abspath(path)}@{os.stat(path).st_mtime_ns}"
@@ -0,0 +1,333 @@
+import os
+import json
+import time
+import random
+import hashlib
+from pathlib import Path
+from collections import defaultdict
+
+import numpy as np
+import torch
+from torch.utils.data import Dataset, DataLoader, Sampler
+
+from catalog_index import clean_tokens
+
+
+# ================================================================
+# CONFIG
+# ================================================================
+TRAIN_CACHE_DIR = Path(os.getenv("TRAIN_CACHE_DIR", "train_cache"))
+TRAIN_MAX_LEN = int(os.getenv("TRAIN_MAX_LEN", "128"))
+TRAIN_WORKERS = int(os.getenv("TRAIN_WORKERS", str(min(4, os.cpu_count() or 1))))
+SEED = int(os.getenv("TRAIN_SEED", "42"))
+
+
+def seed_everything(seed=SEED):
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+
+def train_test_split(pairs, test_size=0.2, seed=SEED, group=lambda p: p[0]):
+    """
+    Held-out split by group (default: the query), so duplicated rows and
+    near-identical pairs never land on both sides.
+    """
+    groups = sorted({group(p) for p in pairs})
+    random.Random(seed).shuffle(groups)
+    held_out = set(groups[:max(1, int(len(groups) * test_size))])
+    train = [p for p in pairs if group(p) not in held_out]
+    test = [p for p in pairs if group(p) in held_out]
+    return train, test
+
+
+# ================================================================
+# HARD NEGATIVES
+# ================================================================
+class TitleIndex:
+    """word → title ids, so a hard negative is one dict lookup instead of a scan of every title."""
+
+    def __init__(self, titles):
+        self.titles = titles
+        postings = defaultdict(list)
+        for i, title in enumerate(titles):
+            for w in set(clean_tokens(title)):
+                postings[w].append(i)
+        self.postings = dict(postings)
+
+    def sharing(self, word):
+        return self.postings.get(word, ())
+
+    def hard_negative(self, word, exclude, rng):
+        ids = self.sharing(word)
+        # a couple of draws is enough unless the word only occurs in `exclude`
+        for _ in range(4):
+            if not ids:
+                break
+            title = self.titles[rng.choice(ids)]
+            if title != exclude:
+                return title
+        return self.easy_negative(exclude, rng)
+
+    def easy_negative(self, exclude, rng):
+        title = rng.choice(self.titles)
+        while title == exclude and len(self.titles) > 1:
+            title = rng.choice(self.titles)
+        return title
+
+
+def build_pairs(raw_data, hard_ratio=0.15, seed=SEED):
+    """
+    Anchored queries from catalog items: a few title words + a few description
+    words. One positive and one (hard or easy) negative per item.
+    """
+    rng = random.Random(seed)
+    valid_items = [item for item in raw_data if item.get("title") and item.get("description")]
+    index = TitleIndex([item["title"] for item in valid_items])
+
+    pairs = []
+    for item in valid_items:
+        title = item["title"]
+        clean_title = clean_tokens(title)
+        clean_desc = clean_tokens(item["description"])
+        if len(clean_title) < 2 or len(clean_desc) < 3:
+            continue
+
+        t_words = clean_title[:rng.randint(1, 2)]
+        d_start = rng.randint(0, len(clean_desc) - 3)
+        d_words = clean_desc[d_start: d_start + rng.randint(1, 2)]
+        query = " ".join(t_words + d_words)
+
+        pairs.append([query, title, 1.0])
+        if rng.random() < hard_ratio:
+            negative = index.hard_negative(t_words[0], title, rng)
+        else:
+            negative = index.easy_negative(title, rng)
+        pairs.append([query, negative, 0.0])
+    return pairs
+
+
+# ================================================================
+# PRE-TOKENIZED DATASET
+# ================================================================
+class PretokenizedDataset(Dataset):
+    """
+    (query, title) pairs tokenized once and stored as flat int32 arrays:
+
+        ids      all token ids back to back
+        offsets  row i is ids[offsets[i]:offsets[i+1]]
+        labels   float32
+
+    Arrays are .npy files opened with mmap, so DataLoader workers share
+    the pages instead of copying the dataset.
+    """
+
+    FILES = ("ids", "offsets", "labels")
+
+    def __init__(self, ids, offsets, labels, pad_id=0):
+        self.ids = ids
+        self.offsets = offsets
+        self.labels = labels
+        self.pad_id = pad_id
+        self.lengths = np.diff(offsets)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __getitem__(self, idx):
+        return self.ids[self.offsets[idx]:self.offsets[idx + 1]], self.labels[idx]
+
+    @staticmethod
+    def cache_key(pairs, tokenizer, max_len):
+        h = hashlib.sha1()
+        h.update(f"{tokenizer.name_or_path}|{max_len}|".encode("utf-8"))
+        h.update(json.dumps(pairs, ensure_ascii=False).encode("utf-8"))
+        return h.hexdigest()[:16]
+
+    @classmethod
+    def tokenize(cls, pairs, tokenizer, max_len=TRAIN_MAX_LEN, chunk=4096):
+        rows = []
+        for i in range(0, len(pairs), chunk):
+            part = pairs[i:i + chunk]
+            enc = tokenizer([p[0] for p in part], [p[1] for p in part],
+                            truncation=True, max_length=max_len)
+            rows.extend(enc["input_ids"])
+        lengths = np.fromiter((len(r) for r in rows), dtype=np.int64, count=len(rows))
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        ids = np.fromiter((t for r in rows for t in r), dtype=np.int32, count=int(offsets[-1]))
+        labels = np.asarray([p[2] for p in pairs], dtype=np.float32)
+        return ids, offsets, labels
+
+    @classmethod
+    def load_or_build(cls, pairs, tokenizer, name, max_len=TRAIN_MAX_LEN, cache_dir=TRAIN_CACHE_DIR):
+        directory = Path(cache_dir) / f"{name}-{cls.cache_key(pairs, tokenizer, max_len)}"
+        if all((directory / f"{f}.npy").exists() for f in cls.FILES):
+            arrays = [np.load(directory / f"{f}.npy", mmap_mode="r") for f in cls.FILES]
+            print(f"Loaded pre-tokenized {name} set from {directory}")
+        else:
+            t0 = time.perf_counter()
+            arrays = cls.tokenize(pairs, tokenizer, max_len)
+            directory.mkdir(parents=True, exist_ok=True)
+            for f, arr in zip(cls.FILES, arrays):
+                np.save(directory / f"{f}.npy", arr)
+            print(f"Tokenized {len(pairs)} {name} pairs in {time.perf_counter() - t0:.1f}s → {directory}")
+        return cls(*arrays, pad_id=tokenizer.pad_token_id or 0)
+
+
+# ================================================================
+# BATCHING
+# ================================================================
+class LengthGroupedSampler(Sampler):
+    """
+    Shuffled batches of similar length: shuffle, cut into chunks of
+    `batch_size * group` rows, sort each chunk by length, split into
+    batches, shuffle the batches. Padding stays small and the order
+    still changes every epoch.
+    """
+
+    def __init__(self, lengths, batch_size, shuffle=True, group=50, seed=SEED):
+        self.lengths = np.asarray(lengths)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.group = group
+        self.seed = seed
+        self.epoch = 0
+
+    def __iter__(self):
+        rng = np.random.default_rng(self.seed + self.epoch)
+        order = rng.permutation(len(self.lengths)) if self.shuffle else np.arange(len(self.lengths))
+        size = self.batch_size * self.group
+        batches = []
+        for start in range(0, len(order), size):
+            chunk = order[start:start + size]
+            chunk = chunk[np.argsort(self.lengths[chunk], kind="stable")]
+            batches.extend(chunk[i:i + self.batch_size] for i in range(0, len(chunk), self.batch_size))
+        if self.shuffle:
+            rng.shuffle(batches)
+        self.epoch += 1
+        return iter([b.tolist() for b in batches])
+
+    def __len__(self):
+        return (len(self.lengths) + self.batch_size - 1) // self.batch_size
+
+
+class PadCollate:
+    """Pads each batch only to its own longest row."""
+
+    def __init__(self, pad_id=0):
+        self.pad_id = pad_id
+
+    def __call__(self, batch):
+        width = max(len(ids) for ids, _ in batch)
+        input_ids = np.full((len(batch), width), self.pad_id, dtype=np.int64)
+        mask = np.zeros((len(batch), width), dtype=np.int64)
+        for i, (ids, _) in enumerate(batch):
+            input_ids[i, :len(ids)] = ids
+            mask[i, :len(ids)] = 1
+        labels = torch.tensor([label for _, label in batch], dtype=torch.float32)
+        return {"input_ids": torch.from_numpy(input_ids), "attention_mask": torch.from_numpy(mask)}, labels
+
+
+def make_loader(dataset, batch_size, shuffle, num_workers=TRAIN_WORKERS, seed=SEED):
+    return DataLoader(
+        dataset,
+        batch_sampler=LengthGroupedSampler(dataset.lengths, batch_size, shuffle=shuffle, seed=seed),
+        collate_fn=PadCollate(dataset.pad_id),
+        num_workers=num_workers,
+        persistent_workers=num_workers > 0,
+        pin_memory=torch.cuda.is_available(),
+    )
+
+
+# ================================================================
+# TRAIN / EVALUATE
+# ================================================================
+def train(model, loader, optimizer, criterion, device, epochs=2):
+    """
+    Returns per-batch loss/accuracy (recorded during training, so the
+    curves need no extra pass) plus throughput numbers.
+    """
+    losses, accs = [], []
+    examples = 0
+    start = time.perf_counter()
+    for epoch in range(epochs):
+        model.train()
+        epoch_loss = 0
+        for enc, labels in loader:
+            enc = {k: v.to(device, non_blocking=True) for k, v in enc.items()}
+            labels = labels.to(device, non_blocking=True)
+
+            optimizer.zero_grad()
+            scores = model(enc).view(-1)
+            loss = criterion(scores, labels)
+            loss.backward()
+            optimizer.step()
+
+            losses.append(loss.item())
+            accs.append(((scores > 0.5).float() == labels).float().mean().item())
+            epoch_loss += losses[-1]
+            examples += len(labels)
+        print(f"Epoch {epoch + 1} Average Loss: {epoch_loss / max(1, len(loader)):.4f}")
+
+    seconds = time.perf_counter() - start
+    return {
+        "losses": losses,
+        "accs": accs,
+        "examples": examples,
+        "seconds": seconds,
+        "examples_per_second": examples / seconds if seconds else 0.0,
+    }
+
+
+def evaluate(model, loader, criterion, device):
+    """One pass over a held-out loader: loss, accuracy, labels, scores."""
+    model.eval()
+    y_true, y_score = [], []
+    total_loss = 0.0
+    start = time.perf_counter()
+    with torch.no_grad():
+        for enc, labels in loader:
+            enc = {k: v.to(device, non_blocking=True) for k, v in enc.items()}
+            scores = model(enc).view(-1).cpu()
+            total_loss += criterion(scores, labels).item() * len(labels)
+            y_true.extend(labels.tolist())
+            y_score.extend(scores.tolist())
+    seconds = time.perf_counter() - start
+    y_true, y_score = np.asarray(y_true), np.asarray(y_score)
+    return {
+        "loss": total_loss / max(1, len(y_true)),
+        "accuracy": float(((y_score > 0.5) == (y_true > 0.5)).mean()) if len(y_true) else 0.0,
+        "y_true": y_true,
+        "y_score": y_score,
+        "y_pred": (y_score > 0.5).astype(int),
+        "seconds": seconds,
+        "examples_per_second": len(y_true) / seconds if seconds else 0.0,
+    }
+
+
+def predict(model, dataset, device, batch_size=64):
+    """Scores for every row, in dataset order (e.g. teacher labels for distillation)."""
+    model.eval()
+    collate = PadCollate(dataset.pad_id)
+    out = np.zeros(len(dataset), dtype=np.float32)
+    with torch.no_grad():
+        for idx in LengthGroupedSampler(dataset.lengths, batch_size, shuffle=False):
+            enc, _ = collate([dataset[i] for i in idx])
+            enc = {k: v.to(device) for k, v in enc.items()}
+            out[idx] = model(enc).view(-1).cpu().numpy()
+    return out
+
+
+def report(name, train_stats, eval_stats, wall_seconds):
+    print(f"\n===== {name} =====")
+    print(json.dumps({
+        "Train examples": train_stats["examples"],
+        "Train seconds": round(train_stats["seconds"], 1),
+        "Train examples/sec": round(train_stats["examples_per_second"], 1),
+        "Eval examples": int(len(eval_stats["y_true"])),
+        "Eval examples/sec": round(eval_stats["examples_per_second"], 1),
+        "Held-out loss": round(eval_stats["loss"], 4),
+        "Held-out accuracy": round(eval_stats["accuracy"], 4),
+        "Wall-clock seconds": round(wall_seconds, 1),
+    }, indent=4))
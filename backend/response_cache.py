@@ -0,0 +1,155 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from metrics import metrics
+from score_cache import normalize_query, product_key
+
+
+# ================================================================
+# CONFIG
+# ================================================================
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") == "1"
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "3600"))           # seconds
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+RESPONSE_CACHE_THRESHOLD = float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.92"))   # cosine
+
+
+def product_fingerprint(products, context=""):
+    """
+    Order-insensitive hash of the product set shown with a reply, plus any
+    per-conversation `context` the reply was written from (earlier turns),
+    so a reply is only reused where it could have been written.
+    """
+    keys = sorted(product_key(p) for p in products)
+    return hashlib.sha1("\x1f".join(keys + ["\x1e", context]).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Semantic cache of LLM replies.
+
+    A reply is reused when the product set and conversation context are
+    identical (fingerprint) and the rewritten query is a near-duplicate
+    (MiniLM cosine ≥ threshold).
+    Entries expire after `ttl` and the least recently used are evicted
+    beyond `max_size`.
+    """
+
+    def __init__(self, ttl=RESPONSE_CACHE_TTL, max_size=RESPONSE_CACHE_SIZE,
+                 threshold=RESPONSE_CACHE_THRESHOLD, encoder=None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.threshold = threshold
+        self._encoder = encoder
+        self._entries = OrderedDict()       # (fingerprint, query) -> (vec, reply, expires_at)
+        self._by_fp = {}                    # fingerprint -> set of entry keys
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.llm_seconds = 0.0              # time spent in real LLM calls
+        self.llm_calls = 0
+
+    def _encode(self, text):
+        if self._encoder is None:
+            from retrieval import encode
+            self._encoder = encode
+        return self._encoder([text])[0]
+
+    def _drop(self, key):
+        self._entries.pop(key, None)
+        keys = self._by_fp.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_fp[key[0]]
+
+    def get(self, query, products, context=""):
+        """Returns a cached reply or None. Only turns that show products are cached."""
+        if not products:
+            return None
+        fp = product_fingerprint(products, context)
+        q = normalize_query(query)
+        now = time.time()
+
+        with self._lock:
+            candidates = list(self._by_fp.get(fp, ()))
+        reply = None
+        if candidates:
+            exact = (fp, q)
+            entry = self._entries.get(exact)
+            if entry is not None and entry[2] > now:
+                reply, key = entry[1], exact
+            else:
+                vec = self._encode(q)
+                best, key = self.threshold, None
+                for k in candidates:
+                    e = self._entries.get(k)
+                    if e is None or e[2] <= now:
+                        continue
+                    sim = float(np.dot(vec, e[0]))
+                    if sim >= best:
+                        best, key, reply = sim, k, e[1]
+
+            with self._lock:
+                for k in candidates:
+                    e = self._entries.get(k)
+                    if e is not None and e[2] <= now:
+                        self._drop(k)
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+
+        with self._lock:
+            if reply is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if reply is None:
+            metrics.inc("response_cache.miss")
+            return None
+        metrics.inc("response_cache.hit")
+        metrics.gauge("response_cache.llm_seconds_saved", round(self.seconds_saved(), 3))
+        return reply
+
+    def put(self, query, products, reply, llm_seconds=None, context=""):
+        if llm_seconds is not None:
+            with self._lock:
+                self.llm_seconds += llm_seconds
+                self.llm_calls += 1
+        if not products or not reply:
+            return
+        fp = product_fingerprint(products, context)
+        q = normalize_query(query)
+        vec = self._encode(q)
+        key = (fp, q)
+        with self._lock:
+            self._entries[key] = (vec, reply, time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            self._by_fp.setdefault(fp, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+            metrics.gauge("response_cache.size", len(self._entries))
+
+    def seconds_saved(self):
+        """Estimated LLM time avoided: hits × mean reply latency."""
+        if not self.llm_calls:
+            return 0.0
+        return self.hits * (self.llm_seconds / self.llm_calls)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "enabled": RESPONSE_CACHE_ENABLED,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "llm_seconds_saved": round(self.seconds_saved(), 3),
+        }
+
+
+response_cache = ResponseCache()
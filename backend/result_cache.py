@@ -0,0 +1,116 @@
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+
+from metrics import metrics
+from product import pack_products, unpack_products
+from shared_state import backend as shared_backend
+
+
+# ================================================================
+# CONFIG
+# ================================================================
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "1800"))        # seconds
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "512"))
+
+LIVE = "live"       # entry written by a /chat request
+WARM = "warm"       # entry written by the prefetch worker
+
+
+def normalize_query(query):
+    """'Red  Dress!' and 'dress red' share one cache key: 'dress red'."""
+    words = re.sub(r"[^\w\s]", " ", query or "").lower().split()
+    return " ".join(sorted(set(words)))
+
+
+class ResultCache:
+    """
+    TTL + LRU cache of final (scraped, parsed, reranked) product lists,
+    keyed by normalized query.
+
+    With a shared backend (SHARED_BACKEND=redis) entries live there instead,
+    so every worker sees the same cache and the backend handles expiry.
+    """
+
+    def __init__(self, ttl=RESULT_CACHE_TTL, max_size=RESULT_CACHE_SIZE, backend=None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.backend = backend
+        self._entries = OrderedDict()   # key -> (packed products, expires_at, origin)
+        self._lock = threading.Lock()
+
+    def _shared_get(self, key):
+        raw = self.backend.get(f"result:{key}")
+        if raw is None:
+            return None
+        origin, _, blob = raw.partition(b"\x00")
+        return blob, origin.decode()
+
+    def get(self, query):
+        key = normalize_query(query)
+        if self.backend is not None:
+            found = self._shared_get(key)
+            if found is None:
+                metrics.inc("result_cache.miss")
+                return None
+            blob, origin = found
+            metrics.inc("result_cache.hit")
+            if origin == WARM:
+                metrics.inc("result_cache.warm_hit")
+            return unpack_products(blob)
+
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                metrics.inc("result_cache.miss")
+                return None
+            self._entries.move_to_end(key)
+
+        blob, _, origin = entry
+        metrics.inc("result_cache.hit")
+        if origin == WARM:
+            metrics.inc("result_cache.warm_hit")
+        return unpack_products(blob)
+
+    def put(self, query, products, origin=LIVE, ttl=None):
+        key = normalize_query(query)
+        if not key:
+            return
+        blob = pack_products(products)
+        if self.backend is not None:
+            self.backend.set(f"result:{key}", origin.encode() + b"\x00" + blob, ttl=ttl or self.ttl)
+            return
+        expires = time.time() + (ttl or self.ttl)
+        with self._lock:
+            self._entries[key] = (blob, expires, origin)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            metrics.gauge("result_cache.size", len(self._entries))
+
+    def expires_in(self, query):
+        """Seconds until the entry expires; None when absent."""
+        if self.backend is not None:
+            return self.backend.ttl(f"result:{normalize_query(query)}")
+        entry = self._entries.get(normalize_query(query))
+        if entry is None:
+            return None
+        return entry[1] - time.time()
+
+    def size(self):
+        """Entries held: this worker's, or every worker's with a shared backend."""
+        if self.backend is not None:
+            return self.backend.count("result:")
+        with self._lock:
+            return len(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+result_cache = ResultCache(backend=shared_backend if shared_backend.shared else None)
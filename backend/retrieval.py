@@ -0,0 +1,192 @@
+import os
+import json
+from pathlib import Path
+
+import numpy as np
+
+from vector_memory import vector_memory
+from metrics import metrics
+from catalog_index import CatalogIndex, reciprocal_rank_fusion
+from attribute_store import AttributeStore, filter_products
+from product import Product
+
+
+# ================================================================
+# CONFIG
+# ================================================================
+CATALOG_META = os.getenv("CATALOG_META", "products_meta.json")
+CATALOG_EMB = os.getenv("CATALOG_EMB", "product_embs.npz")
+RERANK_TOP_K = int(os.getenv("RERANK_TOP_K", "15"))        # candidates sent to the cross-encoder
+CATALOG_CANDIDATES = int(os.getenv("CATALOG_CANDIDATES", "100"))
+STAGE1_SCORER = os.getenv("STAGE1_SCORER", "hybrid")       # dense | bm25 | hybrid
+FINAL_RESULTS = 5
+
+
+def _normalize_rows(mat):
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return mat / norms
+
+
+# ================================================================
+# CATALOG (products_meta.json + MiniLM text embeddings from product_embs.py)
+# ================================================================
+class Catalog:
+    def __init__(self, meta_path=CATALOG_META, emb_path=CATALOG_EMB):
+        self.products = []
+        self.embeddings = None      # (N, 384) float32, L2-normalized
+        self.index = None           # BM25 CatalogIndex
+        self.attrs = None           # columnar price / source
+        self._load(Path(meta_path), Path(emb_path))
+
+    def _load(self, meta_path, emb_path):
+        if not meta_path.exists():
+            return
+        with open(meta_path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+
+        self.products = [
+            Product(
+                title=p.get("title") or "Product",
+                url=p.get("url") or "",
+                price=p.get("price"),
+                image=p.get("image"),
+                source="Catalog",
+                description=p.get("description") or "",
+                category=p.get("category") or "",
+            )
+            for p in raw
+        ]
+
+        if emb_path.exists():
+            embs = np.load(emb_path)["txt_embs"].astype(np.float32)
+            if len(embs) == len(self.products):
+                self.embeddings = _normalize_rows(embs)
+            else:
+                print("[Catalog] product_embs.npz does not match products_meta.json, ignoring it")
+
+        self.index = CatalogIndex.load_or_build(raw)
+        self.attrs = AttributeStore(self.products)
+        print(f"[Catalog] Loaded {len(self.products)} products")
+
+    def __len__(self):
+        return len(self.products)
+
+    def allowed(self, constraints):
+        """Vectorized keep-mask over catalog rows (None = no constraints)."""
+        if not constraints or self.attrs is None:
+            return None
+        return self.attrs.mask(
+            min_price=constraints.get("min_price"),
+            max_price=constraints.get("max_price"),
+        )
+
+    def dense_search(self, query_vec, k, allowed=None):
+        """Top-k catalog rows by cosine similarity: [(score, row), ...]."""
+        if self.embeddings is None or not len(self.products):
+            return []
+        sims = self.embeddings @ query_vec
+        if allowed is not None:
+            sims = np.where(allowed, sims, -np.inf)
+            k = min(k, int(allowed.sum()))
+            if k == 0:
+                return []
+        k = min(k, len(sims))
+        idx = np.argpartition(-sims, k - 1)[:k]
+        idx = idx[np.argsort(-sims[idx])]
+        return [(float(sims[i]), int(i)) for i in idx]
+
+    def keyword_search(self, query, k, allowed=None):
+        """Top-k catalog rows by BM25: [(score, row), ...]."""
+        if self.index is None:
+            return []
+        if allowed is None:
+            return self.index.search(query, k)
+        # over-fetch, then drop rows that violate the constraints
+        hits = self.index.search(query, k * 4)
+        return [(s, row) for s, row in hits if allowed[row]][:k]
+
+
+catalog = Catalog()
+
+
+# ================================================================
+# STAGE ONE: bi-encoder / BM25 prefilter
+# ================================================================
+def encode(texts):
+    """MiniLM embeddings (L2-normalized) from the model vector_memory already loaded."""
+    vecs = vector_memory.model.encode(
+        texts, batch_size=64, convert_to_numpy=True, show_progress_bar=False
+    )
+    return _normalize_rows(np.atleast_2d(vecs).astype(np.float32))
+
+
+def stage_one(query, products, k=RERANK_TOP_K, include_catalog=True, scorer=STAGE1_SCORER,
+              constraints=None):
+    """
+    Cheap scoring of every scraped product (plus catalog hits) with MiniLM
+    dot products, BM25, or both fused with reciprocal rank fusion.
+    Price constraints are applied as masks before any scoring.
+    Returns the best k candidates, best first.
+    """
+    if constraints and products:
+        before = len(products)
+        products = filter_products(products, constraints)
+        metrics.inc("retrieval.filtered_out", before - len(products))
+    if not query.strip():
+        return products[:k]
+
+    candidates = list(products)
+    dense, lexical = {}, {}         # candidate position -> score
+
+    use_dense = scorer in ("dense", "hybrid")
+    use_lexical = scorer in ("bm25", "hybrid") and catalog.index is not None
+
+    q_vec = encode([query])[0] if use_dense else None
+    if products and use_dense:
+        p_vecs = encode([p.title for p in products])
+        dense.update(enumerate((p_vecs @ q_vec).tolist()))
+    if products and use_lexical:
+        for i, p in enumerate(products):
+            lexical[i] = catalog.index.score_text(query, p.title)
+
+    if include_catalog and len(catalog):
+        rows = {}
+        allowed = catalog.allowed(constraints)
+        if use_dense:
+            for score, row in catalog.dense_search(q_vec, CATALOG_CANDIDATES, allowed):
+                rows.setdefault(row, len(candidates) + len(rows))
+                dense[rows[row]] = score
+        if use_lexical:
+            for score, row in catalog.keyword_search(query, CATALOG_CANDIDATES, allowed):
+                rows.setdefault(row, len(candidates) + len(rows))
+                lexical[rows[row]] = score
+        candidates += [catalog.products[row] for row in rows]
+
+    rankings = [
+        sorted(scores, key=scores.get, reverse=True)
+        for scores in (dense, lexical) if scores
+    ]
+    if not rankings:
+        return candidates[:k]
+    fused = reciprocal_rank_fusion(*rankings) if len(rankings) > 1 else [(0, i) for i in rankings[0]]
+
+    metrics.observe("retrieval.stage_one_candidates", len(candidates))
+    return [candidates[i] for _, i in fused[:k]]
+
+
+# ================================================================
+# STAGE TWO: cross-encoder on the top-K
+# ================================================================
+def two_stage_rank(query, products, cross_scorer, k=RERANK_TOP_K, final_n=FINAL_RESULTS,
+                   include_catalog=True, constraints=None):
+    """
+    cross_scorer(query, products) -> list of scores (e.g. score_cache-backed).
+    """
+    candidates = stage_one(query, products, k=k, include_catalog=include_catalog,
+                           constraints=constraints)
+    if not candidates:
+        return []
+    scores = cross_scorer(query, candidates)
+    ranked = sorted(zip(scores, candidates), key=lambda x: x[0], reverse=True)
+    return [p for _, p in ranked[:final_n]]
@@ -0,0 +1,189 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+from metrics import metrics
+
+
+# ================================================================
+# CONFIG
+# ================================================================
+SCORE_CACHE_SIZE = int(os.getenv("SCORE_CACHE_SIZE", "50000"))
+SCORE_CACHE_DISK = os.getenv("SCORE_CACHE_DISK", "")     # e.g. "score_cache.db"; empty = memory only
+SCORE_CACHE_DISK_TTL = int(os.getenv("SCORE_CACHE_DISK_TTL", str(7 * 24 * 3600)))   # seconds
+SCORE_CACHE_PRUNE_EVERY = 100       # disk writes between expired-row sweeps
+
+
+def normalize_query(query):
+    # word order matters to the cross-encoder, so only case/spacing/punctuation is folded
+    return " ".join(re.sub(r"[^\w\s]", " ", query or "").lower().split())
+
+
+def product_key(product):
+    if product.url:
+        return product.url
+    return "t:" + hashlib.sha1(product.title.encode("utf-8")).hexdigest()
+
+
+# ================================================================
+# DISK TIER (shared between workers on one host)
+# ================================================================
+class DiskScoreStore:
+    """Rows older than `ttl` are ignored on read and swept every few writes."""
+
+    def __init__(self, path, ttl=SCORE_CACHE_DISK_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._writes = 0
+        conn = self._conn()
+        # versioned table name: rows keyed before model ids existed stay in the old
+        # "scores" table, unread; nothing else in the file is touched
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS model_scores(k TEXT PRIMARY KEY, score REAL, written REAL)"
+        )
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, keys):
+        if not keys:
+            return {}
+        found = {}
+        conn = self._conn()
+        cutoff = time.time() - self.ttl
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT k, score FROM model_scores WHERE k IN ({marks}) AND written > ?", chunk + [cutoff]
+            )
+            for k, score in rows:
+                found[k] = score
+        return found
+
+    def put_many(self, items):
+        if not items:
+            return
+        conn = self._conn()
+        now = time.time()
+        conn.executemany(
+            "INSERT OR REPLACE INTO model_scores(k, score, written) VALUES (?, ?, ?)",
+            [(k, score, now) for k, score in items],
+        )
+        self._writes += 1
+        if self._writes % SCORE_CACHE_PRUNE_EVERY == 0:
+            conn.execute("DELETE FROM model_scores WHERE written <= ?", (now - self.ttl,))
+        conn.commit()
+
+
+# ================================================================
+# SCORE CACHE
+# ================================================================
+class ScoreCache:
+    """
+    Cross-encoder scores keyed by (model id, normalized query, product URL
+    or title hash), so retrained or swapped weights never see old scores.
+
+    Lookups go memory LRU → optional disk tier → model. Only the misses are
+    sent to the model, in one batch.
+    """
+
+    def __init__(self, max_size=SCORE_CACHE_SIZE, disk_path=SCORE_CACHE_DISK):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.disk = DiskScoreStore(disk_path) if disk_path else None
+        self.hits = 0
+        self.misses = 0
+        self.inference_seconds = 0.0
+        self.inferred = 0
+
+    def _remember(self, items):
+        with self._lock:
+            for k, score in items:
+                self._entries[k] = score
+                self._entries.move_to_end(k)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def score_many(self, query, products, scorer, model_id=""):
+        """
+        scorer(query, titles) -> list of floats (e.g. compute_relevance_batch);
+        model_id names its weights (crossencoder.RERANKER_ID).
+        Returns one score per product, in order.
+        """
+        q = normalize_query(query)
+        keys = [f"{model_id}\x1e{q}\x1f{product_key(p)}" for p in products]
+        scores = [None] * len(products)
+
+        with self._lock:
+            for i, k in enumerate(keys):
+                if k in self._entries:
+                    self._entries.move_to_end(k)
+                    scores[i] = self._entries[k]
+
+        missing = [i for i, s in enumerate(scores) if s is None]
+        if missing and self.disk is not None:
+            found = self.disk.get_many([keys[i] for i in missing])
+            if found:
+                self._remember(found.items())
+                for i in missing:
+                    scores[i] = found.get(keys[i])
+                missing = [i for i in missing if scores[i] is None]
+
+        if missing:
+            t0 = time.perf_counter()
+            fresh = scorer(query, [products[i].title for i in missing])
+            elapsed = time.perf_counter() - t0
+            with self._lock:
+                self.inference_seconds += elapsed
+                self.inferred += len(missing)
+
+            new_items = []
+            for i, score in zip(missing, fresh):
+                scores[i] = score
+                new_items.append((keys[i], score))
+            self._remember(new_items)
+            if self.disk is not None:
+                self.disk.put_many(new_items)
+
+        hits = len(products) - len(missing)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(missing)
+        metrics.inc("score_cache.hit", hits)
+        metrics.inc("score_cache.miss", len(missing))
+        metrics.gauge("score_cache.size", len(self._entries))
+        metrics.gauge("score_cache.cpu_seconds_saved", round(self.cpu_seconds_saved(), 3))
+        return scores
+
+    def cpu_seconds_saved(self):
+        """Estimated model time avoided: hits × mean per-item inference time."""
+        if not self.inferred:
+            return 0.0
+        return self.hits * (self.inference_seconds / self.inferred)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "cpu_seconds_saved": round(self.cpu_seconds_saved(), 3),
+        }
+
+
+score_cache = ScoreCache()
@@ -0,0 +1,342 @@
+import os
+import time
+import codecs
+import random
+import threading
+from concurrent.futures import Future
+from urllib.parse import urlparse
+
+import requests
+
+from metrics import metrics
+from shared_state import backend as shared_backend
+from source_manager import source_manager
+
+
+# ================================================================
+# CONFIG
+# ================================================================
+SCRAPER_BASE = "http://api.scraperapi.com"
+SCRAPER_API_KEY = os.getenv("SCRAPER_API_KEY", "")
+
+SCRAPE_GLOBAL_RATE = float(os.getenv("SCRAPE_GLOBAL_RATE", "5"))      # requests / second
+SCRAPE_GLOBAL_BURST = float(os.getenv("SCRAPE_GLOBAL_BURST", "10"))
+SCRAPE_SOURCE_RATE = float(os.getenv("SCRAPE_SOURCE_RATE", "2"))      # per retailer
+SCRAPE_SOURCE_BURST = float(os.getenv("SCRAPE_SOURCE_BURST", "4"))
+SCRAPE_MAX_ATTEMPTS = int(os.getenv("SCRAPE_MAX_ATTEMPTS", "3"))
+SCRAPE_BACKOFF_BASE = float(os.getenv("SCRAPE_BACKOFF_BASE", "0.5"))
+SCRAPE_BACKOFF_CAP = float(os.getenv("SCRAPE_BACKOFF_CAP", "8"))
+SCRAPE_TIMEOUT = float(os.getenv("SCRAPE_TIMEOUT", "40"))
+SCRAPE_QUEUE_TIMEOUT = float(os.getenv("SCRAPE_QUEUE_TIMEOUT", "15"))
+SCRAPER_QUOTA = int(os.getenv("SCRAPER_QUOTA", "0"))                  # 0 = unlimited
+SCRAPE_STREAM_CHUNK = int(os.getenv("SCRAPE_STREAM_CHUNK", "16384"))   # bytes per streamed read
+
+INTERACTIVE = 0     # a user is waiting on /chat
+BACKGROUND = 1      # cache warming / refreshes
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
+}
+
+
+def source_of(url):
+    """amazon.in → Amazon, www.flipkart.com → Flipkart, ..."""
+    host = urlparse(url).netloc.lower()
+    parts = [p for p in host.split(".") if p not in ("www", "m")]
+    return parts[0].capitalize() if parts else "Unknown"
+
+
+# ================================================================
+# TOKEN BUCKET
+# ================================================================
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self):
+        """Seconds until one token is available (0 if available now)."""
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+# ================================================================
+# SCHEDULER
+# ================================================================
+class ScrapeScheduler:
+    """
+    Every ScraperAPI call goes through here:
+      - a global token bucket plus one bucket per retailer
+      - identical in-flight URLs are coalesced into one upstream call
+      - background work only gets a token when no interactive call is waiting
+      - retries use exponential backoff with full jitter
+      - quota usage is tracked and exported as metrics
+      - with a shared backend, the rates hold across all workers / hosts
+      - with a source manager, each retailer gets its own adaptive timeout
+    """
+
+    def __init__(
+        self,
+        api_key=SCRAPER_API_KEY,
+        global_rate=SCRAPE_GLOBAL_RATE,
+        global_burst=SCRAPE_GLOBAL_BURST,
+        source_rate=SCRAPE_SOURCE_RATE,
+        source_burst=SCRAPE_SOURCE_BURST,
+        max_attempts=SCRAPE_MAX_ATTEMPTS,
+        quota=SCRAPER_QUOTA,
+        http_get=None,
+        shared=None,
+        sources=None,
+    ):
+        self.api_key = api_key
+        self.global_rate = global_rate
+        self.global_burst = global_burst
+        self.source_rate = source_rate
+        self.source_burst = source_burst
+        self.max_attempts = max(1, max_attempts)
+        self.quota = quota
+        self.http_get = http_get or requests.get
+        self.shared = shared
+        self.sources = sources
+
+        self._global = TokenBucket(global_rate, global_burst)
+        self._sources = {}
+        self._cond = threading.Condition()
+        self._waiting = [0, 0]          # waiters per priority
+        self._inflight = {}             # url -> Future
+        self._inflight_lock = threading.Lock()
+        self._local = threading.local()     # per-thread credit count (thread_credits)
+        self.credits_used = 0
+
+    # ---------------- rate limiting ----------------
+    def _bucket(self, source):
+        bucket = self._sources.get(source)
+        if bucket is None:
+            bucket = TokenBucket(self.source_rate, self.source_burst)
+            self._sources[source] = bucket
+        return bucket
+
+    def _acquire(self, source, priority, timeout=SCRAPE_QUEUE_TIMEOUT):
+        start = time.monotonic()
+        deadline = start + timeout
+        with self._cond:
+            self._waiting[priority] += 1
+        try:
+            while True:
+                with self._cond:
+                    now = time.monotonic()
+                    bucket = self._bucket(source)
+                    self._global.refill(now)
+                    bucket.refill(now)
+
+                    if self.quota and self.credits_used >= self.quota:
+                        metrics.inc("scrape.quota_rejected")
+                        raise QuotaExceeded(f"ScraperAPI quota of {self.quota} reached")
+
+                    yield_to_interactive = priority == BACKGROUND and self._waiting[INTERACTIVE] > 0
+                    wait = max(self._global.wait_time(), bucket.wait_time())
+                    if wait > 0 or yield_to_interactive:
+                        self._wait(now, deadline, wait, source)
+                        continue
+
+                    # reserve the local tokens (and the credit, for the quota check)
+                    self._global.tokens -= 1
+                    bucket.tokens -= 1
+                    self.credits_used += 1
+                    if self.shared is None:
+                        return self._granted(start)
+
+                # local buckets only see this worker; the shared ones see all of them.
+                # The round-trip happens outside _cond so other callers are not held up by it
+                wait = self.shared.take_tokens([
+                    ("scrape:global", self.global_rate, self.global_burst),
+                    (f"scrape:{source}", self.source_rate, self.source_burst),
+                ])
+                with self._cond:
+                    if wait == 0:
+                        return self._granted(start)
+                    # another worker got there first: give the reservation back
+                    self._global.tokens = min(self._global.capacity, self._global.tokens + 1)
+                    bucket.tokens = min(bucket.capacity, bucket.tokens + 1)
+                    self.credits_used -= 1
+                    self._wait(time.monotonic(), deadline, wait, source)
+        finally:
+            with self._cond:
+                self._waiting[priority] -= 1
+                self._cond.notify_all()
+
+    def _granted(self, start):
+        # called with _cond held
+        self._local.credits = self.thread_credits() + 1
+        metrics.observe("scrape.throttle_wait_seconds", time.monotonic() - start)
+
+    def _wait(self, now, deadline, wait, source):
+        # called with _cond held
+        if now >= deadline:
+            metrics.inc("scrape.throttled_out")
+            raise TimeoutError(f"rate limit wait exceeded for {source}")
+        self._cond.wait(min(deadline - now, wait or 0.05))
+
+    # ---------------- upstream call ----------------
+    def _backoff(self, attempt):
+        return random.uniform(0, min(SCRAPE_BACKOFF_CAP, SCRAPE_BACKOFF_BASE * (2 ** attempt)))
+
+    def _call(self, url, source, priority, read=None, stream=False):
+        """
+        One upstream request with retries. `read(response)` turns the
+        response into the result (default: the full body as text).
+        """
+        read = read or self._read_text
+        params = {
+            "api_key": self.api_key,
+            "url": url,
+            "keep_headers": "true"
+        }
+        last_error = None
+        for attempt in range(self.max_attempts):
+            self._acquire(source, priority)
+            metrics.inc("scrape.requests")
+            metrics.inc(f"scrape.requests.{source}")
+            metrics.gauge("scrape.credits_used", self.credits_used)
+            if self.quota:
+                metrics.gauge("scrape.credits_remaining", self.quota - self.credits_used)
+
+            timeout = self.sources.timeout(source) if self.sources else SCRAPE_TIMEOUT
+            t0 = time.monotonic()
+            try:
+                kwargs = {"stream": True} if stream else {}
+                r = self.http_get(SCRAPER_BASE, params=params, headers=HEADERS, timeout=timeout, **kwargs)
+                if r.status_code in RETRYABLE_STATUS:
+                    raise requests.HTTPError(f"{r.status_code} from ScraperAPI", response=r)
+                r.raise_for_status()
+                result = read(r, source)
+                elapsed = time.monotonic() - t0
+                metrics.observe(f"scrape.latency_seconds.{source}", elapsed)
+                metrics.inc(f"scrape.ok.{source}")
+                if self.sources:
+                    self.sources.observe(source, elapsed)
+                return result
+            except requests.Timeout as e:
+                last_error = e
+                if self.sources:
+                    self.sources.observe(source, time.monotonic() - t0, timed_out=True)
+            except requests.HTTPError as e:
+                last_error = e
+                status = getattr(e.response, "status_code", None)
+                if status is not None and status not in RETRYABLE_STATUS:
+                    metrics.inc(f"scrape.failed.{source}")
+                    break
+            except Exception as e:
+                last_error = e
+
+            metrics.inc(f"scrape.failed.{source}")
+            if attempt + 1 < self.max_attempts:
+                metrics.inc("scrape.retries")
+                time.sleep(self._backoff(attempt))
+
+        print("ScraperAPI FAILED:", last_error)
+        return None
+
+    @staticmethod
+    def _read_text(r, source):
+        metrics.inc(f"scrape.bytes.{source}", len(r.content))
+        return r.text
+
+    @staticmethod
+    def _read_stream(make_parser):
+        def read(r, source):
+            parser = make_parser()
+            decoder = codecs.getincrementaldecoder(r.encoding or "utf-8")(errors="replace")
+            received = 0
+            try:
+                for chunk in r.iter_content(chunk_size=SCRAPE_STREAM_CHUNK):
+                    received += len(chunk)
+                    parser.feed(decoder.decode(chunk))
+                    if parser.done:
+                        metrics.inc(f"scrape.stream.early_close.{source}")
+                        break
+                else:
+                    parser.feed(decoder.decode(b"", final=True))
+            except Exception:
+                if not parser.products:
+                    raise           # nothing usable yet: let _call retry
+                metrics.inc(f"scrape.stream.partial.{source}")
+            finally:
+                r.close()           # early close: the rest of the page is never downloaded
+                metrics.inc(f"scrape.bytes.{source}", received)
+            products = parser.result()
+            if parser.first_product_seconds is not None:
+                metrics.observe(f"scrape.first_product_seconds.{source}", parser.first_product_seconds)
+            return products
+        return read
+
+    # ---------------- public API ----------------
+    def _coalesced(self, key, call):
+        with self._inflight_lock:
+            fut = self._inflight.get(key)
+            owner = fut is None
+            if owner:
+                fut = Future()
+                self._inflight[key] = fut
+
+        if not owner:
+            metrics.inc("scrape.coalesced")
+            return fut.result()
+
+        try:
+            result = call()
+        except Exception as e:
+            print("ScraperAPI FAILED:", e)
+            result = None
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+        fut.set_result(result)
+        return result
+
+    def fetch(self, url, source=None, priority=INTERACTIVE):
+        """
+        Fetch `url` through ScraperAPI. Returns the HTML text or None.
+        Concurrent calls for the same URL share a single upstream request.
+        """
+        source = source or source_of(url)
+        return self._coalesced(url, lambda: self._call(url, source, priority))
+
+    def stream(self, url, make_parser, source=None, priority=INTERACTIVE):
+        """
+        Streamed fetch: response chunks are fed to `make_parser()` (e.g. a
+        ProductStreamParser) as they arrive and the connection is closed as
+        soon as the parser reports `done`. Returns parser.result() or None.
+        """
+        source = source or source_of(url)
+        read = self._read_stream(make_parser)
+        return self._coalesced(f"stream:{url}", lambda: self._call(url, source, priority, read, stream=True))
+
+    def thread_credits(self):
+        """Tokens (ScraperAPI credits) taken by calls made from the current thread."""
+        return getattr(self._local, "credits", 0)
+
+    def stats(self):
+        return {
+            "credits_used": self.credits_used,
+            "quota": self.quota or None,
+            "inflight": len(self._inflight),
+            "waiting_interactive": self._waiting[INTERACTIVE],
+            "waiting_background": self._waiting[BACKGROUND],
+        }
+
+
+scheduler = ScrapeScheduler(shared=shared_backend if shared_backend.shared else None, sources=source_manager)
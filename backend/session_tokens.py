@@ -0,0 +1,113 @@
+import os
+import hmac
+import time
+import json
+import base64
+import hashlib
+import secrets
+import threading
+from collections import OrderedDict
+
+
+# ================================================================
+# CONFIG
+# ================================================================
+SESSION_SECRET = os.getenv("SESSION_SECRET", "")
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(7 * 24 * 3600)))
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "4096"))
+
+TOKEN_VERSION = "v1"
+
+if not SESSION_SECRET:
+    if int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+        # each worker would sign with its own random secret and reject the others' tokens
+        raise RuntimeError("SESSION_SECRET must be set when running several workers (WEB_CONCURRENCY > 1)")
+    print("⚠ WARNING: No SESSION_SECRET in .env, tokens will not survive a restart")
+    SESSION_SECRET = secrets.token_hex(32)
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class SessionTokens:
+    """
+    Stateless HMAC-SHA256 session tokens: v1.<payload>.<signature>
+
+    The payload carries the user id and expiry, so verifying a token needs
+    no DB lookup. Recently verified tokens are kept in a small LRU so
+    repeat requests skip even the HMAC.
+    """
+
+    def __init__(self, secret=SESSION_SECRET, ttl=SESSION_TTL_SECONDS, cache_size=SESSION_CACHE_SIZE):
+        self._key = secret.encode("utf-8")
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self._cache = OrderedDict()     # token -> (user_id, exp)
+        self._lock = threading.Lock()
+
+    def _sign(self, body: str) -> str:
+        mac = hmac.new(self._key, body.encode("ascii"), hashlib.sha256).digest()
+        return _b64encode(mac)
+
+    def issue(self, user_id, ttl=None) -> str:
+        exp = int(time.time()) + (ttl or self.ttl)
+        payload = json.dumps({"uid": user_id, "exp": exp}, separators=(",", ":"))
+        body = f"{TOKEN_VERSION}.{_b64encode(payload.encode('utf-8'))}"
+        return f"{body}.{self._sign(body)}"
+
+    def verify(self, token):
+        """Return the user id for a valid, unexpired token, else None."""
+        if not token:
+            return None
+
+        now = time.time()
+        with self._lock:
+            hit = self._cache.get(token)
+            if hit is not None:
+                user_id, exp = hit
+                if exp > now:
+                    self._cache.move_to_end(token)
+                    return user_id
+                del self._cache[token]
+
+        try:
+            version, payload_b64, sig = token.split(".")
+            # bytes to bytes; a header with non-ASCII characters is just an invalid token
+            expected = self._sign(f"{version}.{payload_b64}").encode("ascii")
+            valid = hmac.compare_digest(sig.encode("ascii"), expected)
+        except (ValueError, AttributeError):      # UnicodeEncodeError is a ValueError
+            return None
+        if version != TOKEN_VERSION or not valid:
+            return None
+
+        try:
+            payload = json.loads(_b64decode(payload_b64))
+            user_id, exp = payload["uid"], payload["exp"]
+        except Exception:
+            return None
+        if exp <= now:
+            return None
+
+        with self._lock:
+            self._cache[token] = (user_id, exp)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return user_id
+
+
+def bearer_token(authorization):
+    """Extract the token from an `Authorization: Bearer <token>` header."""
+    if not authorization:
+        return None
+    scheme, _, value = authorization.partition(" ")
+    if scheme.lower() != "bearer":
+        return None
+    return value.strip() or None
+
+
+session_tokens = SessionTokens()
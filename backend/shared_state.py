@@ -0,0 +1,278 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+try:
+    import redis
+except ImportError:         # only needed for SHARED_BACKEND=redis
+    redis = None
+
+
+# ================================================================
+# CONFIG
+# ================================================================
+SHARED_BACKEND = os.getenv("SHARED_BACKEND", "memory")          # memory | redis
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+SESSION_MEMORY_TTL = int(os.getenv("SESSION_MEMORY_TTL", str(7 * 24 * 3600)))
+BUCKET_TTL = 3600           # idle token buckets disappear after an hour
+SWEEP_EVERY = 256           # in-process writes between expired-key sweeps
+SESSION_SAVE_ATTEMPTS = 5   # compare-and-set retries before a session save gives up merging
+
+
+def _refill(tokens, updated, rate, capacity, now):
+    if tokens is None:
+        return float(capacity)
+    return min(capacity, float(tokens) + (now - float(updated)) * rate)
+
+
+# ================================================================
+# BACKENDS
+# ================================================================
+class InProcessBackend:
+    """
+    Dict-backed store for single-worker runs (the default). Same interface
+    as RedisBackend: bytes values, optional TTL, atomic token buckets.
+    """
+
+    shared = False
+
+    def __init__(self):
+        self._data = {}             # key -> (value, expires_at or None)
+        self._buckets = {}          # key -> (tokens, updated)
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[1] is not None and entry[1] <= time.time():
+                del self._data[key]
+                return None
+            return entry[0]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._set(key, value, ttl)
+
+    def _set(self, key, value, ttl):
+        # called with _lock held; expired keys nobody reads again are swept every SWEEP_EVERY writes
+        now = time.time()
+        self._data[key] = (value, now + ttl if ttl else None)
+        self._writes += 1
+        if self._writes % SWEEP_EVERY == 0:
+            for k in [k for k, (_, expires) in self._data.items() if expires is not None and expires <= now]:
+                del self._data[k]
+
+    def compare_and_set(self, key, expected, value, ttl=None):
+        """Set `key` only if its current value is `expected` (None = absent). True on success."""
+        with self._lock:
+            entry = self._data.get(key)
+            current = entry[0] if entry is not None and (entry[1] is None or entry[1] > time.time()) else None
+            if current != expected:
+                return False
+            self._set(key, value, ttl)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def ttl(self, key):
+        """Seconds left; None when absent or without expiry."""
+        with self._lock:
+            entry = self._data.get(key)
+        if entry is None or entry[1] is None:
+            return None
+        return entry[1] - time.time()
+
+    def count(self, prefix):
+        """Live keys starting with `prefix`."""
+        now = time.time()
+        with self._lock:
+            return sum(
+                1 for key, (_, expires) in self._data.items()
+                if key.startswith(prefix) and (expires is None or expires > now)
+            )
+
+    def take_tokens(self, specs):
+        """
+        specs: [(bucket name, rate per second, capacity), ...]
+        Takes one token from every bucket, or none of them. Returns 0.0 when
+        granted, otherwise the seconds until all buckets have a token.
+        """
+        now = time.time()
+        with self._lock:
+            levels = [
+                _refill(*self._buckets.get(name, (None, now)), rate, cap, now)
+                for name, rate, cap in specs
+            ]
+            wait = max(
+                [0.0 if t >= 1 else (1 - t) / rate for t, (_, rate, _) in zip(levels, specs)],
+                default=0.0,
+            )
+            for t, (name, _, _) in zip(levels, specs):
+                self._buckets[name] = (t - 1 if wait == 0 else t, now)
+        return wait
+
+
+class RedisBackend:
+    """
+    Redis (or anything speaking its protocol, e.g. fakeredis in tests).
+    Lets several uvicorn workers / hosts share session memory, the result
+    cache and the scrape rate limits.
+    """
+
+    shared = True
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url=REDIS_URL):
+        if redis is None:
+            raise RuntimeError("SHARED_BACKEND=redis needs the redis package (pip install redis)")
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(key, value, ex=int(ttl) if ttl else None)
+
+    def compare_and_set(self, key, expected, value, ttl=None):
+        """Set `key` only if its current value is `expected` (None = absent). True on success."""
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        if isinstance(expected, str):
+            expected = expected.encode("utf-8")
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                if pipe.get(key) != expected:
+                    pipe.unwatch()
+                    return False
+                pipe.multi()
+                pipe.set(key, value, ex=int(ttl) if ttl else None)
+                pipe.execute()
+                return True
+            except redis.WatchError:
+                return False
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def ttl(self, key):
+        left = self.client.pttl(key)
+        return left / 1000 if left is not None and left >= 0 else None
+
+    def count(self, prefix):
+        # SCAN, not KEYS: does not block the server on a large keyspace
+        return sum(1 for _ in self.client.scan_iter(match=f"{prefix}*", count=1000))
+
+    def take_tokens(self, specs):
+        # optimistic WATCH/MULTI transaction: retried if another worker touched the buckets
+        keys = [f"bucket:{name}" for name, _, _ in specs]
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(*keys)
+                    now = time.time()
+                    levels = []
+                    for key, (_, rate, cap) in zip(keys, specs):
+                        tokens, updated = pipe.hmget(key, "tokens", "updated")
+                        levels.append(_refill(tokens, updated or now, rate, cap, now))
+                    wait = max(
+                        [0.0 if t >= 1 else (1 - t) / rate for t, (_, rate, _) in zip(levels, specs)],
+                        default=0.0,
+                    )
+                    pipe.multi()
+                    for key, t in zip(keys, levels):
+                        pipe.hset(key, mapping={"tokens": t - 1 if wait == 0 else t, "updated": now})
+                        pipe.expire(key, BUCKET_TTL)
+                    pipe.execute()
+                    return wait
+                except redis.WatchError:
+                    continue
+
+
+def make_backend(kind=SHARED_BACKEND):
+    if kind == "redis":
+        return RedisBackend.from_url()
+    if kind != "memory":
+        raise ValueError(f"unknown SHARED_BACKEND {kind!r} (use memory or redis)")
+    if int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+        print("⚠ WARNING: several workers with SHARED_BACKEND=memory; "
+              "session memory and rate limits are per worker")
+    return InProcessBackend()
+
+
+# ================================================================
+# SESSION MEMORY (per user)
+# ================================================================
+class SessionMemory:
+    """
+    Loads / saves one MemoryManager per user so any worker can continue a
+    conversation. Anonymous requests share the "anon" session, as before.
+
+    Saves are compare-and-set on a version number. When another worker
+    saved the session after this turn loaded it (two tabs, a retried
+    request), this turn's changes (MemoryManager.journal) are replayed on
+    top of the newer state instead of overwriting it, so both turns'
+    messages are kept, in save order.
+    """
+
+    def __init__(self, backend, ttl=SESSION_MEMORY_TTL):
+        self.backend = backend
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(user_id):
+        return f"session:{user_id if user_id is not None else 'anon'}"
+
+    def load(self, user_id):
+        from memory_manager import MemoryManager
+        raw = self.backend.get(self._key(user_id))
+        return MemoryManager.from_dict(json.loads(raw)) if raw else MemoryManager()
+
+    def save(self, user_id, mem):
+        from memory_manager import MemoryManager
+        key = self._key(user_id)
+        for _ in range(SESSION_SAVE_ATTEMPTS):
+            current = self.backend.get(key)
+            latest = json.loads(current) if current else None
+            merged = mem
+            if latest is not None and latest.get("version", 0) != mem.version:
+                merged = MemoryManager.from_dict(latest)
+                merged.replay(mem.journal)
+            data = merged.to_dict()
+            data["version"] = (latest or {}).get("version", 0) + 1
+            if self.backend.compare_and_set(key, current, json.dumps(data), ttl=self.ttl):
+                mem.version, mem.journal = data["version"], []
+                return
+        print(f"⚠ WARNING: session {key} kept changing, last save wins")
+        self.backend.set(key, json.dumps(data), ttl=self.ttl)
+
+
+# ================================================================
+# STICKY ROUTING
+# ================================================================
+AFFINITY_COOKIE = "copilot_affinity"
+
+
+def affinity_key(user_id):
+    """
+    Stable, opaque routing key for a user. Set as a cookie so a load
+    balancer can hash on it (nginx: `hash $cookie_copilot_affinity consistent;`)
+    and keep a user's requests on the worker holding their warm caches.
+    """
+    if user_id is None:
+        return None
+    return hashlib.sha1(f"user:{user_id}".encode("utf-8")).hexdigest()[:16]
+
+
+backend = make_backend()
+session_memory = SessionMemory(backend)
@@ -0,0 +1,174 @@
+import os
+import json
+import threading
+from collections import defaultdict, deque
+
+from metrics import metrics
+
+
+# ================================================================
+# CONFIG
+# ================================================================
+SOURCE_ADAPTIVE = os.getenv("SOURCE_ADAPTIVE", "1") == "1"
+SOURCE_TIMEOUT_DEFAULT = float(os.getenv("SCRAPE_TIMEOUT", "40"))     # until enough samples exist
+SOURCE_TIMEOUT_MIN = float(os.getenv("SOURCE_TIMEOUT_MIN", "5"))
+SOURCE_TIMEOUT_MAX = float(os.getenv("SOURCE_TIMEOUT_MAX", "40"))
+SOURCE_TIMEOUT_MARGIN = float(os.getenv("SOURCE_TIMEOUT_MARGIN", "1.5"))   # timeout = p95 × margin
+SOURCE_WINDOW = int(os.getenv("SOURCE_WINDOW", "50"))           # recent calls kept per source
+SOURCE_MIN_SAMPLES = int(os.getenv("SOURCE_MIN_SAMPLES", "5"))  # before any adaptive decision
+SOURCE_MIN_YIELD = float(os.getenv("SOURCE_MIN_YIELD", "0.5"))  # avg products / call for a category
+SOURCE_MAX_TIMEOUT_RATE = float(os.getenv("SOURCE_MAX_TIMEOUT_RATE", "0.5"))
+SOURCE_PROBE_EVERY = int(os.getenv("SOURCE_PROBE_EVERY", "10"))  # skipped sources still get 1 call in N
+
+# per-source overrides, e.g.
+#   SOURCE_OVERRIDES='{"Myntra": {"enabled": false}, "Amazon": {"timeout": 20, "always": true}}'
+#   enabled  false → never queried
+#   always   true  → never skipped (still reordered)
+#   timeout  fixed seconds instead of the adaptive one
+SOURCE_OVERRIDES = json.loads(os.getenv("SOURCE_OVERRIDES", "") or "{}")
+
+ANY_CATEGORY = "any"
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    vals = sorted(values)
+    return vals[min(len(vals) - 1, int(round(q * (len(vals) - 1))))]
+
+
+class SourceManager:
+    """
+    Rolling latency and yield per retailer, used to
+
+      - set each source's request timeout from its observed p95
+      - order sources by expected products per second
+      - skip a source that keeps timing out, or that yields nothing for
+        the query's category (e.g. Myntra for "mobile")
+
+    Skipped sources are still probed once every SOURCE_PROBE_EVERY plans,
+    so a source that recovers is picked up again.
+    """
+
+    def __init__(self, overrides=None, adaptive=SOURCE_ADAPTIVE, window=SOURCE_WINDOW):
+        self.overrides = SOURCE_OVERRIDES if overrides is None else overrides
+        self.adaptive = adaptive
+        self.window = window
+        self._latency = defaultdict(lambda: deque(maxlen=self.window))    # source -> seconds
+        self._timed_out = defaultdict(lambda: deque(maxlen=self.window))  # source -> 0/1
+        self._yield = defaultdict(lambda: deque(maxlen=self.window))      # (source, category) -> products
+        self._skips = defaultdict(int)                                    # (source, category) -> skips since last probe
+        self._errors = defaultdict(int)                                   # source -> failed searches
+        self._lock = threading.Lock()
+
+    def _override(self, source, name, default=None):
+        return self.overrides.get(source, {}).get(name, default)
+
+    # ---------------- observations ----------------
+    def observe(self, source, seconds, timed_out=False):
+        """One upstream attempt (called by the scrape scheduler)."""
+        with self._lock:
+            self._latency[source].append(seconds)
+            self._timed_out[source].append(1 if timed_out else 0)
+        if timed_out:
+            metrics.inc(f"source.timeouts.{source}")
+
+    def record_yield(self, source, category, products):
+        """Products a source returned for one search."""
+        with self._lock:
+            self._yield[(source, category or ANY_CATEGORY)].append(products)
+        metrics.observe(f"source.yield.{source}", products)
+
+    def record_error(self, source):
+        """A search whose fetch failed (error, throttled, quota): no yield sample."""
+        with self._lock:
+            self._errors[source] += 1
+        metrics.inc(f"source.errors.{source}")
+
+    # ---------------- decisions ----------------
+    def timeout(self, source):
+        fixed = self._override(source, "timeout")
+        if fixed is not None:
+            return float(fixed)
+        with self._lock:
+            samples = list(self._latency[source])
+        if not self.adaptive or len(samples) < SOURCE_MIN_SAMPLES:
+            return SOURCE_TIMEOUT_DEFAULT
+        seconds = min(SOURCE_TIMEOUT_MAX, max(SOURCE_TIMEOUT_MIN, _percentile(samples, 0.95) * SOURCE_TIMEOUT_MARGIN))
+        metrics.gauge(f"source.timeout_seconds.{source}", round(seconds, 2))
+        return seconds
+
+    def _skip_reason(self, source, category):
+        if self._override(source, "always"):
+            return None
+        timed_out = self._timed_out[source]
+        if len(timed_out) >= SOURCE_MIN_SAMPLES and sum(timed_out) / len(timed_out) > SOURCE_MAX_TIMEOUT_RATE:
+            return "slow"
+        yields = self._yield[(source, category)]
+        if len(yields) >= SOURCE_MIN_SAMPLES and sum(yields) / len(yields) < SOURCE_MIN_YIELD:
+            return "empty"
+        return None
+
+    def _rate(self, source, category):
+        """Expected products per second; unknown sources rank first so they get measured."""
+        yields = self._yield[(source, category)] or self._yield[(source, ANY_CATEGORY)]
+        latency = self._latency[source]
+        if not yields or not latency:
+            return float("inf")
+        return (sum(yields) / len(yields)) / max(_percentile(latency, 0.5), 1e-3)
+
+    def plan(self, sources, category=None):
+        """
+        Which of `sources` to query for this category, best first.
+        Always returns at least one source unless all are disabled.
+        """
+        category = category or ANY_CATEGORY
+        enabled = [s for s in sources if self._override(s, "enabled", True)]
+        if not self.adaptive:
+            return enabled
+
+        chosen, skipped = [], []
+        with self._lock:
+            for source in enabled:
+                reason = self._skip_reason(source, category)
+                if reason is None:
+                    chosen.append(source)
+                    continue
+                key = (source, category)
+                self._skips[key] += 1
+                if self._skips[key] >= SOURCE_PROBE_EVERY:
+                    self._skips[key] = 0
+                    metrics.inc(f"source.probe.{source}")
+                    chosen.append(source)
+                else:
+                    metrics.inc(f"source.skipped.{reason}.{source}")
+                    skipped.append(source)
+            if not chosen and skipped:
+                chosen.append(max(skipped, key=lambda s: self._rate(s, category)))
+            chosen.sort(key=lambda s: self._rate(s, category), reverse=True)
+        return chosen
+
+    def stats(self):
+        with self._lock:
+            sources = sorted(self._latency.keys() | {s for s, _ in self._yield} | self._errors.keys())
+            out = {}
+            for source in sources:
+                latency = list(self._latency[source])
+                timed_out = self._timed_out[source]
+                out[source] = {
+                    "calls": len(latency),
+                    "p50_seconds": round(_percentile(latency, 0.5), 3),
+                    "p95_seconds": round(_percentile(latency, 0.95), 3),
+                    "timeout_rate": round(sum(timed_out) / len(timed_out), 3) if timed_out else 0.0,
+                    "errors": self._errors[source],
+                    "avg_yield": {
+                        cat: round(sum(v) / len(v), 2)
+                        for (s, cat), v in self._yield.items() if s == source and v
+                    },
+                }
+        for source in out:
+            out[source]["timeout_seconds"] = round(self.timeout(source), 2)
+        return {"adaptive": self.adaptive, "overrides": self.overrides, "sources": out}
+
+
+source_manager = SourceManager()
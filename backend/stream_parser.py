@@ -0,0 +1,135 @@
+import os
+import re
+import time
+from html.parser import HTMLParser
+
+from attribute_store import parse_price
+from product import Product
+
+
+# ================================================================
+# CONFIG
+# ================================================================
+PARSE_MAX_PER_SOURCE = int(os.getenv("PARSE_MAX_PER_SOURCE", "20"))
+PRICE_WINDOW_CHARS = 400    # text after a product link searched for its price
+
+# source -> (is this href a product?, base URL for relative links)
+SOURCE_RULES = {
+    "Amazon": (lambda href: "/dp/" in href, "https://www.amazon.in"),
+    "Flipkart": (lambda href: "/p/" in href, "https://www.flipkart.com"),
+    "Myntra": (lambda href: "myntra.com" in href, "https://www.myntra.com"),
+}
+
+
+def product_key(href):
+    """Listing pages link each product several times (image, title); they share this key."""
+    m = re.search(r"/(?:dp|p)/([^/?#]+)", href)
+    return m.group(1) if m else href.split("?")[0].split("#")[0]
+
+
+class ProductStreamParser(HTMLParser):
+    """
+    Incremental listing-page parser: feed() it chunks as they arrive.
+
+    A product is recognised at the closing </a> of a product link. Its
+    price comes from the link text or the text right after it, up to the
+    next product link (or PRICE_WINDOW_CHARS). `done` turns True once
+    `limit` products are complete, so the caller can stop downloading.
+    """
+
+    def __init__(self, source, limit=PARSE_MAX_PER_SOURCE, on_product=None):
+        super().__init__(convert_charrefs=True)
+        self.source = source
+        self.is_product, self.base = SOURCE_RULES[source]
+        self.limit = limit
+        self.on_product = on_product
+        self.products = []
+        self.done = False
+        self.started = time.perf_counter()
+        self.first_product_seconds = None
+
+        self._by_key = {}
+        self._link = None           # product <a> currently open: [key, url, text parts, image]
+        self._pending = None        # last product still collecting price text: [product, text parts, chars]
+
+    # ---------------- HTMLParser hooks ----------------
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if tag == "a":
+            href = dict(attrs).get("href")
+            if not href or not self.is_product(href):
+                return
+            key = product_key(href)
+            if self._pending is not None and self._pending[0] is not self._by_key.get(key):
+                self._finish_pending()      # next product starts: the previous card is over
+            url = self.base + href if href.startswith("/") else href
+            self._link = [key, url, [], None]
+        elif tag == "img" and self._link is not None and self._link[3] is None:
+            self._link[3] = dict(attrs).get("src")
+
+    def handle_endtag(self, tag):
+        if tag != "a" or self._link is None:
+            return
+        key, url, parts, image = self._link
+        self._link = None
+        title = " ".join(" ".join(parts).split()) or "Product"
+
+        existing = self._by_key.get(key)
+        if existing is not None:
+            # image link + title link of the same product
+            if existing.title == "Product" and title != "Product":
+                existing.title = title
+            existing.image = existing.image or image
+            if self._pending is not None and self._pending[0] is existing:
+                self._pending[1].append(title)
+            return
+
+        if len(self.products) >= self.limit:
+            return
+        product = Product(title=title, url=url, image=image, source=self.source)
+        self._by_key[key] = product
+        self.products.append(product)
+        self._pending = [product, [title], len(title)]
+
+    def handle_data(self, data):
+        if self.done:
+            return
+        if self._link is not None:
+            self._link[2].append(data)
+        elif self._pending is not None:
+            self._pending[1].append(data)
+            self._pending[2] += len(data)
+            if self._pending[2] >= PRICE_WINDOW_CHARS:
+                self._finish_pending()
+
+    # ---------------- helpers ----------------
+    def _finish_pending(self):
+        product, parts, _ = self._pending
+        self._pending = None
+        if product.price is None:
+            product.price = parse_price(" ".join(parts))
+        if self.first_product_seconds is None:
+            self.first_product_seconds = time.perf_counter() - self.started
+        if self.on_product:
+            self.on_product(product)
+        if len(self.products) >= self.limit:
+            self.done = True
+
+    def close(self):
+        super().close()
+        if self._pending is not None:
+            self._finish_pending()
+
+    def result(self):
+        if self._pending is not None:
+            self._finish_pending()
+        return self.products
+
+
+def parse_products(html, source, limit=PARSE_MAX_PER_SOURCE):
+    """Whole-document convenience wrapper (cached HTML, tests)."""
+    parser = ProductStreamParser(source, limit)
+    parser.feed(html)
+    parser.close()
+    return parser.products
@@ -0,0 +1,58 @@
+from attribute_store import parse_constraints, parse_price, filter_products
+from product import Product
+
+
+# 1. Price phrases become filters; spec numbers ("max 256gb") do not
+def test_parse_constraints_prices():
+    c = parse_constraints("red kurti under 500")
+    assert c["max_price"] == 500 and c["query"] == "red kurti"
+
+    c = parse_constraints("shoes between 1,000 and 2,000")
+    assert (c["min_price"], c["max_price"]) == (1000, 2000)
+
+    c = parse_constraints("earbuds max ₹1500")
+    assert c["max_price"] == 1500
+
+    c = parse_constraints("iphone 15 pro max 256gb")
+    assert c["max_price"] is None and c["min_price"] is None
+    assert c["query"] == "iphone 15 pro max 256gb"
+
+    c = parse_constraints("dress under 1k")
+    assert c["max_price"] == 1000 and c["query"] == "dress"
+    c = parse_constraints("shoes between 1.5k and 3k")
+    assert (c["min_price"], c["max_price"]) == (1500, 3000)
+
+    for query in ("phone under 128 gb", "power bank over 10000mah", "tv below 55 inch", "128gb - 256gb",
+                  "dumbbells under 5 kg"):
+        c = parse_constraints(query)
+        assert c["max_price"] is None and c["min_price"] is None, query
+
+
+# 2. "tshirt" / "t-shirt" / "tee" are one category, and only price drops a product
+def test_filter_keeps_other_categories():
+    c = parse_constraints("tshirt under 500")
+    assert c["category"] == "tshirt" and c["max_price"] == 500
+    for query in ("black t-shirt", "T Shirts for men", "graphic tee"):
+        assert parse_constraints(query)["category"] == "tshirt", query
+
+    products = [
+        Product("Men's Regular Fit T-Shirt", price=449),
+        Product("Cotton Casual Shirt", price=399),
+        Product("Printed Tee", price=None),
+        Product("Oversized T-Shirt", price=799),
+    ]
+    kept = [p.title for p in filter_products(products, c)]
+    assert kept == ["Men's Regular Fit T-Shirt", "Cotton Casual Shirt", "Printed Tee"]
+
+
+# 3. Prices from scrapers and JSON: currency strings, bare numbers, ints and floats
+def test_parse_price():
+    assert parse_price("₹1,299") == 1299
+    assert parse_price("Rs. 499.00") == 499
+    assert parse_price("999") == 999
+    assert parse_price(" 1,499.50 ") == 1499.5
+    assert parse_price(799) == 799 and parse_price(12.5) == 12.5
+    assert parse_price("") is None and parse_price("free") is None and parse_price(None) is None
+    assert parse_price("8GB RAM") is None
+    assert parse_price("Sneakers 7 UK ₹1,499") == 1499
+    assert parse_price("Colours 3 Rs. 899") == 899
@@ -0,0 +1,29 @@
+from io import BytesIO
+
+from PIL import Image
+
+from caption_service import BlipCaptioner, CaptionCache
+
+
+def png(colour):
+    buf = BytesIO()
+    Image.new("RGB", (64, 64), colour).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+# 1. Captions are cached per exact upload; look-alike images in other colours are not merged
+def test_cache_keyed_on_content():
+    captioner = BlipCaptioner(batch_wait_ms=0, cache=CaptionCache())
+    calls = []
+
+    def generate(images):
+        calls.append(len(images))
+        return ["a %s kurti" % ("red" if img.getpixel((0, 0))[0] > 128 else "blue") for img in images]
+
+    captioner.generate = generate
+    red, blue = png((200, 0, 0)), png((0, 0, 200))
+    assert captioner.caption_bytes(red) == "a red kurti"
+    assert captioner.caption_bytes(blue) == "a blue kurti"
+    assert captioner.caption_bytes(red) == "a red kurti"
+    assert sum(calls) == 2
+    assert captioner.cache.stats()["hits"] == 1
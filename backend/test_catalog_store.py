@@ -0,0 +1,78 @@
+import numpy as np
+
+from catalog_store import SQLiteCatalogStore, FirestoreCatalogStore, load_catalog, product_id
+
+
+def fake_encode(texts):
+    # deterministic 8-dim vectors, one call per batch
+    fake_encode.calls.append(len(texts))
+    return np.stack([np.random.default_rng(len(t)).normal(size=8) for t in texts]).astype(np.float32)
+
+
+def make_products(n):
+    return [{"title": f"Cotton kurti {i}", "description": "printed" * (i % 3), "price": 100 + i,
+             "url": f"https://example.com/p/{i}"} for i in range(n)]
+
+
+class FakeFirestore:
+    """Just enough of the client API: collection().document(), batch().set()/commit()."""
+
+    def __init__(self):
+        self.docs = {}
+        self.batch_sizes = []
+
+    def collection(self, name):
+        return self
+
+    def document(self, doc_id):
+        return doc_id
+
+    def batch(self):
+        db = self
+
+        class Batch:
+            def __init__(self):
+                self.writes = {}
+
+            def set(self, ref, data):
+                self.writes[ref] = data
+
+            def commit(self):
+                assert len(self.writes) <= 500
+                db.batch_sizes.append(len(self.writes))
+                db.docs.update(self.writes)
+
+        return Batch()
+
+
+# 1. SQLite round trip: products and the embedding matrix come back intact
+def test_sqlite_roundtrip(tmp_path):
+    fake_encode.calls = []
+    store = SQLiteCatalogStore(str(tmp_path / "catalog.db"))
+    products = make_products(70)
+    stats = load_catalog(products, store, fake_encode, batch_size=32)
+
+    assert stats["products"] == 70 and store.count() == 70
+    assert fake_encode.calls == [32, 32, 6]
+
+    loaded, embs = store.load()
+    assert embs.shape == (70, 8)
+    by_id = {p["id"]: i for i, p in enumerate(loaded)}
+    i = by_id[product_id(products[5])]
+    assert loaded[i]["title"] == "Cotton kurti 5" and loaded[i]["price"] == 105
+    assert np.allclose(embs[i], fake_encode([f"Cotton kurti 5 {products[5]['description']}"])[0])
+
+    load_catalog(products[:10], store, fake_encode)     # re-upload is an upsert
+    assert store.count() == 70
+
+
+# 2. Firestore writes go out in commits of at most 500 documents
+def test_firestore_batched_writes():
+    fake_encode.calls = []
+    db = FakeFirestore()
+    store = FirestoreCatalogStore(client=db)
+    stats = load_catalog(make_products(1200), store, fake_encode, batch_size=1200)
+
+    assert stats["products"] == 1200 and len(db.docs) == 1200
+    assert db.batch_sizes == [500, 500, 200]
+    assert len(next(iter(db.docs.values()))["embedding"]) == 8
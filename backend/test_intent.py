@@ -0,0 +1,88 @@
+import numpy as np
+
+from intent_classifier import IntentClassifier, intent_classifier
+from memory_manager import MemoryManager
+
+
+# message → (starts a new topic?, should /chat scrape?)
+LABELLED = [
+    ("red dress", True, True),
+    ("Show me red dresses under 500", True, True),
+    ("under 500", False, False),
+    ("in maroon", False, False),
+    ("cotton please", False, False),
+    ("for a wedding", False, False),
+    ("find something cheaper", False, True),
+    ("what's the price of this?", False, True),
+    ("buy it", False, True),
+    ("black t-shirt, size M", True, True),
+    ("Kurti for office", True, True),
+    ("sarees for my mom", True, True),
+    ("running shoes!", True, True),
+    ("a good smartphone with 8GB RAM", True, True),
+    ("wireless earbuds under 2000", True, True),
+    ("lehenga in pastel shades", True, True),
+    ("frock for a 5 year old", True, True),
+    ("thanks, that's helpful", False, False),
+    ("hi there", False, False),
+    ("which one is better?", False, False),
+    ("can you compare the first two", False, False),
+    ("jeans", True, True),
+    ("show more", False, True),
+    ("leather sandals", True, True),
+    ("red frocks", True, True),
+    ("mobiles under 10000", True, True),
+    ("best phones", True, True),
+    ("kurtas for diwali", True, True),
+    ("watches for men", True, True),
+]
+
+
+# 1. Keyword intent matches the labels
+def test_labelled_accuracy():
+    topic_hits = sum(intent_classifier.is_new_topic(text) == topic for text, topic, _ in LABELLED)
+    search_hits = sum(intent_classifier.should_search(text) == search for text, _, search in LABELLED)
+    assert topic_hits / len(LABELLED) >= 0.95
+    assert search_hits / len(LABELLED) >= 0.95
+
+
+# 2. One shared vocabulary: every topic keyword also triggers a search
+def test_topic_implies_search():
+    for text, _, _ in LABELLED:
+        if intent_classifier.is_new_topic(text):
+            assert intent_classifier.should_search(text)
+
+
+# 3. Embedding shift: far-off vectors start a new topic, refinements never do
+def test_embedding_topic_shift():
+    clf = IntentClassifier(embedding_shift=True, shift_threshold=0.3)
+    topic = np.array([1.0, 0.0, 0.0])
+    near = np.array([0.9, 0.1, 0.0])
+    far = np.array([0.0, 0.0, 1.0])
+
+    assert not clf.is_new_topic("something for a party", near, topic)
+    assert clf.is_new_topic("gift for my dad's birthday", far, topic)
+    assert not clf.is_new_topic("under 500", far, topic)          # too few content words
+    assert not IntentClassifier().is_new_topic("gift for my dad's birthday", far, topic)   # disabled
+
+
+# 4. MemoryManager keeps the topic across refinements and switches on a new product
+def test_memory_topic_tracking():
+    mem = MemoryManager()
+    for msg in ["red dress", "under 500", "in maroon"]:
+        mem.add_message(msg)
+        mem.update_topic(msg)
+    assert mem.topic_memory == "red dress"
+    assert mem.build_query_context("cotton") == "red dress cotton"
+
+    mem.update_topic("running shoes")
+    assert mem.build_query_context("running shoes") == "running shoes"
+
+
+# 5. Plurals map to the singular keyword's category
+def test_plural_keywords():
+    cases = {"red frocks": "dress", "mobiles under 10000": "mobile", "best phones": "mobile",
+             "kurtas": "kurti", "watches": "watch", "dresses": "dress", "jeans": "jeans"}
+    for text, category in cases.items():
+        assert intent_classifier.category(text) == category, text
+    assert intent_classifier.category("thanks, this helps") is None
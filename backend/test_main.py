@@ -0,0 +1,88 @@
+import orjson
+
+from fastapi.testclient import TestClient
+
+import main
+from product import Product
+from source_manager import SourceManager
+
+
+# 1. The first-turn rewrite skip only applies while speculative scraping is on
+def test_rewrite_gating(monkeypatch):
+    monkeypatch.setattr(main, "SPECULATIVE_SCRAPE", False)
+    assert main.rewrite_needed(["red dress"])
+    assert main.rewrite_needed(["red dress", "under 500"])
+
+    monkeypatch.setattr(main, "SPECULATIVE_SCRAPE", True)
+    assert not main.rewrite_needed(["red dress"])
+    assert main.rewrite_needed(["red dress", "under 500"])
+
+
+# 2. /chat's response is pre-serialised: product dicts, sent as-is
+def test_chat_response_body():
+    products = [Product(title="Red Kurti", url="https://a/1", price=499.0, source="Amazon")]
+    resp = main.chat_response("Here you go", products, None)
+    body = orjson.loads(resp.body)
+    assert body["reply"] == "Here you go" and body["saved_image"] is None
+    assert body["products"] == [products[0].to_dict()]
+    assert body["products"][0]["price"] == 499.0
+
+
+# 3. /recommend/batch rejects a malformed "history" before streaming anything
+def test_batch_history_validation(monkeypatch):
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    client = TestClient(main.app)
+    for history in ['"red dress"', '["red dress", 5]', '{"a": 1}']:
+        body = '{"query": "kurti"}\n{"query": "shoes", "history": %s}\n' % history
+        resp = client.post("/recommend/batch", content=body, headers={"X-Admin-Token": "secret"})
+        assert resp.status_code == 422
+        assert resp.json()["detail"].startswith("Line 2:")
+
+
+class FakeVectorMemory:
+    def __init__(self):
+        self.texts = []
+        self.seen_by_recall = []
+
+    def encode(self, text):
+        return None
+
+    def add_memory(self, text, embedding=None):
+        self.texts.append(text)
+
+    def search_memory(self, query, top_k=2):
+        self.seen_by_recall.append(list(self.texts))
+        return []
+
+
+class FakeCohere:
+    def chat(self, **kwargs):
+        return type("Reply", (), {"text": "ok"})()
+
+
+# 4. Recall only sees earlier turns: this turn's message is stored after the reply
+def test_recall_excludes_current_turn(monkeypatch):
+    vectors = FakeVectorMemory()
+    monkeypatch.setattr(main, "vector_memory", vectors)
+    monkeypatch.setattr(main, "co", FakeCohere())
+    monkeypatch.setattr(main.job_queue, "submit", lambda name, fn, *a, **kw: fn(*a, **kw))
+    client = TestClient(main.app)
+
+    for message in ["hi there", "thanks, that's helpful"]:       # no product words: no scrape
+        assert client.post("/chat", data={"message": message}).status_code == 200
+    assert vectors.seen_by_recall == [[], ["hi there"]]
+    assert vectors.texts == ["hi there", "thanks, that's helpful"]
+
+
+# 5. search_all records yield only for completed fetches; failures count as errors
+def test_search_yield_recording(monkeypatch):
+    sm = SourceManager(overrides={}, adaptive=False)
+    pages = {"Amazon": [Product(title="Red Dress", url="https://a/1")], "Flipkart": [], "Myntra": None}
+    monkeypatch.setattr(main, "source_manager", sm)
+    monkeypatch.setattr(main, "fetch_products", lambda url, source, priority: pages[source])
+
+    assert [p.title for p in main.search_all("red dress")] == ["Red Dress"]
+    stats = sm.stats()["sources"]
+    assert stats["Amazon"]["avg_yield"] == {"dress": 1.0}
+    assert stats["Flipkart"]["avg_yield"] == {"dress": 0.0}
+    assert stats["Myntra"]["avg_yield"] == {} and stats["Myntra"]["errors"] == 1
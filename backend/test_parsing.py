@@ -53,14 +53,14 @@ mock_myntra_html = """
 
 print("=== TESTING AMAZON PARSER ===")
 amazon_results = parse_products(mock_amazon_html, "Amazon")
-print(json.dumps(amazon_results, indent=4))
+print(json.dumps([p.to_dict() for p in amazon_results], indent=4))
 
 
 print("\n=== TESTING FLIPKART PARSER ===")
 flipkart_results = parse_products(mock_flipkart_html, "Flipkart")
-print(json.dumps(flipkart_results, indent=4))
+print(json.dumps([p.to_dict() for p in flipkart_results], indent=4))
 
 
 print("\n=== TESTING MYNTRA PARSER ===")
 myntra_results = parse_products(mock_myntra_html, "Myntra")
-print(json.dumps(myntra_results, indent=4))
+print(json.dumps([p.to_dict() for p in myntra_results], indent=4))
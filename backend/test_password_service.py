@@ -0,0 +1,34 @@
+import asyncio
+
+from password_service import PasswordService
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+# 1. Long non-ASCII passwords hash and verify; bcrypt sees their first 72 bytes
+def test_long_non_ascii_password():
+    service = PasswordService(rounds=4, workers=1)
+    password = "पासवर्ड-é-🔑" * 20          # ~600 UTF-8 bytes, far fewer characters
+    try:
+        hashed = run(service.hash(password))
+        assert run(service.verify(password, hashed)) == (True, None)
+        assert run(service.verify(password[:-1], hashed))[0]     # same first 72 bytes
+        assert run(service.verify("wrong", hashed)) == (False, None)
+    finally:
+        service.shutdown()
+
+
+# 2. A hash made at another cost verifies and comes back rehashed at the current one
+def test_stale_cost_is_rehashed():
+    old, new = PasswordService(rounds=4, workers=1), PasswordService(rounds=5, workers=1)
+    try:
+        hashed = run(old.hash("hunter2"))
+        ok, new_hash = run(new.verify("hunter2", hashed))
+        assert ok and new_hash.startswith("$2b$05$")
+        assert run(new.verify("hunter2", new_hash)) == (True, None)
+        assert run(new.verify("hunter2", "not-a-hash")) == (False, None)
+    finally:
+        old.shutdown()
+        new.shutdown()
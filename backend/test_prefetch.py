@@ -0,0 +1,24 @@
+from prefetch import QueryTracker
+
+
+# 1. The tracker stays bounded: a new query evicts the rarest, hot ones survive
+def test_tracker_bounds():
+    tracker = QueryTracker(seeds=[], max_size=3)
+    for _ in range(5):
+        tracker.record("red dress")
+    tracker.record("Kurti")
+    tracker.record("Kurti")
+    for i in range(100):
+        tracker.record(f"one-off query {i}")
+    assert len(tracker) == 3
+    assert tracker.top(2) == ["red dress", "Kurti"]
+
+
+# 2. Decay drops queries nobody asks for any more
+def test_tracker_decay():
+    tracker = QueryTracker(decay=0.2, seeds=["dress"])
+    tracker.record("shoes")
+    tracker.record("shoes")
+    tracker.decay_all()
+    tracker.decay_all()
+    assert tracker.top(5) == ["shoes"]
@@ -0,0 +1,36 @@
+import numpy as np
+
+from response_cache import ResponseCache
+from product import Product
+
+
+def fake_encode(texts):
+    # one-hot per distinct text: identical normalized queries match, others don't
+    vecs = []
+    for t in texts:
+        v = np.zeros(64, dtype=np.float32)
+        v[hash(t) % 64] = 1.0
+        vecs.append(v)
+    return vecs
+
+
+PRODUCTS = [Product(title="Red Kurti", url="https://a/1"), Product(title="Blue Kurti", url="https://a/2")]
+
+
+# 1. Same query + products + context is a hit; case, punctuation and product order do not matter
+def test_hit_and_miss():
+    cache = ResponseCache(encoder=fake_encode)
+    assert cache.get("red kurti", PRODUCTS) is None
+    cache.put("red kurti", PRODUCTS, "Here are two kurtis")
+    assert cache.get("Red kurti!", PRODUCTS[::-1]) == "Here are two kurtis"
+    assert cache.get("red kurti", PRODUCTS[:1]) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+# 2. Recalled memories are part of the context: a different recall is a miss, not a bypass
+def test_recall_context_in_key():
+    cache = ResponseCache(encoder=fake_encode)
+    with_recall = "\n".join(["", "summary", "i like cotton"])
+    cache.put("red kurti", PRODUCTS, "Cotton kurtis", context=with_recall)
+    assert cache.get("red kurti", PRODUCTS, context=with_recall) == "Cotton kurtis"
+    assert cache.get("red kurti", PRODUCTS, context="\n".join(["", "summary"])) is None
@@ -0,0 +1,33 @@
+import sqlite3
+
+from score_cache import ScoreCache, DiskScoreStore
+from product import Product
+
+
+# 1. Opening the disk tier never drops other tables (e.g. the pre-model-id "scores")
+def test_disk_store_keeps_existing_tables(tmp_path):
+    path = str(tmp_path / "scores.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE scores(k TEXT PRIMARY KEY, score REAL)")
+    conn.execute("INSERT INTO scores VALUES ('old', 0.5)")
+    conn.commit()
+    conn.close()
+
+    DiskScoreStore(path)
+    assert sqlite3.connect(path).execute("SELECT k, score FROM scores").fetchall() == [("old", 0.5)]
+
+
+# 2. Scores survive in the disk tier per model id; another model id is a miss
+def test_disk_tier_per_model(tmp_path):
+    path = str(tmp_path / "scores.db")
+    products = [Product(title="Red Kurti", url="https://a/1")]
+    calls = []
+
+    def scorer(query, titles):
+        calls.append(len(titles))
+        return [0.9] * len(titles)
+
+    assert ScoreCache(disk_path=path).score_many("kurti", products, scorer, model_id="m1") == [0.9]
+    assert ScoreCache(disk_path=path).score_many("Kurti!", products, scorer, model_id="m1") == [0.9]
+    ScoreCache(disk_path=path).score_many("kurti", products, scorer, model_id="m2")
+    assert calls == [1, 1]
@@ -0,0 +1,79 @@
+import time
+import threading
+
+from metrics import metrics
+from scrape_scheduler import ScrapeScheduler, TokenBucket
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, text="<html></html>"):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode("utf-8")
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise AssertionError("retryable statuses are raised by the scheduler first")
+
+
+def make_scheduler(http_get, **kwargs):
+    sched = ScrapeScheduler(api_key="k", http_get=http_get, global_burst=100, source_burst=100, **kwargs)
+    sched._backoff = lambda attempt: 0
+    return sched
+
+
+# 1. Token buckets refill at their rate, up to capacity
+def test_token_bucket():
+    bucket = TokenBucket(rate=2, capacity=4)
+    bucket.tokens, bucket.updated = 0, 0.0
+    assert bucket.wait_time() == 0.5
+    bucket.refill(1.0)
+    assert bucket.tokens == 2 and bucket.wait_time() == 0
+    bucket.refill(100.0)
+    assert bucket.tokens == 4
+
+
+# 2. Identical in-flight URLs share one upstream call
+def test_coalescing():
+    started, release, calls = threading.Event(), threading.Event(), []
+
+    def http_get(url, params, **kwargs):
+        calls.append(params["url"])
+        started.set()
+        release.wait(5)
+        return FakeResponse(text="page")
+
+    sched = make_scheduler(http_get)
+    coalesced = metrics.counter("scrape.coalesced")
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(sched.fetch("https://www.amazon.in/s?k=kurti")))
+               for _ in range(5)]
+    for t in threads:
+        t.start()
+    started.wait(5)
+    deadline = time.monotonic() + 5
+    while metrics.counter("scrape.coalesced") < coalesced + 4 and time.monotonic() < deadline:
+        time.sleep(0.01)        # the other four are waiting on the first call
+    release.set()
+    for t in threads:
+        t.join()
+    assert calls == ["https://www.amazon.in/s?k=kurti"]
+    assert results == ["page"] * 5
+    assert sched.credits_used == 1
+
+
+# 3. Retryable statuses are retried; each attempt costs a credit
+def test_retry_then_success():
+    statuses = [503, 429, 200]
+    sched = make_scheduler(lambda url, params, **kw: FakeResponse(statuses.pop(0), "ok"))
+    assert sched.fetch("https://www.flipkart.com/search?q=shoes") == "ok"
+    assert sched.credits_used == 3
+
+
+# 4. Past the quota a fetch fails instead of spending more credits
+def test_quota():
+    sched = make_scheduler(lambda url, params, **kw: FakeResponse(text="ok"), quota=2)
+    assert sched.fetch("https://www.myntra.com/a") == "ok"
+    assert sched.fetch("https://www.myntra.com/b") == "ok"
+    assert sched.fetch("https://www.myntra.com/c") is None
+    assert sched.credits_used == 2
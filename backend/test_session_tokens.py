@@ -0,0 +1,43 @@
+import os
+import sys
+import time
+import subprocess
+
+from session_tokens import SessionTokens, bearer_token
+
+
+# 1. Issued tokens verify; tampered, expired and malformed ones do not
+def test_issue_and_verify():
+    tokens = SessionTokens(secret="test-secret")
+    token = tokens.issue(42)
+    assert tokens.verify(token) == 42
+    assert tokens.verify(token[:-2] + "xx") is None
+    assert SessionTokens(secret="other").verify(token) is None
+    assert tokens.verify(tokens.issue(42, ttl=-1)) is None
+    for bad in ("", "abc", "v1.a", "v2.a.b", "v1..", "a.b.c.d"):
+        assert tokens.verify(bad) is None, bad
+    assert bearer_token(f"Bearer {token}") == token
+    assert bearer_token("Basic abc") is None
+
+
+# 2. Non-ASCII tokens (from a cookie or header) are rejected, not a 500
+def test_non_ascii_token():
+    tokens = SessionTokens(secret="test-secret")
+    token = tokens.issue(7)
+    version, payload, sig = token.split(".")
+    for bad in (f"{version}.{payload}.{sig}é", f"{version}.pâyload.{sig}", "v1.ü.ß", "🔑"):
+        assert tokens.verify(bad) is None, bad
+    assert tokens.verify(token) == 7
+
+
+# 3. Several workers without a shared SESSION_SECRET refuse to start
+def test_workers_need_shared_secret():
+    def import_with(**env):
+        return subprocess.run([sys.executable, "-c", "import session_tokens"],
+                              env=dict(os.environ, **env), capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)))
+
+    refused = import_with(SESSION_SECRET="", WEB_CONCURRENCY="4")
+    assert refused.returncode != 0 and "SESSION_SECRET must be set" in refused.stderr
+    assert import_with(SESSION_SECRET="", WEB_CONCURRENCY="1").returncode == 0
+    assert import_with(SESSION_SECRET="shared", WEB_CONCURRENCY="4").returncode == 0
@@ -0,0 +1,108 @@
+import time
+
+import pytest
+
+from shared_state import InProcessBackend, RedisBackend, SessionMemory, affinity_key
+from memory_manager import MemoryManager
+from result_cache import ResultCache
+from product import Product
+
+
+def make_backends():
+    backends = [InProcessBackend()]
+    try:
+        import fakeredis
+        backends.append(RedisBackend(fakeredis.FakeRedis()))
+    except ImportError:
+        pass
+    return backends
+
+
+@pytest.fixture(params=make_backends(), ids=lambda b: type(b).__name__)
+def backend(request):
+    return request.param
+
+
+# 1. Plain key/value with TTL
+def test_get_set_ttl(backend):
+    backend.set("k", b"v", ttl=60)
+    assert backend.get("k") == b"v"
+    assert 0 < backend.ttl("k") <= 60
+    backend.delete("k")
+    assert backend.get("k") is None
+
+
+# 2. Session memory survives a "different worker" (a fresh SessionMemory on the same backend)
+def test_session_memory_roundtrip(backend):
+    mem = MemoryManager()
+    for msg in ["red dress", "under 500", "cotton", "for a wedding", "size M", "in maroon"]:
+        mem.add_message(msg)
+        mem.update_topic(msg)
+    SessionMemory(backend).save(42, mem)
+
+    loaded = SessionMemory(backend).load(42)
+    assert loaded.last_messages == mem.last_messages
+    assert loaded.topic_memory == "red dress"
+    assert loaded.summary() == mem.summary()
+
+    # other users and anonymous sessions are separate
+    assert SessionMemory(backend).load(7).last_messages == []
+    assert SessionMemory(backend).load(None).last_messages == []
+
+
+# 3. Token buckets are all-or-nothing and refill over time
+def test_token_bucket(backend):
+    specs = [("g", 100.0, 2), ("s", 100.0, 1)]
+    assert backend.take_tokens(specs) == 0
+    wait = backend.take_tokens(specs)        # "s" is empty
+    assert wait > 0
+    time.sleep(wait + 0.01)
+    assert backend.take_tokens(specs) == 0
+
+
+# 4. Result cache entries written by one worker are visible to another
+def test_shared_result_cache(backend):
+    products = [Product(title="Red Cotton Dress", url="https://www.amazon.in/dp/X", price=499.0, source="Amazon")]
+    ResultCache(backend=backend).put("Red dress!", products, origin="warm")
+
+    other = ResultCache(backend=backend)
+    assert other.get("dress red") == products
+    assert other.expires_in("red dress") > 0
+    assert other.size() == 1
+
+
+def test_affinity_key_is_stable():
+    assert affinity_key(42) == affinity_key(42)
+    assert affinity_key(42) != affinity_key(43)
+    assert affinity_key(None) is None
+
+
+# 5. Two workers saving the same session: the later save merges instead of overwriting
+def test_concurrent_session_saves_merge(backend):
+    sessions = SessionMemory(backend)
+    first = MemoryManager()
+    first.add_message("red dress")
+    first.update_topic("red dress")
+    sessions.save(99, first)
+
+    a, b = sessions.load(99), sessions.load(99)
+    a.add_message("under 500")
+    b.add_message("black shoes")
+    b.update_topic("black shoes")
+    sessions.save(99, a)
+    sessions.save(99, b)            # loaded before a's save
+
+    merged = sessions.load(99)
+    assert merged.last_messages == ["red dress", "under 500", "black shoes"]
+    assert merged.topic_memory == "black shoes"
+
+
+# 6. Expired in-process keys are swept on write, not only when read again
+def test_in_process_sweep():
+    backend = InProcessBackend()
+    for i in range(300):
+        backend.set(f"old:{i}", b"x", ttl=0.01)
+    time.sleep(0.02)
+    for i in range(300):
+        backend.set(f"new:{i}", b"x", ttl=60)
+    assert not any(key.startswith("old:") for key in backend._data)
@@ -0,0 +1,22 @@
+from source_manager import SourceManager, SOURCE_MIN_SAMPLES
+
+
+# 1. Failed searches are counted as errors, never as an empty yield
+def test_errors_are_not_yield():
+    sm = SourceManager(overrides={})
+    for _ in range(SOURCE_MIN_SAMPLES * 2):
+        sm.record_error("Myntra")
+    sm.record_yield("Myntra", "dress", 12)
+    stats = sm.stats()["sources"]["Myntra"]
+    assert stats["errors"] == SOURCE_MIN_SAMPLES * 2
+    assert stats["avg_yield"] == {"dress": 12.0}
+    assert "Myntra" in sm.plan(["Amazon", "Myntra"], "dress")
+
+
+# 2. Completed searches with nothing for the category do get the source skipped
+def test_empty_yield_skips():
+    sm = SourceManager(overrides={})
+    for _ in range(SOURCE_MIN_SAMPLES):
+        sm.record_yield("Myntra", "mobile", 0)
+        sm.record_yield("Amazon", "mobile", 20)
+    assert sm.plan(["Amazon", "Myntra"], "mobile") == ["Amazon"]
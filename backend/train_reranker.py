@@ -1,11 +1,17 @@
 import random
+import time
 import torch
 import torch.nn as nn
-from torch.utils.data import Dataset, DataLoader
-from transformers import DistilBertTokenizer, DistilBertModel
-from sklearn.metrics import classification_report, confusion_matrix
-import joblib
-from tqdm import tqdm
+from transformers import DistilBertTokenizerFast, DistilBertModel
+from sklearn.metrics import classification_report, confusion_matrix, roc_curve, auc
+import matplotlib.pyplot as plt
+import seaborn as sns
+
+from reranker_model import save_artifact, RERANKER_ARTIFACT
+from reranker_training import (
+    seed_everything, train_test_split, PretokenizedDataset,
+    make_loader, train, evaluate, report,
+)
 
 # ===========================================================
 # 1. CREATE SYNTHETIC DATA (much faster set but still strong)
@@ -50,46 +56,22 @@ negative_noise = [
     "Hairband for Girls"
 ]
 
-data = []
-
-for query, titles in categories.items():
-    for title in titles:
-        for _ in range(50):  # 5 classes × 5 items × 50 → 1250 positives
-            data.append((query, title, 1))
-
-for _ in range(1500):  # negative samples
-    q = random.choice(list(categories.keys()))
-    t = random.choice(negative_noise)
-    data.append((q, t, 0))
-
-random.shuffle(data)
-print(f"Total samples: {len(data)}")
-
-# ===========================================================
-# 2. DATASET + DATALOADER
-# ===========================================================
-
-tokenizer = DistilBertTokenizer.from_pretrained("distilbert-base-uncased")
-
-class RerankerDataset(Dataset):
-    def __init__(self, data):
-        self.data = data
+def make_data():
+    data = []
 
-    def __len__(self):
-        return len(self.data)
+    for query, titles in categories.items():
+        for title in titles:
+            for _ in range(50):  # 5 classes × 5 items × 50 → 1250 positives
+                data.append((query, title, 1))
 
-    def __getitem__(self, idx):
-        q, t, label = self.data[idx]
-        return q, t, torch.tensor(label, dtype=torch.float32)
+    for _ in range(1500):  # negative samples
+        q = random.choice(list(categories.keys()))
+        t = random.choice(negative_noise)
+        data.append((q, t, 0))
 
-def collate(batch):
-    queries = [item[0] for item in batch]
-    titles = [item[1] for item in batch]
-    labels = torch.stack([item[2] for item in batch])
-    enc = tokenizer(queries, titles, padding=True, truncation=True, return_tensors="pt")
-    return enc, labels
+    random.shuffle(data)
+    return data
 
-loader = DataLoader(RerankerDataset(data), batch_size=16, shuffle=True, collate_fn=collate)
 
 # ===========================================================
 # 3. MODEL
@@ -105,236 +87,104 @@ class CrossEncoder(nn.Module):
         out = self.bert(**enc).last_hidden_state[:, 0, :]
         return torch.sigmoid(self.fc(out))
 
-model = CrossEncoder()
-device = "cuda" if torch.cuda.is_available() else "cpu"
-model.to(device)
-
-criterion = nn.BCELoss()
-optimizer = torch.optim.Adam(model.parameters(), lr=2e-5)
-
-# ===========================================================
-# 4. TRAINING LOOP (FAST)
-# ===========================================================
-
-print("Training started...")
-
-for epoch in range(2):
-    epoch_loss = 0
-    for enc, labels in tqdm(loader):
-        enc = {k: v.to(device) for k, v in enc.items()}
-        labels = labels.to(device)
-
-        optimizer.zero_grad()
-        scores = model(enc).squeeze()
-        loss = criterion(scores, labels)
-        loss.backward()
-        optimizer.step()
-        epoch_loss += loss.item()
-
-    print("Epoch", epoch+1, "Loss:", epoch_loss/len(loader))
-
-from sklearn.metrics import roc_curve, auc
-import matplotlib.pyplot as plt
-
-train_losses = []
-train_accs = []
-all_train_labels = []
-all_train_scores = []
-
-# Re-run one pass over training data to collect metrics
-with torch.no_grad():
-    for enc, labels in loader:
-        enc = {k: v.to(device) for k, v in enc.items()}
-        labels = labels.to(device)
-
-        scores = model(enc).squeeze()
-        preds = (scores > 0.5).float()
-
-        # store
-        train_losses.append(criterion(scores, labels).item())
-        train_accs.append((preds == labels).float().mean().item())
-        all_train_labels.extend(labels.cpu().numpy())
-        all_train_scores.extend(scores.cpu().numpy())
-
-# ===== TRAIN ROC CURVE =====
-fpr_train, tpr_train, _ = roc_curve(all_train_labels, all_train_scores)
-auc_train = auc(fpr_train, tpr_train)
-
-
-# ===========================================================
-# 5. EVALUATION
-# ===========================================================
-
-y_true = []
-y_pred = []
-
-eval_loader = DataLoader(RerankerDataset(data), batch_size=32, shuffle=False, collate_fn=collate)
-
-with torch.no_grad():
-    for enc, labels in eval_loader:
-        enc = {k: v.to(device) for k, v in enc.items()}
-        scores = model(enc).squeeze().cpu()
-        preds = (scores > 0.5).int().tolist()
-        y_pred.extend(preds)
-        y_true.extend(labels.tolist())
-
-print("\n===== CLASSIFICATION REPORT =====")
-print(classification_report(y_true, y_pred))
-
-print("\n===== CONFUSION MATRIX =====")
-print(confusion_matrix(y_true, y_pred))
-
-# ===== TEST ROC CURVE =====
-fpr_test, tpr_test, _ = roc_curve(y_true, y_pred)
-auc_test = auc(fpr_test, tpr_test)
-
-
-# ===========================================================
-# 6. SAVE MODEL
-# ===========================================================
-
-torch.save(model.state_dict(), "crossencoder_reranker.pt")
-joblib.dump(tokenizer, "crossencoder_tokenizer.pkl")
-
-print("\nModel saved successfully!")
-
-plt.figure(figsize=(15, 4))
-
-# ---------------- LOSS CURVE ----------------
-plt.subplot(1, 3, 1)
-plt.plot(train_losses, label="Train Loss")
-plt.title("Training Loss Curve")
-plt.xlabel("Batch")
-plt.ylabel("Loss")
-plt.legend()
-
-# ---------------- ACCURACY CURVE ----------------
-plt.subplot(1, 3, 2)
-plt.plot(train_accs, label="Train Accuracy")
-plt.title("Training Accuracy Curve")
-plt.xlabel("Batch")
-plt.ylabel("Accuracy")
-plt.legend()
-
-# ---------------- ROC CURVES ----------------
-plt.subplot(1, 3, 3)
-plt.plot(fpr_train, tpr_train, label=f"Train AUC = {auc_train:.3f}")
-plt.plot(fpr_test, tpr_test, label=f"Test AUC = {auc_test:.3f}")
-plt.title("ROC Curves")
-plt.xlabel("False Positive Rate")
-plt.ylabel("True Positive Rate")
-plt.legend()
-
-plt.tight_layout()
-plt.show()
-
-# -----------------------------
-# TRAIN METRICS COLLECTION
-# -----------------------------
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.metrics import roc_curve, auc
-
-train_losses = []
-train_accs = []
-train_true = []
-train_scores = []
-
-with torch.no_grad():
-    for enc, labels in loader:
-        enc = {k: v.to(device) for k, v in enc.items()}
-        labels = labels.to(device)
-
-        scores = model(enc).squeeze()
-        preds = (scores > 0.5).float()
-
-        train_losses.append(criterion(scores, labels).item())
-        train_accs.append((preds == labels).float().mean().item())
-        train_true.extend(labels.cpu().numpy())
-        train_scores.extend(scores.cpu().numpy())
-
-# TRAIN ROC-AUC
-fpr_train, tpr_train, _ = roc_curve(train_true, train_scores)
-auc_train = auc(fpr_train, tpr_train)
-
-# -----------------------------
-# TEST METRICS COLLECTION
-# -----------------------------
-test_losses = []
-test_accs = []
-test_scores = []
-
-with torch.no_grad():
-    for enc, labels in eval_loader:
-        enc = {k: v.to(device) for k, v in enc.items()}
-        labels = labels.to(device)
-
-        scores = model(enc).squeeze()
-        preds = (scores > 0.5).float()
-
-        test_losses.append(criterion(scores, labels).item())
-        test_accs.append((preds == labels).float().mean().item())
-        test_scores.extend(scores.cpu().numpy())
-
-# TEST ROC-AUC
-fpr_test, tpr_test, _ = roc_curve(y_true, test_scores)
-auc_test = auc(fpr_test, tpr_test)
-
-# ===== TRAINING LOSS CURVE =====
-plt.figure(figsize=(6,4))
-plt.plot(train_losses)
-plt.title("Training Loss Curve")
-plt.xlabel("Batch")
-plt.ylabel("Loss")
-plt.show()
-
-# ===== TRAINING ACCURACY CURVE =====
-plt.figure(figsize=(6,4))
-plt.plot(train_accs)
-plt.title("Training Accuracy Curve")
-plt.xlabel("Batch")
-plt.ylabel("Accuracy")
-plt.show()
-
-# ===== TRAINING ROC-AUC =====
-plt.figure(figsize=(6,4))
-plt.plot(fpr_train, tpr_train, label=f"AUC = {auc_train:.3f}")
-plt.title("Training ROC Curve")
-plt.xlabel("False Positive Rate")
-plt.ylabel("True Positive Rate")
-plt.legend()
-plt.show()
-
-# ===== TEST LOSS CURVE =====
-plt.figure(figsize=(6,4))
-plt.plot(test_losses)
-plt.title("Test Loss Curve")
-plt.xlabel("Batch")
-plt.ylabel("Loss")
-plt.show()
-
-# ===== TEST ACCURACY CURVE =====
-plt.figure(figsize=(6,4))
-plt.plot(test_accs)
-plt.title("Test Accuracy Curve")
-plt.xlabel("Batch")
-plt.ylabel("Accuracy")
-plt.show()
-
-# ===== TEST ROC-AUC =====
-plt.figure(figsize=(6,4))
-plt.plot(fpr_test, tpr_test, label=f"AUC = {auc_test:.3f}")
-plt.title("Test ROC Curve")
-plt.xlabel("FPR")
-plt.ylabel("TPR")
-plt.legend()
-plt.show()
-
-# ===== CONFUSION MATRIX HEATMAP (TEST) =====
-plt.figure(figsize=(5,4))
-sns.heatmap(confusion_matrix(y_true, y_pred), annot=True, fmt='d', cmap='Blues')
-plt.title("Confusion Matrix Heatmap (Test)")
-plt.xlabel("Predicted")
-plt.ylabel("Actual")
-plt.show()
 
+def main():
+    wall_start = time.perf_counter()
+    seed_everything()
+
+    data = make_data()
+    print(f"Total samples: {len(data)}")
+
+    # ===========================================================
+    # 2. HELD-OUT SPLIT + PRE-TOKENIZED DATASETS
+    # ===========================================================
+    # rows repeat 50×, so split by (query, title): no pair is in both halves
+    train_data, test_data = train_test_split(data, test_size=0.20, group=lambda p: (p[0], p[1]))
+
+    tokenizer = DistilBertTokenizerFast.from_pretrained("distilbert-base-uncased")
+    train_set = PretokenizedDataset.load_or_build(train_data, tokenizer, "synthetic-train")
+    test_set = PretokenizedDataset.load_or_build(test_data, tokenizer, "synthetic-test")
+
+    loader = make_loader(train_set, batch_size=16, shuffle=True)
+    eval_loader = make_loader(test_set, batch_size=32, shuffle=False)
+
+    model = CrossEncoder()
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    model.to(device)
+
+    criterion = nn.BCELoss()
+    optimizer = torch.optim.Adam(model.parameters(), lr=2e-5)
+
+    # ===========================================================
+    # 4. TRAINING LOOP (curves recorded on the way, no extra passes)
+    # ===========================================================
+    print("Training started...")
+    train_stats = train(model, loader, optimizer, criterion, device, epochs=2)
+
+    # ===========================================================
+    # 5. EVALUATION (one pass over the held-out split)
+    # ===========================================================
+    ev = evaluate(model, eval_loader, criterion, device)
+    report("RERANKER TRAINING (synthetic)", train_stats, ev, time.perf_counter() - wall_start)
+
+    print("\n===== CLASSIFICATION REPORT =====")
+    print(classification_report(ev["y_true"], ev["y_pred"]))
+
+    print("\n===== CONFUSION MATRIX =====")
+    print(confusion_matrix(ev["y_true"], ev["y_pred"]))
+
+    # ===========================================================
+    # 6. SAVE MODEL
+    # ===========================================================
+
+    # the .pt stays as the distillation teacher; serving loads the artifact
+    # (model.safetensors + tokenizer.json), no pickled tokenizer
+    torch.save(model.state_dict(), "crossencoder_reranker.pt")
+    save_artifact(model.cpu(), tokenizer, RERANKER_ARTIFACT, source="train_reranker.py")
+
+    print("\nModel saved successfully!")
+
+    fpr_test, tpr_test, _ = roc_curve(ev["y_true"], ev["y_score"])
+    auc_test = auc(fpr_test, tpr_test)
+
+    plt.figure(figsize=(15, 4))
+
+    # ---------------- LOSS CURVE ----------------
+    plt.subplot(1, 3, 1)
+    plt.plot(train_stats["losses"], label="Train Loss")
+    plt.title("Training Loss Curve")
+    plt.xlabel("Batch")
+    plt.ylabel("Loss")
+    plt.legend()
+
+    # ---------------- ACCURACY CURVE ----------------
+    plt.subplot(1, 3, 2)
+    plt.plot(train_stats["accs"], label="Train Accuracy")
+    plt.title("Training Accuracy Curve")
+    plt.xlabel("Batch")
+    plt.ylabel("Accuracy")
+    plt.legend()
+
+    # ---------------- ROC CURVE ----------------
+    plt.subplot(1, 3, 3)
+    plt.plot(fpr_test, tpr_test, label=f"Test AUC = {auc_test:.3f}")
+    plt.title("ROC Curve (held-out)")
+    plt.xlabel("False Positive Rate")
+    plt.ylabel("True Positive Rate")
+    plt.legend()
+
+    plt.tight_layout()
+    plt.show()
+
+    # ===== CONFUSION MATRIX HEATMAP (TEST) =====
+    plt.figure(figsize=(5,4))
+    sns.heatmap(confusion_matrix(ev["y_true"], ev["y_pred"]), annot=True, fmt='d', cmap='Blues')
+    plt.title("Confusion Matrix Heatmap (Test)")
+    plt.xlabel("Predicted")
+    plt.ylabel("Actual")
+    plt.show()
+
+
+# guard needed for DataLoader workers on spawn-based platforms (Windows/macOS)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+import os
+import time
+import queue
+import asyncio
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+
+# ================================================================
+# CONFIG
+# ================================================================
+USER_DB_PATH = os.getenv("USER_DB_PATH", "data.db")
+USER_DB_POOL_SIZE = int(os.getenv("USER_DB_POOL_SIZE", "8"))
+USER_DB_POOL_TIMEOUT = float(os.getenv("USER_DB_POOL_TIMEOUT", "5"))
+LEGACY_AUTH_DB_PATH = "users.db"   # old auth_routes.py database
+
+
+# ================================================================
+# SQL (constant strings so sqlite3's per-connection statement cache
+# reuses the prepared statements)
+# ================================================================
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT UNIQUE,
+    email TEXT,
+    password_hash TEXT,
+    created_at REAL
+)
+"""
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)",
+]
+
+# one row per applied one-shot migration
+MIGRATIONS_SCHEMA = "CREATE TABLE IF NOT EXISTS migrations(name TEXT PRIMARY KEY, applied_at REAL)"
+LEGACY_MIGRATION = "import_legacy_users"
+
+SQL_INSERT = """
+INSERT INTO users(username, email, name, password_hash, created_at)
+VALUES (?, ?, ?, ?, ?)
+"""
+SQL_BY_LOGIN = "SELECT * FROM users WHERE username=? OR email=? LIMIT 1"
+SQL_BY_EMAIL = "SELECT * FROM users WHERE email=? LIMIT 1"
+SQL_BY_ID = "SELECT * FROM users WHERE id=?"
+SQL_SET_HASH = "UPDATE users SET password_hash=? WHERE id=?"
+
+
+class UserExistsError(Exception):
+    pass
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+# ================================================================
+# CONNECTION POOL
+# ================================================================
+class ConnectionPool:
+    """
+    Bounded pool of SQLite connections in WAL mode.
+    Connections are created lazily up to `max_size` and reused afterwards.
+    """
+
+    def __init__(self, db_path, max_size=USER_DB_POOL_SIZE, timeout=USER_DB_POOL_TIMEOUT):
+        self.db_path = str(db_path)
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=max_size)
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            timeout=self.timeout,
+            cached_statements=64,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+        return conn
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.max_size:
+                self._created += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._created -= 1
+                    raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise PoolTimeoutError(f"no free DB connection after {self.timeout}s")
+
+    def release(self, conn):
+        self._idle.put_nowait(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.release(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
+
+
+# ================================================================
+# USER STORE
+# ================================================================
+class UserStore:
+    """
+    Single data-access layer for the users table.
+    Used by both main.py (/register, /login) and auth_routes.py.
+    """
+
+    def __init__(self, db_path=USER_DB_PATH, pool_size=USER_DB_POOL_SIZE):
+        self.db_path = Path(db_path)
+        self.pool = ConnectionPool(self.db_path, max_size=pool_size)
+        self._init_schema()
+
+    def _init_schema(self):
+        """Runs once per process, not once per request."""
+        with self.pool.connection() as conn:
+            conn.execute(SCHEMA)
+            cols = {row["name"] for row in conn.execute("PRAGMA table_info(users)")}
+            if "name" not in cols:
+                conn.execute("ALTER TABLE users ADD COLUMN name TEXT DEFAULT ''")
+            for stmt in INDEXES:
+                conn.execute(stmt)
+            conn.execute(MIGRATIONS_SCHEMA)
+            conn.commit()
+
+    # ---------------- sync API ----------------
+    def create_user(self, username, email, password_hash, name=""):
+        with self.pool.connection() as conn:
+            try:
+                cur = conn.execute(
+                    SQL_INSERT,
+                    (username, email or "", name or "", password_hash, time.time()),
+                )
+                conn.commit()
+                return cur.lastrowid
+            except sqlite3.IntegrityError:
+                conn.rollback()
+                raise UserExistsError(username)
+
+    def find_by_login(self, login):
+        """Look up a user by username or email."""
+        with self.pool.connection() as conn:
+            row = conn.execute(SQL_BY_LOGIN, (login, login)).fetchone()
+        return dict(row) if row else None
+
+    def find_by_email(self, email):
+        with self.pool.connection() as conn:
+            row = conn.execute(SQL_BY_EMAIL, (email,)).fetchone()
+        return dict(row) if row else None
+
+    def find_by_id(self, user_id):
+        with self.pool.connection() as conn:
+            row = conn.execute(SQL_BY_ID, (user_id,)).fetchone()
+        return dict(row) if row else None
+
+    def set_password_hash(self, user_id, password_hash):
+        with self.pool.connection() as conn:
+            conn.execute(SQL_SET_HASH, (password_hash, user_id))
+            conn.commit()
+
+    # ---------------- async API (runs on a worker thread) ----------------
+    async def acreate_user(self, username, email, password_hash, name=""):
+        return await asyncio.to_thread(self.create_user, username, email, password_hash, name)
+
+    async def afind_by_login(self, login):
+        return await asyncio.to_thread(self.find_by_login, login)
+
+    async def afind_by_email(self, email):
+        return await asyncio.to_thread(self.find_by_email, email)
+
+    async def aset_password_hash(self, user_id, password_hash):
+        return await asyncio.to_thread(self.set_password_hash, user_id, password_hash)
+
+    # ---------------- migration ----------------
+    def import_legacy_users(self, legacy_path=LEGACY_AUTH_DB_PATH):
+        """
+        Copy accounts from the old auth_routes users.db (email/password/name
+        schema) into the shared table. Existing emails are skipped.
+        One-shot: recorded in the migrations table and skipped afterwards
+        (run from app startup, not on import).
+        """
+        legacy_path = Path(legacy_path)
+        if not legacy_path.exists():
+            return 0
+
+        src = sqlite3.connect(str(legacy_path))
+        try:
+            rows = src.execute(
+                "SELECT email, password, name, created_at FROM users"
+            ).fetchall()
+        except sqlite3.OperationalError:
+            rows = []
+        finally:
+            src.close()
+
+        imported = 0
+        with self.pool.connection() as conn:
+            # write lock first: workers starting together run the import once
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM migrations WHERE name=?", (LEGACY_MIGRATION,)).fetchone():
+                conn.rollback()
+                return 0
+            for email, pw_hash, name, created_at in rows:
+                if conn.execute(SQL_BY_EMAIL, (email,)).fetchone():
+                    continue
+                try:
+                    conn.execute(
+                        SQL_INSERT,
+                        (email, email, name or "", pw_hash, created_at or time.time()),
+                    )
+                    imported += 1
+                except sqlite3.IntegrityError:
+                    continue
+            conn.execute("INSERT INTO migrations VALUES (?, ?)", (LEGACY_MIGRATION, time.time()))
+            conn.commit()
+
+        if imported:
+            print(f"[UserStore] Imported {imported} users from {legacy_path}")
+        return imported
+
+
+user_store = UserStore()
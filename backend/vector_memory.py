@@ -1,13 +1,30 @@
+import os
+import threading
+
 import numpy as np
 from sentence_transformers import SentenceTransformer, util
 import torch
 
 
+# oldest memories are dropped beyond this, so a long-running worker stays bounded
+VECTOR_MEMORY_MAX_ENTRIES = int(os.getenv("VECTOR_MEMORY_MAX_ENTRIES", "10000"))
+# weaker matches are not recalled: any non-empty store has *some* nearest neighbour
+VECTOR_RECALL_MIN_SCORE = float(os.getenv("VECTOR_RECALL_MIN_SCORE", "0.5"))    # cosine
+
+
 class VectorMemory:
-    def __init__(self):
+    """
+    Semantic recall over earlier chat messages. The store is in-process:
+    with several workers each one recalls only the messages it served
+    (SHARED_BACKEND does not cover it).
+    """
+
+    def __init__(self, max_entries=VECTOR_MEMORY_MAX_ENTRIES):
+        self.max_entries = max_entries
         self.model = SentenceTransformer("all-MiniLM-L6-v2")
         self.memory_texts = []       # stored text messages
         self.memory_vectors = []     # stored embeddings (tensors)
+        self._lock = threading.Lock()    # writes come from the background job queue
 
     def _is_valid_embedding(self, emb):
         """Check if embedding is a valid vector."""
@@ -20,32 +37,56 @@ class VectorMemory:
         except:
             return False
 
-    def add_memory(self, text):
-        """Safely embed text and store."""
+    def encode(self, text):
+        """MiniLM embedding of `text`, or None if it is empty or invalid."""
         text = text.strip()
         if not text:
-            return
-
+            return None
         try:
             embedding = self.model.encode(text, convert_to_tensor=True)
-
-            if not self._is_valid_embedding(embedding):
-                print(f"[VectorMemory] Invalid embedding dropped for text: {text}")
-                return
-
-            self.memory_texts.append(text)
-            self.memory_vectors.append(embedding)
-
         except Exception as e:
             print(f"[VectorMemory] Error embedding '{text}':", e)
+            return None
+        if not self._is_valid_embedding(embedding):
+            print(f"[VectorMemory] Invalid embedding dropped for text: {text}")
+            return None
+        return embedding
+
+    def add_memory(self, text, embedding=None):
+        """Safely embed text (unless `embedding` is given) and store. Returns the embedding."""
+        text = text.strip()
+        if embedding is None:
+            embedding = self.encode(text)
+        if embedding is None or not self._is_valid_embedding(embedding):
+            return None
 
-    def search_memory(self, query, top_k=2):
-        """Semantic recall: find most similar stored memories."""
+        with self._lock:
+            self.memory_texts.append(text)
+            self.memory_vectors.append(embedding)
+            overflow = len(self.memory_texts) - self.max_entries
+            if overflow > 0:
+                del self.memory_texts[:overflow]
+                del self.memory_vectors[:overflow]
+        return embedding
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self.memory_texts),
+                "max_entries": self.max_entries,
+                "bytes": sum(v.numel() * v.element_size() for v in self.memory_vectors),
+            }
+
+    def search_memory(self, query, top_k=2, min_score=VECTOR_RECALL_MIN_SCORE):
+        """Semantic recall: most similar stored memories scoring at least `min_score`."""
         query = query.strip()
         if not query:
             return []
 
-        if not self.memory_vectors:
+        with self._lock:
+            texts = list(self.memory_texts)
+            vectors = list(self.memory_vectors)
+        if not vectors:
             return []
 
         try:
@@ -56,10 +97,11 @@ class VectorMemory:
                 return []
 
             # Filter only valid vectors
-            valid_vectors = [
-                v for v in self.memory_vectors
+            valid = [
+                (t, v) for t, v in zip(texts, vectors)
                 if self._is_valid_embedding(v)
             ]
+            valid_vectors = [v for _, v in valid]
 
             if not valid_vectors:
                 return []
@@ -69,8 +111,10 @@ class VectorMemory:
 
             recalled = []
             for score, idx in zip(top_results.values, top_results.indices):
+                if float(score) < min_score:
+                    continue
                 recalled.append(
-                    (float(score), self.memory_texts[int(idx)])
+                    (float(score), valid[int(idx)][0])
                 )
 
             return recalled
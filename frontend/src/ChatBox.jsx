@@ -33,8 +33,10 @@ export default function ChatBox({ token, username }) {
     if (token) fd.append("token", token);
 
     try {
+      const headers = { "Content-Type": "multipart/form-data" };
+      if (token) headers.Authorization = `Bearer ${token}`;
       const res = await axios.post(`${API}/chat`, fd, {
-        headers: { "Content-Type": "multipart/form-data" },
+        headers,
         timeout: 60000
       });
       const { reply, products } = res.data;